@@ -29,7 +29,8 @@ def main():
     print(f"  MongoDB URL: {settings.mongodb_url}")
     print(f"  数据库名称: {settings.mongodb_database}")
     print(f"  集合列表:")
-    print(f"    - conversations (对话历史)")
+    print("    - conversations (会话元数据)")
+    print("    - conversation_turns (对话轮次)")
     print(f"    - analysis_records (分析记录)")
     print(f"    - reports (报告)")
 
@@ -55,9 +56,13 @@ def main():
         MongoDBManager.init_indexes()
         print("✓ 索引创建完成")
 
+        # 迁移旧会话内嵌的轮次
+        migrated = MongoDBManager.migrate_embedded_turns()
+        print(f"✓ 迁移了 {migrated} 个会话的内嵌轮次")
+
         # 显示索引信息
         print(f"\n索引信息:")
-        for coll_name in ["conversations", "analysis_records", "reports"]:
+        for coll_name in ["conversations", "conversation_turns", "analysis_records", "reports"]:
             collection = db[coll_name]
             indexes = list(collection.list_indexes())
             print(f"\n  {coll_name}:")
@@ -67,6 +72,7 @@ def main():
         # 统计数据
         print(f"\n数据统计:")
         print(f"  conversations: {db.conversations.count_documents({})} 条记录")
+        print(f"  conversation_turns: {db.conversation_turns.count_documents({})} 条记录")
         print(f"  analysis_records: {db.analysis_records.count_documents({})} 条记录")
         print(f"  reports: {db.reports.count_documents({})} 条记录")
 
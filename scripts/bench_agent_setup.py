@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Agent 请求级初始化开销基准测试
+
+对比两种请求处理方式的初始化耗时：
+- per-request: 每个请求执行 DevOpsAgent()（旧实现）
+- shared:      启动时构建一次，请求通过 get_agent 依赖获取（新实现）
+
+两种方式都会为每个请求创建独立的 AgentExecutor，不涉及 LLM 调用和 MongoDB。
+
+用法:
+    DEEPSEEK_API_KEY=dummy python scripts/bench_agent_setup.py [请求数]
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_classic.agents import AgentExecutor  # noqa: E402
+
+from src.agent.devops_agent import DevOpsAgent  # noqa: E402
+from src.api.dependencies import get_agent, init_agent  # noqa: E402
+
+
+def build_executor(agent: DevOpsAgent) -> AgentExecutor:
+    """与 DevOpsAgent.create_executor 相同的执行器构建（不含 MongoDB 记忆）"""
+    return AgentExecutor(
+        agent=agent.agent,
+        tools=agent.tools,
+        max_iterations=10,
+        handle_parsing_errors=True,
+    )
+
+
+def bench_per_request(n: int) -> list[float]:
+    """旧实现：每个请求构建 Agent"""
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        agent = DevOpsAgent()
+        build_executor(agent)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_shared(n: int) -> list[float]:
+    """新实现：启动时构建一次，请求复用"""
+    app = SimpleNamespace(state=SimpleNamespace())
+    init_agent(app)
+    request = SimpleNamespace(app=app)
+
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        agent = get_agent(request)
+        build_executor(agent)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list[float]) -> None:
+    """打印统计结果"""
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{name:<12} mean={statistics.mean(samples):8.3f} ms  "
+        f"p50={statistics.median(samples):8.3f} ms  p95={p95:8.3f} ms"
+    )
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    # 预热一次，排除模块导入和首次初始化的影响
+    DevOpsAgent()
+
+    print(f"每种方式 {n} 个请求，单位：每请求初始化耗时")
+    report("per-request", bench_per_request(n))
+    report("shared", bench_shared(n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""会话记忆的事件循环延迟基准测试
+
+并发模拟多个会话，每个会话反复执行"加载会话 + 保存一轮对话"（即一次对话请求的全部
+MongoDB 访问），同时用一个按固定间隔 sleep 的探针任务测量事件循环延迟
+（实际唤醒时间减去预期唤醒时间），对比三种访问方式：
+- sync: 在事件循环中直接调用同步的 MongoDBConversationMemory（原 /chat 的做法）
+- thread: 同步记忆放到线程池中执行（原流式接口的做法）
+- async: AsyncMongoDBConversationMemory（Motor）
+
+默认连接配置中的 MongoDB（会话 ID 以 bench-lag- 开头，结束后删除）；
+用 --simulate-ms 模拟每次数据库往返的耗时。连接不上 MongoDB 时自动改为模拟
+（往返耗时取 DEFAULT_SIMULATE_MS），否则每个请求都要等待服务器选择超时。
+
+用法:
+    DEEPSEEK_API_KEY=dummy python scripts/bench_memory_event_loop_lag.py [--sessions 50] \\
+        [--requests 5] [--simulate-ms 5]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.agent import async_mongodb_memory, mongodb_memory  # noqa: E402
+from src.agent.async_mongodb_memory import AsyncMongoDBConversationMemory  # noqa: E402
+from src.agent.mongodb_memory import MongoDBConversationMemory  # noqa: E402
+from src.models import mongodb  # noqa: E402
+
+PROBE_INTERVAL = 0.005
+DEFAULT_SIMULATE_MS = 5.0
+
+
+class _SimulatedCollection:
+    """每次操作耗时固定的内存集合（只实现对话记忆用到的操作）"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.docs = {}
+
+    def _wait(self) -> None:
+        time.sleep(self.latency)
+
+    def find_one(self, query, *args, **kwargs):
+        self._wait()
+        return self.docs.get(query["session_id"])
+
+    def insert_one(self, doc):
+        self._wait()
+        self.docs[doc["session_id"]] = doc
+
+    def _next_turn_id(self, query):
+        doc = self.docs.get(query["session_id"])
+        if doc is None:
+            return None
+        doc["turn_count"] += 1
+        return {"turn_count": doc["turn_count"]}
+
+    def find_one_and_update(self, query, update, **kwargs):
+        self._wait()
+        return self._next_turn_id(query)
+
+    def delete_many(self, query):
+        for session_id in query["session_id"]["$in"]:
+            self.docs.pop(session_id, None)
+
+
+class _SimulatedCursor:
+    def __init__(self, docs, collection):
+        self.docs = docs
+        self.collection = collection
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def __iter__(self):
+        self.collection._wait()
+        return iter(self.docs)
+
+    async def to_list(self, length=None):
+        await self.collection._await()
+        return list(self.docs)
+
+
+class _SimulatedTurnsCollection(_SimulatedCollection):
+    """轮次集合：按会话保存轮次列表"""
+
+    def find(self, query, projection=None):
+        return _SimulatedCursor(list(self.docs.get(query["session_id"], [])), self)
+
+    def insert_one(self, doc):
+        self._wait()
+        self.docs.setdefault(doc["session_id"], []).append(doc)
+
+
+class _AsyncSimulatedCollection(_SimulatedCollection):
+    async def _await(self) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def find_one(self, query, *args, **kwargs):
+        await self._await()
+        return self.docs.get(query["session_id"])
+
+    async def insert_one(self, doc):
+        await self._await()
+        self.docs[doc["session_id"]] = doc
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        await self._await()
+        return self._next_turn_id(query)
+
+
+class _AsyncSimulatedTurnsCollection(_AsyncSimulatedCollection):
+    def find(self, query, projection=None):
+        return _SimulatedCursor(list(self.docs.get(query["session_id"], [])), self)
+
+    async def insert_one(self, doc):
+        await self._await()
+        self.docs.setdefault(doc["session_id"], []).append(doc)
+
+
+def mongodb_reachable() -> bool:
+    """检测配置中的 MongoDB 是否可用（一次 ping，受客户端的短超时限制）"""
+    try:
+        mongodb.MongoDBManager.get_client().admin.command("ping")
+        return True
+    except Exception as e:
+        print(f"MongoDB 不可用: {e}")
+        return False
+
+
+def simulate(latency_ms: float) -> None:
+    """用模拟集合替换 MongoDB 访问"""
+    sync_collection = _SimulatedCollection(latency_ms / 1000)
+    async_collection = _AsyncSimulatedCollection(latency_ms / 1000)
+    sync_turns = _SimulatedTurnsCollection(latency_ms / 1000)
+    async_turns = _AsyncSimulatedTurnsCollection(latency_ms / 1000)
+    mongodb_memory.get_conversations_collection = lambda: sync_collection
+    mongodb_memory.get_conversation_turns_collection = lambda: sync_turns
+    async_mongodb_memory.get_async_conversations_collection = lambda: async_collection
+    async_mongodb_memory.get_async_conversation_turns_collection = lambda: async_turns
+
+
+async def request(mode: str, session_id: str) -> None:
+    """一次对话请求的 MongoDB 访问：加载会话 + 保存一轮对话"""
+    if mode == "sync":
+        memory = MongoDBConversationMemory(session_id)
+        memory.add_turn(user_input="构建状态如何", final_response="构建正常")
+    elif mode == "thread":
+        memory = await asyncio.to_thread(MongoDBConversationMemory, session_id)
+        await asyncio.to_thread(
+            memory.add_turn, user_input="构建状态如何", final_response="构建正常"
+        )
+    else:
+        memory = await AsyncMongoDBConversationMemory.create(session_id)
+        await memory.add_turn(user_input="构建状态如何", final_response="构建正常")
+
+
+async def run(mode: str, sessions: int, requests: int) -> None:
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+    async def session(session_id: str):
+        for _ in range(requests):
+            await request(mode, session_id)
+
+    session_ids = [f"bench-lag-{uuid.uuid4()}" for _ in range(sessions)]
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    start = time.perf_counter()
+    await asyncio.gather(*(session(session_id) for session_id in session_ids))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    for collection in (
+        mongodb_memory.get_conversations_collection(),
+        mongodb_memory.get_conversation_turns_collection(),
+    ):
+        collection.delete_many({"session_id": {"$in": session_ids}})
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if lags_ms else 0.0
+    print(
+        f"{mode:<8} {sessions * requests / elapsed:>10,.0f} req/s  "
+        f"loop lag p50 {statistics.median(lags_ms) if lags_ms else 0:7.2f}ms  "
+        f"p99 {p99:7.2f}ms  max {max(lags_ms, default=0):7.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50, help="并发会话数")
+    parser.add_argument("--requests", type=int, default=5, help="每个会话的请求数")
+    parser.add_argument(
+        "--simulate-ms", type=float, default=None, help="模拟的数据库往返耗时（毫秒）"
+    )
+    parser.add_argument("--modes", default="sync,thread,async", help="测试的访问方式")
+    args = parser.parse_args()
+
+    if args.simulate_ms is None and not mongodb_reachable():
+        args.simulate_ms = DEFAULT_SIMULATE_MS
+    if args.simulate_ms is not None:
+        simulate(args.simulate_ms)
+        print(f"模拟 MongoDB，每次往返 {args.simulate_ms}ms")
+    print(
+        f"{args.sessions} 个并发会话 x {args.requests} 次请求，"
+        f"探针间隔 {PROBE_INTERVAL * 1000:.0f}ms"
+    )
+
+    for mode in args.modes.split(","):
+        asyncio.run(run(mode, args.sessions, args.requests))
+        # Motor 客户端绑定在创建它的事件循环上，每种方式使用新的事件循环
+        mongodb.AsyncMongoDBManager._client = None
+        mongodb.AsyncMongoDBManager._db = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""工具结果格式 token 对比
+
+对每个工具的 mock 结果分别用各个 Observation 格式编码，按 estimate_tokens 估算
+token 数，并估算多步 ReAct 推理中该结果随 agent_scratchpad 重复发送的累计开销
+（第 1 步产生的 Observation 会在之后的每次 LLM 调用中再次发送）。
+
+用法:
+    DEEPSEEK_API_KEY=dummy python scripts/bench_observation_tokens.py [ReAct 步数]
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config import settings  # noqa: E402
+from src.tools.artifactory import ArtifactoryTool  # noqa: E402
+from src.tools.custom_backend import CustomBackendTool  # noqa: E402
+from src.tools.gerrit import GerritTool  # noqa: E402
+from src.tools.jenkins import JenkinsTool  # noqa: E402
+from src.tools.test_cases import TestCasesTool  # noqa: E402
+from src.tools.test_coverage import TestCoverageTool  # noqa: E402
+from src.tools.formatters import available_formats, get_formatter  # noqa: E402
+from src.utils.tokens import estimate_tokens  # noqa: E402
+
+# 每个工具的示例查询
+SAMPLE_QUERIES = {
+    "custom_backend": "metrics:project=my-project",
+    "jenkins": "my-project-build",
+}
+
+
+def main() -> None:
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    formats = available_formats()
+    baseline = formats[0]
+
+    print(f"单位：估算 token 数；累计 = 该结果在 {steps} 步 ReAct 中重复发送的总量")
+    print(f"{'tool':<16}" + "".join(f"{name:>10}" for name in formats) + f"{'节省':>10}")
+
+    tools = [
+        TestCoverageTool(),
+        TestCasesTool(),
+        GerritTool(),
+        JenkinsTool(),
+        ArtifactoryTool(),
+        CustomBackendTool(),
+    ]
+    totals = dict.fromkeys(formats, 0)
+    for tool in tools:
+        result = tool._execute(SAMPLE_QUERIES.get(tool.name, "my-project"))
+        fields = settings.observation_fields.get(tool.name, tool.observation_fields)
+        counts = {
+            name: estimate_tokens(get_formatter(name).format(result, fields)) for name in formats
+        }
+        for name, count in counts.items():
+            totals[name] += count
+        saved = 1 - counts[formats[-1]] / counts[baseline]
+        print(
+            f"{tool.name:<16}" + "".join(f"{counts[name]:>10}" for name in formats) + f"{saved:>10.0%}"
+        )
+
+    saved = 1 - totals[formats[-1]] / totals[baseline]
+    print(f"{'合计':<14}" + "".join(f"{totals[name]:>10}" for name in formats) + f"{saved:>10.0%}")
+    # 按平均结果大小估算：第 i 步的 Observation 会在后续 steps - i 次 LLM 调用中再次发送
+    repeats = steps * (steps - 1) // 2
+    print(
+        f"{'累计':<14}"
+        + "".join(f"{totals[name] * repeats // len(tools):>10}" for name in formats)
+    )
+
+
+if __name__ == "__main__":
+    main()
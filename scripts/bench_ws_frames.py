@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""流式传输帧开销基准测试：SSE vs WebSocket
+
+把 bench_agui_adapter.py 中的典型 ReAct 输出经 AGUIAdapter 转换为 AG-UI 事件，
+分别按以下方式计算每个事件在线路上的字节数（不含 TCP/TLS）：
+- SSE: "id: N\\ndata: {事件}\\n\\n"，外加 HTTP/1.1 分块传输的块头和块尾
+- WS 文本帧: {"runId", "eventId", "event"} 外加 WebSocket 帧头（服务端帧不加掩码）
+- WS 紧凑帧: [通道号, 事件 ID, 事件] 外加 WebSocket 帧头
+- WS 紧凑帧 + permessage-deflate: 保留压缩上下文逐帧压缩（uvicorn 默认启用该扩展）
+
+同时报告每个事件的封装耗时。分别测试逐 token 发送和开启增量合并两种情况。
+
+用法:
+    DEEPSEEK_API_KEY=dummy python scripts/bench_ws_frames.py [重复次数]
+"""
+
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "scripts"))
+
+from bench_agui_adapter import REACT_OUTPUT, tokenize  # noqa: E402
+from src.api.routes.agent_ws import encode_frame  # noqa: E402
+from src.utils.agui_adapter import AGUIAdapter  # noqa: E402
+from src.utils.run_registry import StreamRun  # noqa: E402
+
+RUN_ID = "0b7e3f52-6a1d-4c8e-9f3a-2d5c7b9e1a40"
+
+
+def agui_payloads(**adapter_kwargs) -> List[str]:
+    """一轮 ReAct 输出转换并按运行缓冲区的方式序列化后的事件 JSON"""
+    adapter = AGUIAdapter(session_id="bench", run_id=RUN_ID, **adapter_kwargs)
+    events = adapter.convert_event({"type": "start"})
+    for token in tokenize(REACT_OUTPUT):
+        events += adapter.convert_event({"type": "token", "content": token})
+    events += adapter.flush()
+    events += adapter.convert_event({"type": "final", "session_id": "bench"})
+
+    run = StreamRun(RUN_ID)
+    for event in events:
+        run.publish(event)
+    return [payload for _, payload, _ in run._replay_from(0)]
+
+
+def ws_header(size: int) -> int:
+    """服务端到客户端 WebSocket 帧头字节数"""
+    return 2 if size <= 125 else 4 if size <= 0xFFFF else 10
+
+
+def sse_frame(event_id: int, payload: str) -> bytes:
+    return f"id: {event_id}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def sse_wire(frame: bytes) -> int:
+    return len(f"{len(frame):x}\r\n") + len(frame) + 2
+
+
+def ws_text_frame(event_id: int, payload: str) -> bytes:
+    return encode_frame(0, RUN_ID, event_id, payload).encode("utf-8")
+
+
+def ws_compact_frame(event_id: int, payload: str) -> bytes:
+    return encode_frame(0, RUN_ID, event_id, payload, compact=True)
+
+
+def ws_wire(frame: bytes) -> int:
+    return ws_header(len(frame)) + len(frame)
+
+
+def deflating(encode: Callable[[int, str], bytes]) -> Callable[[], Callable[[int, str], bytes]]:
+    """permessage-deflate：同一连接共享压缩上下文，每帧 SYNC_FLUSH 后去掉末尾 00 00 ff ff"""
+    def encoder() -> Callable[[int, str], bytes]:
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+        def deflate(event_id: int, payload: str) -> bytes:
+            frame = encode(event_id, payload)
+            return (compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+        return deflate
+
+    return encoder
+
+
+def bench(name: str, payloads: List[str], repeat: int) -> None:
+    """打印各种封装方式的线路字节数和封装耗时"""
+    body = sum(len(payload.encode("utf-8")) for payload in payloads)
+    print(f"\n[{name}] 每轮 {len(payloads)} 个事件，事件 JSON 共 {body:,} 字节")
+    print(f"{'传输方式':<24} {'线路字节':>10} {'开销/事件':>10} {'相对 SSE':>9} {'封装 µs/事件':>12}")
+
+    def report(
+        label: str,
+        encoder: Callable[[], Callable[[int, str], bytes]],
+        wire: Callable[[bytes], int],
+    ) -> int:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            encode = encoder()  # 每轮模拟一个新连接
+            frames = [encode(i, payload) for i, payload in enumerate(payloads, 1)]
+        elapsed = (time.perf_counter() - start) / (repeat * len(payloads))
+        total = sum(wire(frame) for frame in frames)
+        ratio = f"{total / baseline:.1%}" if baseline else "-"
+        print(
+            f"{label:<24} {total:>10,} {(total - body) / len(payloads):>10.1f} "
+            f"{ratio:>9} {elapsed * 1e6:>12.2f}"
+        )
+        return total
+
+    baseline = 0
+    baseline = report("SSE (chunked)", lambda: sse_frame, sse_wire)
+    report("WS 文本帧", lambda: ws_text_frame, ws_wire)
+    report("WS 紧凑帧", lambda: ws_compact_frame, ws_wire)
+    report("WS 紧凑帧 + deflate", deflating(ws_compact_frame), ws_wire)
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    bench("逐 token", agui_payloads(), repeat)
+    bench("增量合并", agui_payloads(coalesce_ms=30), repeat)
+
+
+if __name__ == "__main__":
+    main()
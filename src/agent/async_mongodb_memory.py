@@ -0,0 +1,334 @@
+"""MongoDB 对话记忆管理（异步版本）
+
+基于 Motor 的对话记忆，供异步路由使用：数据库访问全部以协程执行，
+等待 MongoDB 期间事件循环可以继续处理其它请求和流。接口与 MongoDBConversationMemory
+一致（读写方法为协程），对话历史、摘要和更新文档的构造逻辑与同步版本共用。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from src.agent.mongodb_memory import ConversationMemoryBase
+from src.agent.session_cache import get_session_cache
+from src.config import settings
+from src.models.mongodb import (
+    get_async_conversation_turns_collection,
+    get_async_conversations_collection,
+)
+from src.models.mongodb_models import AgentStep, ConversationDocument, ConversationTurn
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncMongoDBConversationMemory(ConversationMemoryBase):
+    """MongoDB 持久化对话记忆（异步）
+
+    通过 create() 创建：连接检测和会话加载需要 await，不能放在构造函数中。
+    当 MongoDB 不可用时，自动降级为纯内存模式。
+    """
+
+    @classmethod
+    async def create(
+        cls, session_id: str, history: Optional[List[Tuple[str, str]]] = None
+    ) -> "AsyncMongoDBConversationMemory":
+        """创建对话记忆并加载会话
+
+        Args:
+            session_id: 会话 ID
+            history: 客户端提供的对话历史 (用户输入, 回复)，None 表示从数据库加载
+
+        Returns:
+            AsyncMongoDBConversationMemory: 对话记忆
+        """
+        memory = cls(session_id, history)
+        await memory._connect()
+        return memory
+
+    async def _connect(self) -> None:
+        # 获取集合对象不涉及网络；不单独 ping，加载会话的第一次查询失败时再降级
+        try:
+            self.collection = get_async_conversations_collection()
+            self.turns_collection = get_async_conversation_turns_collection()
+        except Exception as e:
+            logger.warning(f"MongoDB 不可用，降级为纯内存模式: {str(e)}")
+            self.mongodb_available = False
+            self.collection = None
+            self.turns_collection = None
+
+        if self.client_history:
+            return
+        if self.mongodb_available:
+            await self._load_or_create_session()
+        else:
+            logger.info(f"创建纯内存会话: {self.session_id}")
+
+    async def _load_or_create_session(self) -> None:
+        """从数据库加载或创建新会话"""
+        try:
+            # 只读取摘要字段和 turn_count，同时检测 MongoDB 是否可用
+            doc = await self.collection.find_one(
+                self._session_filter(), self._SESSION_HISTORY_FIELDS
+            )
+            if doc:
+                self._session_exists = True
+                if self._restore_history(doc):
+                    logger.info(f"从缓存加载会话: {self.session_id}")
+                    return
+                turns, skipped_pairs = await self._find_recent_turns()
+                self._load_history(doc, turns, skipped_pairs)
+                logger.info(
+                    f"加载现有会话: {self.session_id}, "
+                    f"包含最近 {len(turns)} 轮对话"
+                )
+            else:
+                await self.collection.insert_one(self._new_session())
+                self._session_exists = True
+                self._cache_history(0)
+                logger.info(f"创建新会话: {self.session_id}")
+
+        except Exception as e:
+            logger.error(f"加载或创建会话失败，降级为纯内存模式: {str(e)}")
+            self.mongodb_available = False
+
+    async def add_turn(
+        self,
+        user_input: str,
+        final_response: str,
+        agent_steps: Optional[List[AgentStep]] = None,
+        total_tokens: Optional[int] = None,
+        duration_ms: Optional[int] = None,
+        status: str = "completed",
+        **metrics: Any,
+    ) -> None:
+        """添加新的对话轮次
+
+        Args:
+            user_input: 用户输入
+            final_response: 最终回复
+            agent_steps: Agent 执行步骤（完整信息，用于前端展示）
+            total_tokens: 总 token 消耗
+            duration_ms: 总耗时（毫秒）
+            status: 轮次状态 (completed/partial/cancelled)；cancelled 的轮次只持久化，不进入对话历史
+            **metrics: 其他度量字段（prompt_tokens、ttft_ms 等，见 ConversationTurn）
+        """
+        self._remember(user_input, final_response, status)
+        if not self.mongodb_available:
+            logger.debug("MongoDB 不可用，跳过持久化")
+            return
+
+        try:
+            new_turn = self._new_turn(
+                0, user_input, final_response, agent_steps, total_tokens, duration_ms,
+                status, **metrics,
+            )
+            turn_id = await self._push_turn(new_turn)
+            if turn_id is None:
+                return
+            self._cache_turn(turn_id, user_input, final_response, status)
+            logger.info(
+                f"保存对话轮次 {turn_id} 成功，会话 ID: {self.session_id}, "
+                f"包含 {len(agent_steps or [])} 个执行步骤"
+            )
+        except Exception as e:
+            logger.error(f"保存对话轮次失败: {str(e)}")
+
+    async def _ensure_session(self) -> None:
+        """会话文档不存在时创建（无状态模式在首次写入时调用，不覆盖已有会话）"""
+        if self._session_exists:
+            return
+        await self.collection.update_one(
+            self._session_filter(), self._ensure_session_update(), upsert=True
+        )
+        self._session_exists = True
+
+    async def _push_turn(self, turn: ConversationTurn) -> Optional[int]:
+        """原子地分配轮次 ID 并写入轮次，返回轮次 ID；会话不存在时返回 None"""
+        if self.client_history:
+            await self._ensure_session()
+        doc = await self.collection.find_one_and_update(
+            self._session_filter(),
+            self._next_turn_update(),
+            projection={"_id": 0, "turn_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not doc:
+            logger.warning(f"会话不存在: {self.session_id}, 跳过持久化")
+            return None
+        turn.turn_id = doc["turn_count"]
+        await self.turns_collection.insert_one(self._turn_document(turn))
+        return turn.turn_id
+
+    async def _find_recent_turns(self) -> Tuple[List[Dict[str, Any]], int]:
+        """读取最近 history_load_turns 轮的问答字段，返回 (轮次, 未加载的更早问答对数)"""
+        limit = settings.history_load_turns
+        cursor = self.turns_collection.find(self._turns_filter(), self._TURN_HISTORY_FIELDS)
+        turns = await cursor.sort("turn_id", -1).limit(limit).to_list(length=None)
+        turns.reverse()
+        skipped_pairs = 0
+        if len(turns) == limit and turns[0]["turn_id"] > 1:
+            skipped_pairs = await self.turns_collection.count_documents(
+                self._answered_before_filter(turns[0]["turn_id"])
+            )
+        return turns, skipped_pairs
+
+    async def _find_turns(
+        self, after_turn_id: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """按轮次 ID 顺序读取轮次文档"""
+        cursor = self.turns_collection.find(self._turns_filter(after_turn_id)).sort("turn_id", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    # ========== 流式轮次的增量持久化 ==========
+
+    async def begin_turn(self, user_input: str) -> Optional[int]:
+        """开始一轮流式对话：先写入状态为 running 的空轮次，之后逐批追加步骤
+
+        Args:
+            user_input: 用户输入
+
+        Returns:
+            Optional[int]: 轮次 ID；MongoDB 不可用或写入失败时返回 None
+        """
+        if not self.mongodb_available:
+            return None
+
+        try:
+            turn = self._new_turn(0, user_input, "", status="running")
+            turn_id = await self._push_turn(turn)
+            if turn_id is None:
+                return None
+            logger.info(f"开始对话轮次 {turn_id}，会话 ID: {self.session_id}")
+            return turn_id
+        except Exception as e:
+            logger.error(f"开始对话轮次失败: {str(e)}")
+            return None
+
+    async def append_steps(self, turn_id: Optional[int], agent_steps: List[AgentStep]) -> None:
+        """向进行中的轮次追加一批已完成的步骤（一次更新）
+
+        Args:
+            turn_id: begin_turn 返回的轮次 ID
+            agent_steps: 已完成的步骤
+        """
+        if not self.mongodb_available or turn_id is None or not agent_steps:
+            return
+
+        try:
+            await self.turns_collection.update_one(
+                self._turn_filter(turn_id), self._append_steps_update(agent_steps)
+            )
+        except Exception as e:
+            logger.error(f"追加执行步骤失败: {str(e)}")
+
+    async def finish_turn(
+        self,
+        turn_id: Optional[int],
+        user_input: str,
+        final_response: str,
+        agent_steps: Optional[List[AgentStep]] = None,
+        total_tokens: Optional[int] = None,
+        duration_ms: Optional[int] = None,
+        status: str = "completed",
+        **metrics: Any,
+    ) -> None:
+        """结束流式轮次：写入最终回复、状态和度量，追加剩余步骤并按步骤编号排序
+
+        Args:
+            turn_id: begin_turn 返回的轮次 ID（None 时退回 add_turn）
+            user_input: 用户输入
+            final_response: 最终回复
+            agent_steps: 尚未追加的步骤
+            total_tokens: 总 token 消耗
+            duration_ms: 总耗时（毫秒）
+            status: 轮次状态 (completed/partial/cancelled)
+            **metrics: 其他度量字段（见 ConversationTurn）
+        """
+        if turn_id is None:
+            await self.add_turn(
+                user_input, final_response, agent_steps, total_tokens, duration_ms, status, **metrics
+            )
+            return
+
+        self._remember(user_input, final_response, status)
+        if not self.mongodb_available:
+            return
+
+        try:
+            turn = self._new_turn(
+                turn_id, user_input, final_response, None, total_tokens, duration_ms, status,
+                **metrics,
+            )
+            await self.turns_collection.update_one(
+                self._turn_filter(turn_id), self._finish_turn_update(turn, agent_steps)
+            )
+            self._cache_turn(turn_id, user_input, final_response, status)
+            logger.info(f"保存对话轮次 {turn_id} 成功，会话 ID: {self.session_id}")
+        except Exception as e:
+            logger.error(f"保存对话轮次失败: {str(e)}")
+
+    async def update_summary(self, summary: str, summarized_turns: int) -> None:
+        """更新滚动摘要
+
+        Args:
+            summary: 新的摘要内容
+            summarized_turns: 摘要覆盖的轮次数
+        """
+        update = self._set_summary(summary, summarized_turns)
+        if not self.mongodb_available:
+            return
+
+        try:
+            await self.collection.update_one(self._session_filter(), update)
+            logger.info(f"更新对话摘要，会话 ID: {self.session_id}, 覆盖 {summarized_turns} 轮")
+        except Exception as e:
+            logger.error(f"更新对话摘要失败: {str(e)}")
+
+    async def get_turns(
+        self, after_turn_id: int = 0, limit: Optional[int] = None
+    ) -> List[ConversationTurn]:
+        """分页获取轮次（包含 agent steps）
+
+        Args:
+            after_turn_id: 只返回 ID 大于该值的轮次
+            limit: 最多返回的轮次数，None 表示不限制
+
+        Returns:
+            List[ConversationTurn]: 按轮次 ID 排序的轮次
+        """
+        try:
+            turns = await self._find_turns(after_turn_id, limit)
+            return [ConversationTurn(**turn) for turn in turns]
+        except Exception as e:
+            logger.error(f"获取对话轮次失败: {str(e)}")
+            return []
+
+    async def get_full_conversation(self) -> Optional[ConversationDocument]:
+        """获取完整的对话文档（包含所有 agent steps）
+
+        Returns:
+            Optional[ConversationDocument]: 对话文档
+        """
+        try:
+            doc = await self.collection.find_one(self._session_filter())
+            if doc:
+                return self._conversation(doc, await self._find_turns())
+            return None
+        except Exception as e:
+            logger.error(f"获取完整对话失败: {str(e)}")
+            return None
+
+    async def delete_session(self) -> None:
+        """删除整个会话（从数据库删除）"""
+        try:
+            await self.collection.delete_one(self._session_filter())
+            await self.turns_collection.delete_many(self._turns_filter())
+            get_session_cache().invalidate(self.session_id)
+            self.memory.clear()
+            logger.info(f"删除会话: {self.session_id}")
+        except Exception as e:
+            logger.error(f"删除会话失败: {str(e)}")
+            raise
@@ -3,25 +3,56 @@
 基于 LangChain 构建的智能 DevOps 分析 Agent。
 """
 
+import asyncio
+import threading
 import uuid
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from langchain_classic.agents import AgentExecutor, create_react_agent
+from langchain_classic.agents import (
+    AgentExecutor,
+    create_react_agent,
+    create_tool_calling_agent,
+)
 from langchain_openai import ChatOpenAI
 
-from src.agent.mongodb_memory import MongoDBConversationMemory
-from src.agent.prompts import AGENT_PROMPT
+from src.agent.early_dispatch import ReActEarlyDispatcher
+from src.agent.instrumentation import RunMetricsCallbackHandler
+from src.agent.async_mongodb_memory import AsyncMongoDBConversationMemory
+from src.agent.mongodb_memory import ConversationMemoryBase, MongoDBConversationMemory
+from src.agent.prompts import (
+    AGENT_PROMPT,
+    ANALYSIS_SYNTHESIS_PROMPT,
+    HISTORY_SUMMARY_PROMPT,
+    PARTIAL_ANSWER_PROMPT,
+    REPORT_GENERATION_PROMPT,
+    TOOL_CALLING_PROMPT,
+)
+from src.agent.turn_writer import TurnWriter
 from src.config import settings
+from src.models.mongodb_models import AgentStep
 from src.tools.artifactory import ArtifactoryTool
 from src.tools.custom_backend import CustomBackendTool
 from src.tools.gerrit import GerritTool
 from src.tools.jenkins import JenkinsTool
 from src.tools.test_cases import TestCasesTool
 from src.tools.test_coverage import TestCoverageTool
+from src.utils.background import spawn_background
+from src.utils.deadline import Deadline, deadline_scope
+from src.utils.llm_transport import get_llm_transport
 from src.utils.logger import get_logger
+from src.utils.tokens import truncate_to_tokens
 
 logger = get_logger(__name__)
 
+# 兜底回复中附带的已获取数据的 token 上限
+_FALLBACK_OBSERVATION_TOKENS = 1000
+
+# AgentExecutor 达到迭代次数或执行时间上限时返回的固定输出
+_STOPPED_OUTPUTS = (
+    "Agent stopped due to iteration limit or time limit.",
+    "Agent stopped due to max iterations.",
+)
+
 
 class DevOpsAgent:
     """DevOps 项目分析 Agent
@@ -31,6 +62,8 @@ class DevOpsAgent:
 
     def __init__(self):
         """初始化 Agent"""
+        transport = get_llm_transport()
+
         # 初始化 LLM (使用 Deepseek R1，兼容 OpenAI API)
         # 启用流式输出以实现实时响应
         self.llm = ChatOpenAI(
@@ -40,6 +73,10 @@ class DevOpsAgent:
             temperature=0.7,
             max_tokens=2000,
             streaming=True,  # 🔥 关键：启用流式输出
+            stream_usage=True,  # 流式响应中返回 token 用量，用于度量
+            # 共享进程级连接池，复用 keep-alive 连接
+            http_client=transport.client,
+            http_async_client=transport.async_client,
         )
 
         # 初始化所有工具
@@ -53,22 +90,42 @@ class DevOpsAgent:
         ]
 
         # 创建 Agent
-        self.agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=AGENT_PROMPT,
-        )
+        # react: 文本 ReAct 格式，每轮只能调用一个工具
+        # tool_calling: OpenAI 兼容的原生函数调用，单轮可返回多个工具调用，
+        #               AgentExecutor 异步执行时会并发运行它们
+        self.backend = settings.agent_backend
+        if self.backend == "tool_calling":
+            self.agent = create_tool_calling_agent(
+                llm=self.llm,
+                tools=self.tools,
+                prompt=TOOL_CALLING_PROMPT,
+            )
+        else:
+            # stop 序列让模型在输出 Observation 前停止，避免臆造工具结果
+            self.agent = create_react_agent(
+                llm=self.llm,
+                tools=self.tools,
+                prompt=AGENT_PROMPT,
+                stop_sequence=["\nObservation"],
+            )
 
-        logger.info("DevOps Agent 初始化完成")
+        logger.info(f"DevOps Agent 初始化完成，后端: {self.backend}")
 
     def create_executor(
-        self, session_id: Optional[str] = None, max_iterations: int = 10
+        self,
+        session_id: Optional[str] = None,
+        max_iterations: int = 10,
+        max_execution_time: Optional[float] = None,
+        history: Optional[List[Tuple[str, str]]] = None,
     ) -> tuple[AgentExecutor, str, MongoDBConversationMemory]:
         """创建 Agent 执行器
 
         Args:
             session_id: 会话 ID，如果为 None 则生成新的
             max_iterations: 最大迭代次数
+            max_execution_time: 推理循环的最长时间（秒），None 表示不限；
+                异步执行时到时会取消进行中的 LLM 和工具调用
+            history: 客户端提供的对话历史 (用户输入, 回复)；提供时不访问数据库（无状态模式）
 
         Returns:
             tuple: (执行器, 会话ID, 记忆对象)
@@ -78,64 +135,425 @@ class DevOpsAgent:
             session_id = str(uuid.uuid4())
 
         # 创建 MongoDB 持久化记忆
-        memory = MongoDBConversationMemory(session_id=session_id)
+        memory = MongoDBConversationMemory(session_id=session_id, history=history)
+
+        executor = self._build_executor(max_iterations, max_execution_time)
+        logger.info(f"创建 Agent 执行器，会话 ID: {session_id}")
+        return executor, session_id, memory
+
+    async def acreate_executor(
+        self,
+        session_id: Optional[str] = None,
+        max_iterations: int = 10,
+        max_execution_time: Optional[float] = None,
+        history: Optional[List[Tuple[str, str]]] = None,
+    ) -> tuple[AgentExecutor, str, AsyncMongoDBConversationMemory]:
+        """创建 Agent 执行器（异步）：会话记忆通过 Motor 加载，不阻塞事件循环
+
+        参数和返回值同 create_executor，记忆对象为 AsyncMongoDBConversationMemory。
+        """
+        if session_id is None:
+            session_id = str(uuid.uuid4())
 
+        memory = await AsyncMongoDBConversationMemory.create(session_id, history=history)
+
+        executor = self._build_executor(max_iterations, max_execution_time)
+        logger.info(f"创建 Agent 执行器，会话 ID: {session_id}")
+        return executor, session_id, memory
+
+    def _build_executor(
+        self, max_iterations: int, max_execution_time: Optional[float]
+    ) -> AgentExecutor:
         # 创建执行器（不使用 memory 参数，因为与 ReAct agent 不兼容）
-        executor = AgentExecutor(
+        return AgentExecutor(
             agent=self.agent,
             tools=self.tools,
             verbose=True,
             max_iterations=max_iterations,
+            max_execution_time=max_execution_time,
             handle_parsing_errors=True,
         )
 
-        logger.info(f"创建 Agent 执行器，会话 ID: {session_id}")
-        return executor, session_id, memory
+    @staticmethod
+    def loop_budget(deadline: Optional[Deadline]) -> Optional[float]:
+        """推理循环可用的时间：请求剩余时间扣除强制回答的预留时间
+
+        Args:
+            deadline: 请求时限
+
+        Returns:
+            Optional[float]: 秒数，不限时返回 None
+        """
+        if deadline is None:
+            return None
+        return deadline.budget(settings.deadline_answer_reserve_seconds)
+
+    @staticmethod
+    def is_stopped_response(output: str) -> bool:
+        """执行器是否因迭代次数或时间上限被提前停止"""
+        return output in _STOPPED_OUTPUTS
+
+    def _partial_answer_observations(self, metrics: RunMetricsCallbackHandler) -> str:
+        """已完成的工具调用结果"""
+        observations = {
+            f"{step.action}: {step.action_input.get('input', step.action_input)}": step.observation
+            for step in metrics.steps
+            if step.observation is not None
+        }
+        return self._format_observations(observations) if observations else "（无）"
+
+    @staticmethod
+    def _fallback_partial_answer(observations: str) -> str:
+        """强制回答也无法在时限内完成时的兜底回复"""
+        return (
+            "抱歉，未能在时限内完成分析。已获取的数据如下，您可以稍后重试或缩小问题范围：\n\n"
+            + truncate_to_tokens(observations, _FALLBACK_OBSERVATION_TOKENS)
+        )
+
+    def force_final_answer(
+        self,
+        message: str,
+        metrics: RunMetricsCallbackHandler,
+        deadline: Optional[Deadline],
+    ) -> str:
+        """推理循环被提前停止时，基于已获取的工具结果直接生成回答（同步）
+
+        Args:
+            message: 用户消息
+            metrics: 本轮的度量回调（提供已完成的工具调用）
+            deadline: 请求时限
+
+        Returns:
+            str: 最终回答
+        """
+        observations = self._partial_answer_observations(metrics)
+        if deadline is not None and deadline.expired():
+            return self._fallback_partial_answer(observations)
+
+        prompt = PARTIAL_ANSWER_PROMPT.format(input=message, observations=observations)
+        try:
+            result = self.llm.invoke(
+                prompt,
+                config={"callbacks": [metrics]},
+                timeout=deadline.remaining() if deadline else None,
+            )
+            return result.content
+        except Exception as e:
+            logger.error(f"强制生成最终回答失败: {str(e)}")
+            return self._fallback_partial_answer(observations)
+
+    async def aforce_final_answer(
+        self,
+        message: str,
+        metrics: RunMetricsCallbackHandler,
+        deadline: Optional[Deadline],
+        callbacks: Optional[list] = None,
+    ) -> str:
+        """推理循环被提前停止时，基于已获取的工具结果直接生成回答（异步）
+
+        Args:
+            message: 用户消息
+            metrics: 本轮的度量回调（提供已完成的工具调用）
+            deadline: 请求时限
+            callbacks: LLM 调用的回调（流式接口传入流式回调以逐字输出）
+
+        Returns:
+            str: 最终回答
+        """
+        observations = self._partial_answer_observations(metrics)
+        if deadline is not None and deadline.expired():
+            return self._fallback_partial_answer(observations)
+
+        prompt = PARTIAL_ANSWER_PROMPT.format(input=message, observations=observations)
+        try:
+            result = await asyncio.wait_for(
+                self.llm.ainvoke(prompt, config={"callbacks": callbacks or [metrics]}),
+                timeout=deadline.remaining() if deadline else None,
+            )
+            return result.content
+        except Exception as e:
+            logger.error(f"强制生成最终回答失败: {str(e) or type(e).__name__}")
+            return self._fallback_partial_answer(observations)
+
+    def create_early_dispatcher(self) -> Optional[ReActEarlyDispatcher]:
+        """创建 ReAct 工具提前调度回调（仅用于异步流式执行）
+
+        Returns:
+            Optional[ReActEarlyDispatcher]: 当前后端不支持或未启用时返回 None
+        """
+        if self.backend == "tool_calling" or not settings.react_early_dispatch:
+            return None
+        return ReActEarlyDispatcher(self.tools)
 
-    def chat(self, message: str, session_id: Optional[str] = None) -> dict:
+    def build_chat_history(self, memory: ConversationMemoryBase) -> str:
+        """构建注入 Prompt 的对话历史（滚动摘要 + 最近 N 轮，受 token 预算限制）
+
+        Args:
+            memory: 会话记忆
+
+        Returns:
+            str: 对话历史文本
+        """
+        return memory.build_history(
+            recent_turns=settings.history_recent_turns,
+            token_budget=settings.history_token_budget,
+        )
+
+    def _build_summary_job(self, memory: ConversationMemoryBase) -> Optional[Tuple[str, int]]:
+        """构建摘要增量更新任务
+
+        只有窗口外未摘要的轮次累计达到 history_summary_batch 时才需要更新。
+
+        Returns:
+            Optional[Tuple[str, int]]: (摘要 Prompt, 更新后摘要覆盖的轮次数)，无需更新时返回 None
+        """
+        # 无状态模式的历史由客户端提供，不维护服务端摘要
+        if memory.client_history:
+            return None
+        pending = memory.get_turns_to_summarize(settings.history_recent_turns)
+        if not pending or len(pending) < settings.history_summary_batch:
+            return None
+
+        new_turns = "\n\n".join(
+            f"用户: {user_input}\n助手: {truncate_to_tokens(response, settings.history_summary_max_tokens)}"
+            for user_input, response in pending
+        )
+        prompt = HISTORY_SUMMARY_PROMPT.format(
+            summary=memory.summary or "（无）",
+            new_turns=new_turns,
+            max_tokens=settings.history_summary_max_tokens,
+        )
+        return prompt, memory.summarized_turns + len(pending)
+
+    def refresh_history_summary(self, memory: MongoDBConversationMemory) -> None:
+        """增量更新会话的滚动摘要（同步）
+
+        Args:
+            memory: 会话记忆
+        """
+        job = self._build_summary_job(memory)
+        if job is None:
+            return
+
+        prompt, summarized_turns = job
+        try:
+            message = self.llm.invoke(prompt, max_tokens=settings.history_summary_max_tokens)
+            memory.update_summary(message.content.strip(), summarized_turns)
+        except Exception as e:
+            logger.error(f"更新对话摘要失败: {str(e)}")
+
+    async def arefresh_history_summary(self, memory: AsyncMongoDBConversationMemory) -> None:
+        """增量更新会话的滚动摘要（异步）
+
+        Args:
+            memory: 会话记忆
+        """
+        job = self._build_summary_job(memory)
+        if job is None:
+            return
+
+        prompt, summarized_turns = job
+        try:
+            message = await self.llm.ainvoke(prompt, max_tokens=settings.history_summary_max_tokens)
+            await memory.update_summary(message.content.strip(), summarized_turns)
+        except Exception as e:
+            logger.error(f"更新对话摘要失败: {str(e)}")
+
+    def save_turn(
+        self,
+        memory: MongoDBConversationMemory,
+        message: str,
+        agent_response: str,
+        metrics: RunMetricsCallbackHandler,
+        status: str = "completed",
+    ) -> None:
+        """保存一轮对话，步骤和度量来自度量回调
+
+        Args:
+            memory: 会话记忆
+            message: 用户消息
+            agent_response: 最终回复
+            metrics: 本轮的度量回调
+            status: 轮次状态 (completed/partial/cancelled)
+        """
+        turn_metrics = metrics.turn_metrics()
+        memory.add_turn(
+            user_input=message,
+            final_response=agent_response,
+            agent_steps=metrics.agent_steps,
+            status=status,
+            **turn_metrics,
+        )
+        self._log_turn_metrics(turn_metrics, status)
+
+    @staticmethod
+    def _log_turn_metrics(turn_metrics: Dict[str, Any], status: str) -> None:
+        logger.info(
+            f"本轮度量 ({status}): tokens={turn_metrics['total_tokens']} "
+            f"(reasoning={turn_metrics['reasoning_tokens']}), "
+            f"LLM 调用 {turn_metrics['llm_calls']} 次 {turn_metrics['llm_duration_ms']}ms, "
+            f"工具 {turn_metrics['tool_duration_ms']}ms, 首 token {turn_metrics['ttft_ms']}ms, "
+            f"总耗时 {turn_metrics['duration_ms']}ms"
+        )
+
+    async def asave_turn(
+        self,
+        memory: AsyncMongoDBConversationMemory,
+        message: str,
+        agent_response: str,
+        metrics: RunMetricsCallbackHandler,
+        status: str = "completed",
+        writer: Optional[TurnWriter] = None,
+        background_summary: bool = False,
+    ) -> None:
+        """异步保存一轮对话并增量更新摘要
+
+        Args:
+            memory: 会话记忆
+            message: 用户消息
+            agent_response: 最终回复
+            metrics: 本轮的度量回调
+            status: 轮次状态 (completed/partial/cancelled)
+            writer: 本轮的增量写入器；传入时只补写最终回复、剩余步骤和度量
+            background_summary: 摘要更新放到后台任务中进行，不等待其完成
+        """
+        turn_metrics = metrics.turn_metrics()
+        if writer is not None:
+            await writer.finish(agent_response, metrics, status)
+        else:
+            await memory.add_turn(
+                user_input=message,
+                final_response=agent_response,
+                agent_steps=metrics.agent_steps,
+                status=status,
+                **turn_metrics,
+            )
+        self._log_turn_metrics(turn_metrics, status)
+        if status == "cancelled":
+            return
+        if not background_summary:
+            await self.arefresh_history_summary(memory)
+        elif self._build_summary_job(memory) is not None:
+            spawn_background(
+                self.arefresh_history_summary(memory), name=f"refresh_summary:{memory.session_id}"
+            )
+
+    def chat(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
         """对话接口
 
         Args:
             message: 用户消息
             session_id: 会话 ID
+            deadline: 请求时限；到时停止推理循环，基于已获取的数据生成回答
 
         Returns:
-            dict: 包含响应和会话 ID
+            dict: 包含响应、会话 ID 和是否为部分回答（partial）
         """
         logger.info(f"收到用户消息: {message}, 会话 ID: {session_id}")
 
+        # 度量回调：记录每个步骤和本轮的 token 与耗时
+        metrics = RunMetricsCallbackHandler()
+
         try:
-            # 创建执行器
-            executor, session_id, memory = self.create_executor(session_id)
-
-            # 执行查询
-            response = executor.invoke({"input": message})
-
-            # 提取响应
-            agent_response = response.get("output", "抱歉，我无法处理这个请求。")
-
-            # 提取中间步骤（包含所有 Thought/Action/Observation）
-            intermediate_steps = response.get("intermediate_steps", [])
-
-            # 转换为 AgentStep 格式
-            from src.models.mongodb_models import AgentStep
-            agent_steps = []
-            for i, (action, observation) in enumerate(intermediate_steps, 1):
-                agent_steps.append(
-                    AgentStep(
-                        step_number=i,
-                        thought=action.log,
-                        action=action.tool,
-                        action_input=action.tool_input if isinstance(action.tool_input, dict) else {"input": action.tool_input},
-                        observation=observation,
-                    )
+            with deadline_scope(deadline):
+                # 创建执行器
+                executor, session_id, memory = self.create_executor(
+                    session_id, max_execution_time=self.loop_budget(deadline)
                 )
 
-            # 保存对话（包含完整的执行步骤）
-            memory.add_turn(
-                user_input=message,
-                final_response=agent_response,
-                agent_steps=agent_steps,
+                # 执行查询（注入受 token 预算限制的对话历史）
+                response = executor.invoke(
+                    {"input": message, "chat_history": self.build_chat_history(memory)},
+                    config={"callbacks": [metrics]},
+                )
+
+                # 提取响应；推理循环被提前停止时基于已获取的数据强制作答
+                agent_response = response.get("output", "抱歉，我无法处理这个请求。")
+                partial = self.is_stopped_response(agent_response)
+                if partial:
+                    agent_response = self.force_final_answer(message, metrics, deadline)
+            metrics.finish()
+
+            # 保存对话（包含完整的执行步骤和度量）
+            self.save_turn(
+                memory, message, agent_response, metrics, status="partial" if partial else "completed"
+            )
+
+            # 摘要更新不影响本次响应，在后台线程中进行
+            if self._build_summary_job(memory) is not None:
+                threading.Thread(
+                    target=self.refresh_history_summary, args=(memory,), daemon=True
+                ).start()
+
+            logger.info(f"Agent 响应生成成功，会话 ID: {session_id}")
+
+            return {
+                "response": agent_response,
+                "session_id": session_id,
+                "success": True,
+                "partial": partial,
+            }
+
+        except Exception as e:
+            logger.error(f"Agent 执行失败: {str(e)}")
+            return {
+                "response": f"抱歉，处理您的请求时出现错误: {str(e)}",
+                "session_id": session_id,
+                "success": False,
+                "error": str(e),
+            }
+
+    async def achat(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
+        """对话接口（异步）
+
+        与 chat 行为一致，但 Agent 以协程执行、会话记忆通过 Motor 读写，
+        整个请求不阻塞事件循环。摘要更新在后台任务中进行。
+
+        Args:
+            message: 用户消息
+            session_id: 会话 ID
+            deadline: 请求时限；到时停止推理循环，基于已获取的数据生成回答
+
+        Returns:
+            dict: 包含响应、会话 ID 和是否为部分回答（partial）
+        """
+        logger.info(f"收到用户消息: {message}, 会话 ID: {session_id}")
+
+        metrics = RunMetricsCallbackHandler()
+
+        try:
+            with deadline_scope(deadline):
+                executor, session_id, memory = await self.acreate_executor(
+                    session_id, max_execution_time=self.loop_budget(deadline)
+                )
+                response = await executor.ainvoke(
+                    {"input": message, "chat_history": self.build_chat_history(memory)},
+                    config={"callbacks": [metrics]},
+                )
+                agent_response = response.get("output", "抱歉，我无法处理这个请求。")
+                partial = self.is_stopped_response(agent_response)
+                if partial:
+                    agent_response = await self.aforce_final_answer(message, metrics, deadline)
+            metrics.finish()
+
+            # 摘要更新不影响本次响应，在后台任务中进行
+            await self.asave_turn(
+                memory,
+                message,
+                agent_response,
+                metrics,
+                status="partial" if partial else "completed",
+                background_summary=True,
             )
 
             logger.info(f"Agent 响应生成成功，会话 ID: {session_id}")
@@ -144,6 +562,7 @@ class DevOpsAgent:
                 "response": agent_response,
                 "session_id": session_id,
                 "success": True,
+                "partial": partial,
             }
 
         except Exception as e:
@@ -155,16 +574,22 @@ class DevOpsAgent:
                 "error": str(e),
             }
 
-    def analyze_project(self, project_name: str) -> dict:
+    def analyze_project(self, project_name: str, deadline: Optional[Deadline] = None) -> dict:
         """分析项目整体状况
 
         Args:
             project_name: 项目名称
+            deadline: 请求时限
 
         Returns:
             dict: 分析结果
         """
-        analysis_prompt = f"""请对项目 "{project_name}" 进行全面分析，包括：
+        return self.chat(self._analysis_prompt(project_name), deadline=deadline)
+
+    @staticmethod
+    def _analysis_prompt(project_name: str) -> str:
+        """ReAct 模式下项目分析的用户消息"""
+        return f"""请对项目 "{project_name}" 进行全面分析，包括：
 
 1. 测试覆盖率情况
 2. 测试用例执行情况
@@ -176,7 +601,231 @@ class DevOpsAgent:
 请提供一个综合性的项目健康报告。
 """
 
-        return self.chat(analysis_prompt)
+    def _prefetch_queries(self, project_name: str) -> Dict[str, str]:
+        """构建并行预取时各工具的查询参数
+
+        Args:
+            project_name: 项目名称
+
+        Returns:
+            Dict[str, str]: 工具名称 -> 查询参数
+        """
+        return {
+            "test_coverage": project_name,
+            "test_cases": project_name,
+            "gerrit": project_name,
+            "jenkins": project_name,
+            "artifactory": project_name,
+            "custom_backend": f"metrics:project={project_name}",
+        }
+
+    async def prefetch_project_data(
+        self, project_name: str, callbacks: Optional[list] = None
+    ) -> Dict[str, str]:
+        """并行获取项目的全部数据源
+
+        六个工具通过 asyncio.gather 同时执行，总耗时取决于最慢的数据源。
+
+        Args:
+            project_name: 项目名称
+            callbacks: 工具调用的回调（如度量回调）
+
+        Returns:
+            Dict[str, str]: 工具名称 -> 工具返回结果（Observation）
+        """
+        tools = {tool.name: tool for tool in self.tools}
+        queries = self._prefetch_queries(project_name)
+
+        results = await asyncio.gather(
+            *(
+                tools[name].ainvoke(query, config={"callbacks": callbacks or []})
+                for name, query in queries.items()
+            ),
+            return_exceptions=True,
+        )
+
+        observations = {}
+        for name, result in zip(queries, results):
+            if isinstance(result, Exception):
+                logger.error(f"预取 {name} 失败: {str(result)}")
+                result = f"错误: {str(result)}"
+            observations[name] = result
+        return observations
+
+    async def _synthesize(
+        self,
+        prompt: str,
+        user_input: str,
+        queries: Dict[str, str],
+        observations: Dict[str, str],
+        metrics: RunMetricsCallbackHandler,
+        session_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        partial: bool = False,
+    ) -> dict:
+        """基于预取数据进行单次 LLM 汇总，并保存对话
+
+        Args:
+            prompt: 完整的汇总 Prompt
+            user_input: 记录到会话中的用户输入
+            queries: 各工具的查询参数
+            observations: 各工具的返回结果
+            metrics: 度量回调（预取阶段已记录工具耗时）
+            session_id: 会话 ID
+            deadline: 请求时限，LLM 调用不超过剩余时间
+            partial: 预取阶段是否有数据源因时限未返回
+
+        Returns:
+            dict: 与 chat 相同结构的结果
+        """
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+
+        try:
+            message = await asyncio.wait_for(
+                self.llm.ainvoke(prompt, config={"callbacks": [metrics]}),
+                timeout=deadline.remaining() if deadline else None,
+            )
+            agent_response = message.content
+            metrics.finish()
+
+            # 预取的每个数据源记为一个执行步骤
+            agent_steps = [
+                AgentStep(
+                    step_number=i,
+                    thought="并行预取项目数据",
+                    action=name,
+                    action_input={"input": queries[name]},
+                    observation=observation,
+                    duration_ms=metrics.tool_durations.get(name),
+                    tool_duration_ms=metrics.tool_durations.get(name),
+                )
+                for i, (name, observation) in enumerate(observations.items(), 1)
+            ]
+            turn_metrics = metrics.turn_metrics()
+            # 并行执行时工具总耗时以墙钟计（取最慢的数据源）
+            turn_metrics["tool_duration_ms"] = max(metrics.tool_durations.values(), default=0)
+
+            memory = await AsyncMongoDBConversationMemory.create(session_id)
+            await memory.add_turn(
+                user_input=user_input,
+                final_response=agent_response,
+                agent_steps=agent_steps,
+                status="partial" if partial else "completed",
+                **turn_metrics,
+            )
+
+            logger.info(f"预取模式分析完成，会话 ID: {session_id}")
+
+            return {
+                "response": agent_response,
+                "session_id": session_id,
+                "success": True,
+                "partial": partial,
+            }
+
+        except Exception as e:
+            logger.error(f"预取模式分析失败: {str(e) or type(e).__name__}")
+            return {
+                "response": f"抱歉，处理您的请求时出现错误: {str(e)}",
+                "session_id": session_id,
+                "success": False,
+                "error": str(e),
+            }
+
+    @staticmethod
+    def _format_observations(observations: Dict[str, str]) -> str:
+        """将预取结果拼接为 Prompt 中的数据段落"""
+        return "\n\n".join(
+            f"### {name}\n{observation}" for name, observation in observations.items()
+        )
+
+    async def _prefetch_within(
+        self, project_name: str, metrics: RunMetricsCallbackHandler, deadline: Optional[Deadline]
+    ) -> Tuple[Dict[str, str], bool]:
+        """在推理预算内并行预取，超时的数据源记为错误
+
+        Returns:
+            Tuple[Dict[str, str], bool]: (各工具结果, 是否有数据源因时限未返回)
+        """
+        budget = self.loop_budget(deadline)
+        prefetch_deadline = Deadline(budget) if budget is not None else None
+        with deadline_scope(prefetch_deadline):
+            observations = await self.prefetch_project_data(project_name, callbacks=[metrics])
+        partial = prefetch_deadline is not None and prefetch_deadline.expired()
+        return observations, partial
+
+    async def aanalyze_project(
+        self, project_name: str, deadline: Optional[Deadline] = None
+    ) -> dict:
+        """分析项目整体状况（异步）
+
+        prefetch 模式下并行获取全部数据源后只调用一次 LLM；
+        react 模式下沿用 analyze_project 的 ReAct 逐步分析。
+
+        Args:
+            project_name: 项目名称
+            deadline: 请求时限
+
+        Returns:
+            dict: 分析结果
+        """
+        if settings.analysis_mode != "prefetch":
+            return await self.achat(self._analysis_prompt(project_name), deadline=deadline)
+
+        metrics = RunMetricsCallbackHandler()
+        queries = self._prefetch_queries(project_name)
+        observations, partial = await self._prefetch_within(project_name, metrics, deadline)
+        prompt = ANALYSIS_SYNTHESIS_PROMPT.format(
+            project_name=project_name,
+            observations=self._format_observations(observations),
+        )
+        return await self._synthesize(
+            prompt,
+            user_input=f"分析项目 {project_name}",
+            queries=queries,
+            observations=observations,
+            metrics=metrics,
+            deadline=deadline,
+            partial=partial,
+        )
+
+    async def agenerate_report(
+        self, project_name: str, report_type: str, deadline: Optional[Deadline] = None
+    ) -> dict:
+        """生成项目报告（异步）
+
+        Args:
+            project_name: 项目名称
+            report_type: 报告类型 (daily/weekly/monthly)
+            deadline: 请求时限
+
+        Returns:
+            dict: 报告生成结果
+        """
+        if settings.analysis_mode != "prefetch":
+            report_prompt = (
+                f"请为项目 {project_name} 生成一份{report_type}报告，包括关键指标、问题分析和改进建议。"
+            )
+            return await self.achat(report_prompt, None, deadline)
+
+        metrics = RunMetricsCallbackHandler()
+        queries = self._prefetch_queries(project_name)
+        observations, partial = await self._prefetch_within(project_name, metrics, deadline)
+        prompt = REPORT_GENERATION_PROMPT.format(
+            report_type=report_type,
+            project_name=project_name,
+            data_summary=self._format_observations(observations),
+        )
+        return await self._synthesize(
+            prompt,
+            user_input=f"生成项目 {project_name} 的{report_type}报告",
+            queries=queries,
+            observations=observations,
+            metrics=metrics,
+            deadline=deadline,
+            partial=partial,
+        )
 
     def get_tool_list(self) -> List[dict]:
         """获取可用工具列表
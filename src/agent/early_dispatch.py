@@ -0,0 +1,154 @@
+"""ReAct 工具提前调度
+
+在 LLM 仍在流式输出时识别完整的 Action + Action Input，立即启动工具调用。
+
+工具结果经过共享的 ToolResultCache：提前启动的调用登记为进行中的请求，
+AgentExecutor 解析完整输出后再调用同一工具时会合并到这次调用上，
+因此工具执行与 LLM 输出尾部、输出解析重叠，且不会重复请求后端。
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from src.tools.base import DevOpsBaseTool
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 与 ReActSingleInputOutputParser 保持一致的动作匹配规则
+ACTION_REGEX = re.compile(
+    r"Action\s*\d*\s*:[\s]*(.*?)[\s]*Action\s*\d*\s*Input\s*\d*\s*:[\s]*(.*)", re.DOTALL
+)
+FINAL_ANSWER_MARKER = "Final Answer:"
+OBSERVATION_MARKER = "Observation"
+
+
+class ReActEarlyDispatcher(AsyncCallbackHandler):
+    """ReAct 工具提前调度回调
+
+    每次 LLM 调用最多提前启动一次工具（ReAct 每轮只有一个 Action）。
+    只对启用了结果缓存的工具生效，否则提前调用无法与执行器的调用合并。
+    """
+
+    def __init__(self, tools: List[DevOpsBaseTool]):
+        """初始化调度器
+
+        Args:
+            tools: 可调度的工具列表
+        """
+        self.tools = {tool.name: tool for tool in tools}
+        self._buffers: Dict[UUID, str] = {}
+        self._dispatched: set = set()
+        self.tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def parse_action(text: str, complete: bool) -> Optional[tuple[str, str]]:
+        """从已输出的文本中解析完整的工具调用
+
+        Args:
+            text: 当前 LLM 调用已输出的文本
+            complete: LLM 输出是否已结束
+
+        Returns:
+            Optional[tuple[str, str]]: (工具名, 工具输入)，尚不完整时返回 None
+        """
+        if FINAL_ANSWER_MARKER in text:
+            return None
+
+        match = ACTION_REGEX.search(text)
+        if not match:
+            return None
+
+        action = match.group(1).strip()
+        action_input = match.group(2)
+
+        # Observation 之后是模型臆造的内容（正常情况下已被 stop 序列截断）
+        cut = action_input.find(OBSERVATION_MARKER)
+        if cut >= 0:
+            action_input = action_input[:cut]
+            complete = True
+
+        if not complete:
+            # 输入以换行结束才算完整；JSON 输入可能跨行，必须能完整解析
+            if "\n" not in action_input:
+                return None
+            candidate = action_input.strip()
+            if candidate.startswith(("{", "[")):
+                try:
+                    json.loads(candidate)
+                except ValueError:
+                    return None
+            elif action_input.split("\n", 1)[1].strip():
+                # 换行后还有非空内容，说明输入可能是多行文本，等待输出结束
+                return None
+
+        tool_input = action_input.strip().strip('"')
+        if not action or not tool_input:
+            return None
+        return action, tool_input
+
+    def _try_dispatch(self, run_id: UUID, complete: bool) -> None:
+        """尝试为指定 LLM 调用启动工具"""
+        if run_id in self._dispatched:
+            return
+
+        parsed = self.parse_action(self._buffers.get(run_id, ""), complete)
+        if parsed is None:
+            return
+
+        action, tool_input = parsed
+        tool = self.tools.get(action)
+        if tool is None or tool._effective_cache_ttl() <= 0:
+            self._dispatched.add(run_id)
+            return
+
+        self._dispatched.add(run_id)
+        logger.info(f"提前调度工具: {action}, 输入: {tool_input}")
+        self.tasks.append(asyncio.create_task(self._prefetch(tool, tool_input)))
+
+    @staticmethod
+    async def _prefetch(tool: DevOpsBaseTool, tool_input: str) -> None:
+        """执行提前调用，结果写入共享缓存"""
+        try:
+            await tool._afetch(tool_input)
+        except Exception as e:
+            # 执行器随后的正式调用会重新获取并按原逻辑返回错误
+            logger.warning(f"提前调度工具 {tool.name} 失败: {str(e)}")
+
+    async def on_llm_new_token(
+        self,
+        token: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """累积 content token，遇到换行时检查动作是否完整"""
+        if run_id in self._dispatched or not token:
+            return
+        self._buffers[run_id] = self._buffers.get(run_id, "") + token
+        if "\n" in token:
+            self._try_dispatch(run_id, complete=False)
+
+    async def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """LLM 输出结束，按完整文本做最后一次检查"""
+        if run_id in self._buffers:
+            self._try_dispatch(run_id, complete=True)
+        self._buffers.pop(run_id, None)
+        self._dispatched.discard(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """LLM 调用失败，清理状态"""
+        self._buffers.pop(run_id, None)
+        self._dispatched.discard(run_id)
+
+    def cancel_pending(self) -> None:
+        """取消尚未完成的提前调用（流式请求结束时调用）"""
+        for task in self.tasks:
+            if not task.done():
+                task.cancel()
+        self.tasks.clear()
@@ -0,0 +1,252 @@
+"""Agent 执行度量
+
+基于 LangChain 回调采集每个步骤和每轮对话的 token 消耗与耗时：
+prompt/completion/reasoning tokens、LLM 耗时、工具耗时、首 token 延迟和总耗时。
+采集结果直接转换为 AgentStep 和 ConversationTurn 的字段。
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.models.mongodb_models import AgentStep
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _ms(seconds: float) -> int:
+    """秒转毫秒"""
+    return int(round(seconds * 1000))
+
+
+@dataclass
+class LLMCallMetrics:
+    """单次 LLM 调用的度量"""
+
+    started_at: float
+    ttft_ms: Optional[int] = None
+    duration_ms: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reasoning_tokens: int = 0
+
+
+@dataclass
+class StepMetrics:
+    """单个 Agent 步骤（一次工具调用）的度量"""
+
+    step_number: int
+    thought: str
+    action: str
+    action_input: Dict[str, Any]
+    llm_calls: List[LLMCallMetrics] = field(default_factory=list)
+    tool_run_id: Optional[UUID] = None
+    tool_duration_ms: Optional[int] = None
+    observation: Optional[str] = None
+
+    @property
+    def llm_duration_ms(self) -> int:
+        return sum(call.duration_ms for call in self.llm_calls)
+
+    def to_agent_step(self) -> AgentStep:
+        """转换为 MongoDB 的 AgentStep"""
+        tool_ms = self.tool_duration_ms or 0
+        return AgentStep(
+            step_number=self.step_number,
+            thought=self.thought,
+            action=self.action,
+            action_input=self.action_input,
+            observation=self.observation,
+            duration_ms=self.llm_duration_ms + tool_ms,
+            llm_duration_ms=self.llm_duration_ms,
+            tool_duration_ms=self.tool_duration_ms,
+            ttft_ms=self.llm_calls[0].ttft_ms if self.llm_calls else None,
+            prompt_tokens=sum(call.prompt_tokens for call in self.llm_calls),
+            completion_tokens=sum(call.completion_tokens for call in self.llm_calls),
+            reasoning_tokens=sum(call.reasoning_tokens for call in self.llm_calls),
+        )
+
+
+class RunMetricsCallbackHandler(BaseCallbackHandler):
+    """Agent 执行度量回调
+
+    同步（invoke）和异步（ainvoke）执行均可使用；回调只做计时和计数，
+    以 run_inline 方式在事件循环中直接执行，不占用线程池。
+
+    LLM 调用的度量归属于紧随其后的 Agent 动作；一次 LLM 调用返回多个
+    并行工具调用时，度量只计入第一个动作，避免重复统计。
+    """
+
+    run_inline = True
+
+    def __init__(self, on_step_complete: Optional[Callable[[AgentStep], None]] = None):
+        """初始化度量回调
+
+        Args:
+            on_step_complete: 步骤完成（工具返回结果）时的回调，参数为带度量的 AgentStep
+        """
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.on_step_complete = on_step_complete
+
+        self._llm_runs: Dict[UUID, LLMCallMetrics] = {}
+        self.llm_calls: List[LLMCallMetrics] = []
+        self._unassigned_llm_calls: List[LLMCallMetrics] = []
+        self.steps: List[StepMetrics] = []
+        self._tool_runs: Dict[UUID, tuple[str, float]] = {}
+        # 工具名 -> 最近一次调用耗时（也用于不经过 Agent 动作的直接工具调用）
+        self.tool_durations: Dict[str, int] = {}
+
+    # ========== LLM ==========
+
+    def _start_llm(self, run_id: UUID) -> None:
+        self._llm_runs[run_id] = LLMCallMetrics(started_at=time.perf_counter())
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_llm(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_llm(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        call = self._llm_runs.get(run_id)
+        if call is None or call.ttft_ms is not None:
+            return
+        now = time.perf_counter()
+        call.ttft_ms = _ms(now - call.started_at)
+        if self.first_token_at is None:
+            self.first_token_at = now
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        call = self._llm_runs.pop(run_id, None)
+        if call is None:
+            return
+        call.duration_ms = _ms(time.perf_counter() - call.started_at)
+        self._record_usage(call, response)
+        self.llm_calls.append(call)
+        self._unassigned_llm_calls.append(call)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        call = self._llm_runs.pop(run_id, None)
+        if call is not None:
+            call.duration_ms = _ms(time.perf_counter() - call.started_at)
+            self.llm_calls.append(call)
+
+    @staticmethod
+    def _record_usage(call: LLMCallMetrics, response: LLMResult) -> None:
+        """从 LLM 结果中提取 token 用量
+
+        流式调用（stream_usage=True）的用量在 message.usage_metadata 中，
+        非流式调用在 llm_output["token_usage"] 中。
+        """
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    call.prompt_tokens += usage.get("input_tokens", 0)
+                    call.completion_tokens += usage.get("output_tokens", 0)
+                    details = usage.get("output_token_details") or {}
+                    call.reasoning_tokens += details.get("reasoning", 0)
+        if call.prompt_tokens or call.completion_tokens:
+            return
+
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        call.prompt_tokens = token_usage.get("prompt_tokens", 0)
+        call.completion_tokens = token_usage.get("completion_tokens", 0)
+        details = token_usage.get("completion_tokens_details") or {}
+        call.reasoning_tokens = details.get("reasoning_tokens", 0) or 0
+
+    # ========== Agent 步骤 ==========
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        tool_input = action.tool_input
+        step = StepMetrics(
+            step_number=len(self.steps) + 1,
+            thought=action.log,
+            action=action.tool,
+            action_input=tool_input if isinstance(tool_input, dict) else {"input": tool_input},
+            llm_calls=self._unassigned_llm_calls,
+        )
+        self._unassigned_llm_calls = []
+        self.steps.append(step)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        tool_name = serialized.get("name") if serialized else kwargs.get("name")
+        now = time.perf_counter()
+        self._tool_runs[run_id] = (tool_name, now)
+        for step in self.steps:
+            if step.tool_run_id is None and step.action == tool_name:
+                step.tool_run_id = run_id
+                return
+
+    def _find_step(self, run_id: UUID) -> Optional[StepMetrics]:
+        for step in reversed(self.steps):
+            if step.tool_run_id == run_id:
+                return step
+        return None
+
+    def _finish_tool(self, run_id: UUID, observation: str) -> None:
+        tool_run = self._tool_runs.pop(run_id, None)
+        if tool_run is None:
+            return
+        tool_name, started_at = tool_run
+        duration_ms = _ms(time.perf_counter() - started_at)
+        self.tool_durations[tool_name] = duration_ms
+
+        step = self._find_step(run_id)
+        if step is None:
+            return
+        step.tool_duration_ms = duration_ms
+        step.observation = observation
+        if self.on_step_complete is not None:
+            try:
+                self.on_step_complete(step.to_agent_step())
+            except Exception as e:
+                logger.error(f"步骤完成回调失败: {str(e)}")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id, output if isinstance(output, str) else str(output))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id, f"错误: {str(error)}")
+
+    # ========== 汇总 ==========
+
+    def finish(self) -> None:
+        """标记本轮结束（重复调用只记录第一次）"""
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+
+    @property
+    def agent_steps(self) -> List[AgentStep]:
+        """所有步骤（含度量）"""
+        return [step.to_agent_step() for step in self.steps]
+
+    def turn_metrics(self) -> Dict[str, Any]:
+        """本轮汇总度量，字段与 ConversationTurn 一致
+
+        Returns:
+            Dict[str, Any]: 可直接传给 add_turn 的度量字段
+        """
+        finished_at = self.finished_at or time.perf_counter()
+        prompt_tokens = sum(call.prompt_tokens for call in self.llm_calls)
+        completion_tokens = sum(call.completion_tokens for call in self.llm_calls)
+        return {
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "reasoning_tokens": sum(call.reasoning_tokens for call in self.llm_calls),
+            "llm_calls": len(self.llm_calls),
+            "llm_duration_ms": sum(call.duration_ms for call in self.llm_calls),
+            "tool_duration_ms": sum(step.tool_duration_ms or 0 for step in self.steps),
+            "ttft_ms": (
+                _ms(self.first_token_at - self.started_at) if self.first_token_at else None
+            ),
+            "duration_ms": _ms(finished_at - self.started_at),
+        }
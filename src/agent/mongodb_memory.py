@@ -1,61 +1,392 @@
 """MongoDB 对话记忆管理
 
 使用 MongoDB 存储和管理对话历史。
+
+会话文档（conversations 集合）只保存元数据、滚动摘要和轮次计数器，轮次逐条保存在
+conversation_turns 集合中（按 (session_id, turn_id) 索引），读写开销取决于访问的轮次，
+与会话的历史长度无关，长会话也不会触及单个文档 16 MB 的上限。
+
+与数据库访问方式无关的逻辑（对话历史、滚动摘要、查询和更新文档的构造）在
+ConversationMemoryBase 中，同步实现（pymongo，本模块）和异步实现
+（Motor，async_mongodb_memory）只负责执行数据库操作。
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_classic.memory import ConversationBufferMemory
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage
+from pymongo import ReturnDocument
 
-from src.models.mongodb import get_conversations_collection
+from src.agent.session_cache import get_session_cache
+from src.config import settings
+from src.models.mongodb import get_conversation_turns_collection, get_conversations_collection
 from src.models.mongodb_models import (
     ConversationDocument,
     ConversationTurn,
     AgentStep,
 )
 from src.utils.logger import get_logger
+from src.utils.tokens import estimate_tokens, truncate_to_tokens
 
 logger = get_logger(__name__)
 
 
-class MongoDBConversationMemory:
+class ConversationMemoryBase:
+    """对话记忆的公共逻辑（不访问数据库）
+
+    维护 LangChain Memory 中的问答历史和滚动摘要状态，并构造 MongoDB 的查询和更新文档。
+
+    无状态模式（传入 history）：信任客户端提供的对话历史，初始化时不访问数据库，
+    会话文档在首次写入时按需创建，轮次仍写入 MongoDB。
+    """
+
+    def __init__(self, session_id: str, history: Optional[List[Tuple[str, str]]] = None):
+        """初始化对话记忆
+
+        Args:
+            session_id: 会话 ID
+            history: 客户端提供的对话历史 (用户输入, 回复)，None 表示从数据库加载
+        """
+        self.session_id = session_id
+        self.mongodb_available = True  # MongoDB 可用性标记
+        self.collection = None
+        self.turns_collection = None
+        self.client_history = history is not None
+        self._session_exists = False  # 会话文档是否已确认存在
+        self._pair_offset = 0  # 未加载到 Memory 的更早问答对数
+
+        # 滚动摘要状态
+        self.summary: Optional[str] = None
+        self.summarized_turns = 0
+
+        # 创建 LangChain Memory 对象
+        self.memory = ConversationBufferMemory(
+            memory_key="chat_history",
+            return_messages=True,
+        )
+
+        if history is not None:
+            for user_input, response in history:
+                self.memory.chat_memory.add_user_message(user_input)
+                self.memory.chat_memory.add_ai_message(response)
+            logger.info(f"使用客户端提供的 {len(history)} 轮对话历史: {self.session_id}")
+
+    # ========== 对话历史 ==========
+
+    # 加载对话历史只读取的字段：agent_steps 不传输，也不做 Pydantic 校验
+    _SESSION_HISTORY_FIELDS = {"_id": 0, "summary": 1, "summarized_turns": 1, "turn_count": 1}
+    _TURN_HISTORY_FIELDS = {
+        "_id": 0, "turn_id": 1, "user_input": 1, "final_response": 1, "status": 1
+    }
+
+    def _load_history(
+        self, doc: Dict[str, Any], turns: List[Dict[str, Any]], skipped_pairs: int = 0
+    ) -> None:
+        """从会话文档和最近的轮次加载历史对话到 Memory
+
+        只加载最终的用户问题和 Agent 回复（不包含中间步骤）
+
+        Args:
+            doc: 会话文档（摘要字段）
+            turns: 按轮次 ID 排序的最近轮次（投影后的原始文档）
+            skipped_pairs: 未加载的更早轮次中的问答对数
+        """
+        for turn in turns:
+            # 已取消和进行中的轮次没有有效回复，不进入对话历史
+            if turn.get("status") in ("cancelled", "running"):
+                continue
+            # 只加载最终的 Q&A（节省 token）
+            self.memory.chat_memory.add_user_message(turn["user_input"])
+            self.memory.chat_memory.add_ai_message(turn["final_response"])
+
+        self.summary = doc.get("summary")
+        self.summarized_turns = doc.get("summarized_turns", 0)
+        self._pair_offset = skipped_pairs
+
+        logger.info(f"加载了 {len(turns)} 轮对话到 Memory")
+
+        # 有进行中的轮次时不缓存：轮次完成后 turn_count 不变，版本检查发现不了
+        if all(turn.get("status") != "running" for turn in turns):
+            self._cache_history(doc.get("turn_count"))
+
+    def _cache_history(self, version: Optional[int]) -> None:
+        """将 Memory 中的历史放入会话缓存
+
+        Args:
+            version: 会话文档的 turn_count
+        """
+        if settings.session_cache_enabled:
+            get_session_cache().put(
+                self.session_id, version, self.get_turn_pairs(), self._pair_offset
+            )
+
+    def _restore_history(self, doc: Dict[str, Any]) -> bool:
+        """从会话缓存恢复历史对话（缓存版本与会话文档的 turn_count 一致时）
+
+        Args:
+            doc: 会话文档（摘要字段和 turn_count）
+
+        Returns:
+            bool: 是否命中缓存；未命中时需要从数据库加载轮次
+        """
+        if not settings.session_cache_enabled:
+            return False
+        entry = get_session_cache().get(self.session_id, doc.get("turn_count"))
+        if entry is None:
+            return False
+
+        for user_input, response in entry.pairs:
+            self.memory.chat_memory.add_user_message(user_input)
+            self.memory.chat_memory.add_ai_message(response)
+        self.summary = doc.get("summary")
+        self.summarized_turns = doc.get("summarized_turns", 0)
+        self._pair_offset = entry.pair_offset
+        return True
+
+    def _cache_turn(self, turn_id: int, user_input: str, final_response: str, status: str) -> None:
+        """写穿：已写入数据库的轮次追加到会话缓存"""
+        if settings.session_cache_enabled:
+            answered = status not in ("cancelled", "running")
+            get_session_cache().append(
+                self.session_id, turn_id, (user_input, final_response) if answered else None
+            )
+
+    def _remember(self, user_input: str, final_response: str, status: str) -> None:
+        """添加到 LangChain Memory（即使 MongoDB 不可用也要保持内存中的对话）"""
+        if status not in ("cancelled", "running"):
+            self.memory.chat_memory.add_user_message(user_input)
+            self.memory.chat_memory.add_ai_message(final_response)
+
+    def get_messages(self) -> List[BaseMessage]:
+        """获取所有消息（用于发送给 LLM）
+
+        Returns:
+            List[BaseMessage]: 消息列表（只包含最终 Q&A）
+        """
+        return self.memory.chat_memory.messages
+
+    def get_turn_pairs(self) -> List[Tuple[str, str]]:
+        """获取所有轮次的 (用户输入, 最终回复)
+
+        Returns:
+            List[Tuple[str, str]]: 按时间顺序排列的问答对
+        """
+        messages = self.memory.chat_memory.messages
+        return [
+            (messages[i].content, messages[i + 1].content)
+            for i in range(0, len(messages) - 1, 2)
+        ]
+
+    def build_history(self, recent_turns: int, token_budget: int) -> str:
+        """构建注入 Prompt 的对话历史
+
+        由滚动摘要和最近 N 轮原文组成，总量不超过 token 预算：
+        超出时优先丢弃较早的原文轮次，因此长会话的 Prompt 大小保持稳定。
+
+        Args:
+            recent_turns: 原样保留的最近轮次数
+            token_budget: token 上限
+
+        Returns:
+            str: 对话历史文本，没有历史时返回 "（无）"
+        """
+        parts = []
+        used = 0
+
+        if self.summary:
+            summary = truncate_to_tokens(self.summary, token_budget // 2)
+            parts.append(f"之前对话的摘要: {summary}")
+            used += estimate_tokens(parts[0])
+
+        turns = self.get_turn_pairs()[self._summarized_pairs():]
+        recent = []
+        for user_input, response in reversed(turns[-recent_turns:] if recent_turns > 0 else []):
+            block = f"用户: {user_input}\n助手: {response}"
+            cost = estimate_tokens(block)
+            if used + cost > token_budget:
+                break
+            recent.insert(0, block)
+            used += cost
+
+        parts.extend(recent)
+        return "\n\n".join(parts) if parts else "（无）"
+
+    def get_turns_to_summarize(self, recent_turns: int) -> List[Tuple[str, str]]:
+        """获取已移出最近窗口、但尚未合并进摘要的轮次
+
+        Args:
+            recent_turns: 原样保留的最近轮次数
+
+        Returns:
+            List[Tuple[str, str]]: 待合并的问答对
+        """
+        turns = self.get_turn_pairs()
+        end = max(len(turns) - recent_turns, 0)
+        return turns[self._summarized_pairs():end]
+
+    def _summarized_pairs(self) -> int:
+        """Memory 中已压缩进摘要的问答对数（只加载了最近轮次时扣除未加载的部分）"""
+        return max(self.summarized_turns - self._pair_offset, 0)
+
+    def clear(self) -> None:
+        """清空对话记忆（只清空 Memory，不删除数据库记录）"""
+        self.memory.clear()
+        logger.info(f"清空对话记忆，会话 ID: {self.session_id}")
+
+    # ========== 查询与更新文档 ==========
+
+    def _session_filter(self) -> Dict[str, Any]:
+        return {"session_id": self.session_id}
+
+    def _turn_filter(self, turn_id: int) -> Dict[str, Any]:
+        return {"session_id": self.session_id, "turn_id": turn_id}
+
+    def _answered_before_filter(self, turn_id: int) -> Dict[str, Any]:
+        """ID 小于 turn_id、进入对话历史的轮次（统计未加载的问答对数）"""
+        return {
+            "session_id": self.session_id,
+            "turn_id": {"$lt": turn_id},
+            "status": {"$nin": ["cancelled", "running"]},
+        }
+
+    def _turns_filter(self, after_turn_id: int = 0) -> Dict[str, Any]:
+        """轮次集合中 ID 大于 after_turn_id 的轮次（按 (session_id, turn_id) 索引查询）"""
+        query: Dict[str, Any] = {"session_id": self.session_id}
+        if after_turn_id:
+            query["turn_id"] = {"$gt": after_turn_id}
+        return query
+
+    def _new_session(self) -> Dict[str, Any]:
+        """新会话文档（只包含元数据和计数器，轮次在 conversation_turns 集合中）"""
+        return ConversationDocument(
+            session_id=self.session_id,
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+        ).dict(exclude={"turns"})
+
+    def _conversation(
+        self, doc: Dict[str, Any], turns: List[Dict[str, Any]]
+    ) -> ConversationDocument:
+        """由会话文档和轮次集合中的轮次组装完整的对话文档"""
+        return ConversationDocument(**{**doc, "turns": turns})
+
+    def _ensure_session_update(self) -> Dict[str, Any]:
+        """会话文档不存在时创建（upsert，不覆盖已有会话）"""
+        new_doc = self._new_session()
+        del new_doc["session_id"]  # 由查询条件写入
+        return {"$setOnInsert": new_doc}
+
+    @staticmethod
+    def _new_turn(
+        turn_id: int,
+        user_input: str,
+        final_response: str,
+        agent_steps: Optional[List[AgentStep]] = None,
+        total_tokens: Optional[int] = None,
+        duration_ms: Optional[int] = None,
+        status: str = "completed",
+        **metrics: Any,
+    ) -> ConversationTurn:
+        return ConversationTurn(
+            turn_id=turn_id,
+            user_input=user_input,
+            agent_steps=agent_steps or [],
+            final_response=final_response,
+            total_tokens=total_tokens,
+            duration_ms=duration_ms,
+            status=status,
+            timestamp=datetime.now(),
+            **metrics,
+        )
+
+    @staticmethod
+    def _next_turn_update() -> List[Dict[str, Any]]:
+        """原子地递增会话的 turn_count，新值即下一个轮次 ID（聚合管道更新）
+
+        并发写入得到不同且有序的轮次 ID，无需读取会话文档。尚未迁移的旧文档
+        （没有 turn_count，轮次内嵌在 turns 数组中）以 turns 数组长度为起点。
+        """
+        count = {"$ifNull": ["$turn_count", {"$size": {"$ifNull": ["$turns", []]}}]}
+        return [
+            {
+                "$set": {
+                    "turn_count": {"$add": [count, 1]},
+                    "updated_at": {"$literal": datetime.now()},
+                }
+            }
+        ]
+
+    def _turn_document(self, turn: ConversationTurn) -> Dict[str, Any]:
+        """轮次集合中的轮次文档"""
+        return {"session_id": self.session_id, **turn.dict()}
+
+    @staticmethod
+    def _append_steps_update(agent_steps: List[AgentStep]) -> Dict[str, Any]:
+        """向进行中的轮次追加步骤"""
+        return {"$push": {"agent_steps": {"$each": [step.dict() for step in agent_steps]}}}
+
+    @staticmethod
+    def _finish_turn_update(
+        turn: ConversationTurn, agent_steps: Optional[List[AgentStep]]
+    ) -> Dict[str, Any]:
+        """写入轮次的最终回复、状态和度量，追加剩余步骤并按步骤编号排序"""
+        return {
+            "$set": turn.dict(exclude={"turn_id", "user_input", "agent_steps"}),
+            # 并发工具的步骤完成顺序可能与编号不同，排序后与一次性写入的顺序一致
+            "$push": {
+                "agent_steps": {
+                    "$each": [step.dict() for step in agent_steps or []],
+                    "$sort": {"step_number": 1},
+                }
+            },
+        }
+
+    def _set_summary(self, summary: str, summarized_turns: int) -> Dict[str, Any]:
+        """更新内存中的滚动摘要，返回对应的数据库更新"""
+        self.summary = summary
+        self.summarized_turns = summarized_turns
+        return {
+            "$set": {
+                "summary": summary,
+                "summarized_turns": summarized_turns,
+                "updated_at": datetime.now(),
+            }
+        }
+
+
+class MongoDBConversationMemory(ConversationMemoryBase):
     """MongoDB 持久化对话记忆
 
     将对话历史保存到 MongoDB，支持跨会话恢复。
     当 MongoDB 不可用时，自动降级为纯内存模式。
+
+    同步实现（pymongo），用于同步调用路径；异步路由使用 AsyncMongoDBConversationMemory。
     """
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, history: Optional[List[Tuple[str, str]]] = None):
         """初始化对话记忆
 
         Args:
             session_id: 会话 ID
+            history: 客户端提供的对话历史 (用户输入, 回复)，None 表示从数据库加载
         """
-        self.session_id = session_id
-        self.mongodb_available = True  # MongoDB 可用性标记
+        super().__init__(session_id, history)
 
+        # 获取集合对象不涉及网络；不单独 ping，加载会话的第一次查询失败时再降级
+        # （客户端超时为 2 秒，与 ping 相同）
         try:
             self.collection = get_conversations_collection()
-
-            # 🔥 立即测试连接，避免后续操作卡住
-            # 使用快速ping测试，而不是等到find_one时才发现连接失败
-            from src.models.mongodb import MongoDBManager
-            MongoDBManager.get_client().admin.command('ping')
-
+            self.turns_collection = get_conversation_turns_collection()
         except Exception as e:
             logger.warning(f"MongoDB 不可用，降级为纯内存模式: {str(e)}")
             self.mongodb_available = False
             self.collection = None
-
-        # 创建 LangChain Memory 对象
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-        )
+            self.turns_collection = None
 
         # 从数据库加载或创建会话（如果 MongoDB 可用）
+        if self.client_history:
+            return
         if self.mongodb_available:
             self._load_or_create_session()
         else:
@@ -67,47 +398,32 @@ class MongoDBConversationMemory:
             return
 
         try:
-            # 查询现有会话
-            doc = self.collection.find_one({"session_id": self.session_id})
+            # 查询现有会话（只读取摘要字段和 turn_count），同时检测 MongoDB 是否可用
+            doc = self.collection.find_one(self._session_filter(), self._SESSION_HISTORY_FIELDS)
 
             if doc:
-                # 加载现有会话
-                conv_doc = ConversationDocument(**doc)
-                self._load_history(conv_doc)
+                self._session_exists = True
+                if self._restore_history(doc):
+                    logger.info(f"从缓存加载会话: {self.session_id}")
+                    return
+                # 加载现有会话最近的轮次
+                turns, skipped_pairs = self._find_recent_turns()
+                self._load_history(doc, turns, skipped_pairs)
                 logger.info(
                     f"加载现有会话: {self.session_id}, "
-                    f"包含 {len(conv_doc.turns)} 轮对话"
+                    f"包含最近 {len(turns)} 轮对话"
                 )
             else:
                 # 创建新会话
-                new_doc = ConversationDocument(
-                    session_id=self.session_id,
-                    turns=[],
-                    created_at=datetime.now(),
-                    updated_at=datetime.now(),
-                )
-                self.collection.insert_one(new_doc.dict())
+                self.collection.insert_one(self._new_session())
+                self._session_exists = True
+                self._cache_history(0)
                 logger.info(f"创建新会话: {self.session_id}")
 
         except Exception as e:
             logger.error(f"加载或创建会话失败，降级为纯内存模式: {str(e)}")
             self.mongodb_available = False
 
-    def _load_history(self, conv_doc: ConversationDocument) -> None:
-        """从会话文档加载历史对话到 Memory
-
-        只加载最终的用户问题和 Agent 回复（不包含中间步骤）
-
-        Args:
-            conv_doc: 会话文档
-        """
-        for turn in conv_doc.turns:
-            # 只加载最终的 Q&A（节省 token）
-            self.memory.chat_memory.add_user_message(turn.user_input)
-            self.memory.chat_memory.add_ai_message(turn.final_response)
-
-        logger.info(f"加载了 {len(conv_doc.turns)} 轮对话到 Memory")
-
     def add_turn(
         self,
         user_input: str,
@@ -115,6 +431,8 @@ class MongoDBConversationMemory:
         agent_steps: Optional[List[AgentStep]] = None,
         total_tokens: Optional[int] = None,
         duration_ms: Optional[int] = None,
+        status: str = "completed",
+        **metrics: Any,
     ) -> None:
         """添加新的对话轮次
 
@@ -124,60 +442,208 @@ class MongoDBConversationMemory:
             agent_steps: Agent 执行步骤（完整信息，用于前端展示）
             total_tokens: 总 token 消耗
             duration_ms: 总耗时（毫秒）
+            status: 轮次状态 (completed/partial/cancelled)；cancelled 的轮次只持久化，不进入对话历史
+            **metrics: 其他度量字段（prompt_tokens、ttft_ms 等，见 ConversationTurn）
         """
-        # 先添加到 LangChain Memory（即使 MongoDB 不可用也要保持内存中的对话）
-        self.memory.chat_memory.add_user_message(user_input)
-        self.memory.chat_memory.add_ai_message(final_response)
+        self._remember(user_input, final_response, status)
 
         # 如果 MongoDB 可用，持久化到数据库
         if not self.mongodb_available:
-            logger.debug(f"MongoDB 不可用，跳过持久化")
+            logger.debug("MongoDB 不可用，跳过持久化")
             return
 
         try:
-            # 获取当前 turn_id
-            doc = self.collection.find_one({"session_id": self.session_id})
-            if not doc:
-                logger.warning(f"会话不存在: {self.session_id}, 跳过持久化")
+            # 创建新的 Turn，写入轮次集合（轮次 ID 由数据库分配）
+            new_turn = self._new_turn(
+                0, user_input, final_response, agent_steps, total_tokens, duration_ms,
+                status, **metrics,
+            )
+            turn_id = self._push_turn(new_turn)
+            if turn_id is None:
                 return
+            self._cache_turn(turn_id, user_input, final_response, status)
 
-            turn_id = len(doc.get("turns", [])) + 1
-
-            # 创建新的 Turn
-            new_turn = ConversationTurn(
-                turn_id=turn_id,
-                user_input=user_input,
-                agent_steps=agent_steps or [],
-                final_response=final_response,
-                total_tokens=total_tokens,
-                duration_ms=duration_ms,
-                timestamp=datetime.now(),
+            logger.info(
+                f"保存对话轮次 {turn_id} 成功，会话 ID: {self.session_id}, "
+                f"包含 {len(agent_steps or [])} 个执行步骤"
             )
 
-            # 更新数据库（追加到 turns 数组）
-            self.collection.update_one(
-                {"session_id": self.session_id},
-                {
-                    "$push": {"turns": new_turn.dict()},
-                    "$set": {"updated_at": datetime.now()},
-                },
+        except Exception as e:
+            logger.error(f"保存对话轮次失败: {str(e)}")
+
+    def _ensure_session(self) -> None:
+        """会话文档不存在时创建（无状态模式在首次写入时调用，不覆盖已有会话）"""
+        if self._session_exists:
+            return
+        self.collection.update_one(
+            self._session_filter(), self._ensure_session_update(), upsert=True
+        )
+        self._session_exists = True
+
+    def _push_turn(self, turn: ConversationTurn) -> Optional[int]:
+        """原子地分配轮次 ID 并写入轮次，返回轮次 ID；会话不存在时返回 None"""
+        if self.client_history:
+            self._ensure_session()
+        doc = self.collection.find_one_and_update(
+            self._session_filter(),
+            self._next_turn_update(),
+            projection={"_id": 0, "turn_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not doc:
+            logger.warning(f"会话不存在: {self.session_id}, 跳过持久化")
+            return None
+        turn.turn_id = doc["turn_count"]
+        self.turns_collection.insert_one(self._turn_document(turn))
+        return turn.turn_id
+
+    def _find_recent_turns(self) -> Tuple[List[Dict[str, Any]], int]:
+        """读取最近 history_load_turns 轮的问答字段，返回 (轮次, 未加载的更早问答对数)"""
+        limit = settings.history_load_turns
+        cursor = self.turns_collection.find(self._turns_filter(), self._TURN_HISTORY_FIELDS)
+        turns = list(cursor.sort("turn_id", -1).limit(limit))
+        turns.reverse()
+        skipped_pairs = 0
+        if len(turns) == limit and turns[0]["turn_id"] > 1:
+            skipped_pairs = self.turns_collection.count_documents(
+                self._answered_before_filter(turns[0]["turn_id"])
             )
+        return turns, skipped_pairs
 
-            logger.info(
-                f"保存对话轮次 {turn_id} 成功，会话 ID: {self.session_id}, "
-                f"包含 {len(agent_steps or [])} 个执行步骤"
+    def _find_turns(
+        self, after_turn_id: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """按轮次 ID 顺序读取轮次文档"""
+        cursor = self.turns_collection.find(self._turns_filter(after_turn_id)).sort("turn_id", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+
+    # ========== 流式轮次的增量持久化 ==========
+
+    def begin_turn(self, user_input: str) -> Optional[int]:
+        """开始一轮流式对话：先写入状态为 running 的空轮次，之后逐批追加步骤
+
+        Args:
+            user_input: 用户输入
+
+        Returns:
+            Optional[int]: 轮次 ID；MongoDB 不可用或写入失败时返回 None
+        """
+        if not self.mongodb_available:
+            return None
+
+        try:
+            turn = self._new_turn(0, user_input, "", status="running")
+            turn_id = self._push_turn(turn)
+            if turn_id is None:
+                return None
+            logger.info(f"开始对话轮次 {turn_id}，会话 ID: {self.session_id}")
+            return turn_id
+        except Exception as e:
+            logger.error(f"开始对话轮次失败: {str(e)}")
+            return None
+
+    def append_steps(self, turn_id: Optional[int], agent_steps: List[AgentStep]) -> None:
+        """向进行中的轮次追加一批已完成的步骤（一次更新）
+
+        Args:
+            turn_id: begin_turn 返回的轮次 ID
+            agent_steps: 已完成的步骤
+        """
+        if not self.mongodb_available or turn_id is None or not agent_steps:
+            return
+
+        try:
+            self.turns_collection.update_one(
+                self._turn_filter(turn_id), self._append_steps_update(agent_steps)
             )
+        except Exception as e:
+            logger.error(f"追加执行步骤失败: {str(e)}")
 
+    def finish_turn(
+        self,
+        turn_id: Optional[int],
+        user_input: str,
+        final_response: str,
+        agent_steps: Optional[List[AgentStep]] = None,
+        total_tokens: Optional[int] = None,
+        duration_ms: Optional[int] = None,
+        status: str = "completed",
+        **metrics: Any,
+    ) -> None:
+        """结束流式轮次：写入最终回复、状态和度量，追加剩余步骤并按步骤编号排序
+
+        完成后的记录与 add_turn 一次性写入的记录一致。begin_turn 未成功时退回 add_turn。
+
+        Args:
+            turn_id: begin_turn 返回的轮次 ID
+            user_input: 用户输入
+            final_response: 最终回复
+            agent_steps: 尚未追加的步骤
+            total_tokens: 总 token 消耗
+            duration_ms: 总耗时（毫秒）
+            status: 轮次状态 (completed/partial/cancelled)
+            **metrics: 其他度量字段（见 ConversationTurn）
+        """
+        if turn_id is None:
+            self.add_turn(
+                user_input, final_response, agent_steps, total_tokens, duration_ms, status, **metrics
+            )
+            return
+
+        self._remember(user_input, final_response, status)
+        if not self.mongodb_available:
+            return
+
+        try:
+            turn = self._new_turn(
+                turn_id, user_input, final_response, None, total_tokens, duration_ms, status,
+                **metrics,
+            )
+            self.turns_collection.update_one(
+                self._turn_filter(turn_id), self._finish_turn_update(turn, agent_steps)
+            )
+            self._cache_turn(turn_id, user_input, final_response, status)
+            logger.info(f"保存对话轮次 {turn_id} 成功，会话 ID: {self.session_id}")
         except Exception as e:
             logger.error(f"保存对话轮次失败: {str(e)}")
 
-    def get_messages(self) -> List[BaseMessage]:
-        """获取所有消息（用于发送给 LLM）
+    def update_summary(self, summary: str, summarized_turns: int) -> None:
+        """更新滚动摘要
+
+        Args:
+            summary: 新的摘要内容
+            summarized_turns: 摘要覆盖的轮次数
+        """
+        update = self._set_summary(summary, summarized_turns)
+
+        if not self.mongodb_available:
+            return
+
+        try:
+            self.collection.update_one(self._session_filter(), update)
+            logger.info(f"更新对话摘要，会话 ID: {self.session_id}, 覆盖 {summarized_turns} 轮")
+        except Exception as e:
+            logger.error(f"更新对话摘要失败: {str(e)}")
+
+    def get_turns(
+        self, after_turn_id: int = 0, limit: Optional[int] = None
+    ) -> List[ConversationTurn]:
+        """分页获取轮次（包含 agent steps）
+
+        Args:
+            after_turn_id: 只返回 ID 大于该值的轮次
+            limit: 最多返回的轮次数，None 表示不限制
 
         Returns:
-            List[BaseMessage]: 消息列表（只包含最终 Q&A）
+            List[ConversationTurn]: 按轮次 ID 排序的轮次
         """
-        return self.memory.chat_memory.messages
+        try:
+            return [ConversationTurn(**turn) for turn in self._find_turns(after_turn_id, limit)]
+        except Exception as e:
+            logger.error(f"获取对话轮次失败: {str(e)}")
+            return []
 
     def get_full_conversation(self) -> Optional[ConversationDocument]:
         """获取完整的对话文档（包含所有 agent steps）
@@ -188,23 +654,20 @@ class MongoDBConversationMemory:
             Optional[ConversationDocument]: 对话文档
         """
         try:
-            doc = self.collection.find_one({"session_id": self.session_id})
+            doc = self.collection.find_one(self._session_filter())
             if doc:
-                return ConversationDocument(**doc)
+                return self._conversation(doc, self._find_turns())
             return None
         except Exception as e:
             logger.error(f"获取完整对话失败: {str(e)}")
             return None
 
-    def clear(self) -> None:
-        """清空对话记忆（只清空 Memory，不删除数据库记录）"""
-        self.memory.clear()
-        logger.info(f"清空对话记忆，会话 ID: {self.session_id}")
-
     def delete_session(self) -> None:
         """删除整个会话（从数据库删除）"""
         try:
-            self.collection.delete_one({"session_id": self.session_id})
+            self.collection.delete_one(self._session_filter())
+            self.turns_collection.delete_many(self._turns_filter())
+            get_session_cache().invalidate(self.session_id)
             self.memory.clear()
             logger.info(f"删除会话: {self.session_id}")
         except Exception as e:
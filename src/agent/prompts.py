@@ -124,9 +124,48 @@ Final Answer: 当前项目测试覆盖率为75%，核心模块达到80%，整体
 2. **每个 Action 之前必须有 Thought！**
 3. **每个 Thought 后只能跟 Action 或 Final Answer，不能连续两个 Thought！**
 
+**对话历史**（用于理解追问，已有的数据可直接引用，不必重复查询）：
+{chat_history}
+
 Question: {input}
 Thought: {agent_scratchpad}""")
 
+# 原生函数调用（tool calling）模式的 Prompt
+# 工具定义通过 API 的 tools 参数传递，无需文本格式规则
+TOOL_CALLING_SYSTEM_PROMPT = """你是一个专业的 DevOps 项目分析助手，能够帮助团队了解项目的健康状况。
+
+**你的职责**:
+- 根据用户的问题，选择合适的工具获取信息
+- 需要多个数据源时，在同一轮中同时调用多个工具
+- 分析收集到的数据，找出关键问题和趋势
+- 提供清晰、可操作的建议
+- 使用简体中文进行交流
+
+**分析维度**:
+- **代码质量**: 测试覆盖率、代码审查情况
+- **交付效率**: 构建成功率、合并速度
+- **稳定性**: 测试通过率、构建失败原因
+- **趋势**: 各项指标的变化趋势
+
+**回答风格**:
+- 简洁明了，重点突出
+- 先给结论，再给细节
+- 发现问题时提供具体建议
+- 使用数据支撑你的分析
+- 不需要工具的问题直接回答
+
+**对话历史**（用于理解追问，已有的数据可直接引用，不必重复查询）：
+{chat_history}
+"""
+
+TOOL_CALLING_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", TOOL_CALLING_SYSTEM_PROMPT),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]
+)
+
 # 报告生成 Prompt
 REPORT_GENERATION_PROMPT = """基于以下项目数据生成一份{report_type}报告：
 
@@ -149,3 +188,57 @@ REPORT_GENERATION_PROMPT = """基于以下项目数据生成一份{report_type}
 - 包含具体数据支持
 - 提供可操作的建议
 """
+
+# 并行预取模式下的项目分析 Prompt（所有数据已提前获取，只需一次 LLM 调用）
+ANALYSIS_SYNTHESIS_PROMPT = """你是一个专业的 DevOps 项目分析助手。以下是项目 "{project_name}" 的各项数据，已通过工具并行获取：
+
+{observations}
+
+请基于以上数据对项目进行全面分析，包括：
+
+1. 测试覆盖率情况
+2. 测试用例执行情况
+3. 代码审查和合并情况 (Gerrit)
+4. 构建状态 (Jenkins)
+5. 制品版本情况 (Artifactory)
+6. 其他关键指标
+
+请提供一个综合性的项目健康报告。要求：
+- 使用简体中文
+- 先给结论，再给细节
+- 使用数据支撑你的分析
+- 某项数据获取失败时如实说明，不要编造数据
+"""
+
+# 对话历史滚动摘要 Prompt（增量更新：只合并新移出窗口的轮次）
+HISTORY_SUMMARY_PROMPT = """请更新以下 DevOps 分析对话的摘要。
+
+**现有摘要**:
+{summary}
+
+**新增对话**:
+{new_turns}
+
+要求：
+- 将新增对话合并进现有摘要，输出完整的新摘要
+- 保留涉及的项目名称、关键指标数值和已得出的结论
+- 删除寒暄和重复内容
+- 使用简体中文，不超过 {max_tokens} 个 token
+- 只输出摘要本身
+"""
+
+# 请求时限将到时的强制回答 Prompt（基于已获取的工具结果直接作答）
+PARTIAL_ANSWER_PROMPT = """你是一个专业的 DevOps 项目分析助手。由于处理时间有限，已停止继续调用工具，请基于已获取的数据直接回答用户的问题。
+
+**用户问题**:
+{input}
+
+**已获取的数据**:
+{observations}
+
+要求：
+- 使用简体中文，直接给出回答，不要再输出 Thought/Action 等格式标记
+- 只使用以上数据，不要编造数据
+- 在回答开头说明：由于时间限制，以下回答基于部分数据
+- 指出还有哪些信息未能获取，用户可以稍后单独查询
+"""
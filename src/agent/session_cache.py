@@ -0,0 +1,213 @@
+"""进程内会话缓存
+
+缓存热会话的对话历史（问答对），同一用户连续发消息时不必每次都从 MongoDB 重新读取轮次：
+- 以会话文档的 turn_count 作为版本：每次请求仍读取会话文档的摘要字段和 turn_count，
+  与缓存版本一致才使用缓存，其它进程写入的轮次使版本不一致，从而重新加载
+- 本进程写入的轮次直接追加到缓存（写穿：数据库写入成功后才更新缓存）
+- 容量按估算的字节数限制，超出时按 LRU 淘汰；空闲超过 TTL 的条目过期
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import settings
+
+# 每个条目和每个问答对的固定开销估算（字节）
+_ENTRY_OVERHEAD = 256
+_PAIR_OVERHEAD = 128
+
+
+def _pair_size(pair: Tuple[str, str]) -> int:
+    return _PAIR_OVERHEAD + len(pair[0].encode("utf-8")) + len(pair[1].encode("utf-8"))
+
+
+@dataclass
+class CachedSession:
+    """缓存的会话历史"""
+
+    version: int  # 会话文档的 turn_count
+    pairs: Tuple[Tuple[str, str], ...]  # 最近的问答对
+    pair_offset: int  # 未缓存的更早问答对数
+    size: int
+    last_access: float
+
+
+class SessionCache:
+    """会话历史的 LRU 缓存（进程内共享，线程安全）"""
+
+    def __init__(self, max_bytes: int, idle_seconds: float, max_pairs: int):
+        """初始化缓存
+
+        Args:
+            max_bytes: 容量上限（字节）
+            idle_seconds: 条目的空闲过期时间（秒）
+            max_pairs: 每个会话最多缓存的问答对数（超出时丢弃最早的）
+        """
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.max_pairs = max_pairs
+        self._entries: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, session_id: str) -> None:
+        """删除条目（调用方需持有锁）"""
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, session_id: str, entry: CachedSession) -> None:
+        """写入条目，清理过期条目并按容量淘汰（调用方需持有锁）"""
+        self._remove(session_id)
+        # 按访问时间排序，最早访问的在前
+        while self._entries:
+            oldest_id, oldest = next(iter(self._entries.items()))
+            if entry.last_access - oldest.last_access <= self.idle_seconds:
+                break
+            self._remove(oldest_id)
+            self.expirations += 1
+        if entry.size > self.max_bytes:
+            return
+        self._entries[session_id] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def _make_entry(
+        self, version: int, pairs: List[Tuple[str, str]], pair_offset: int
+    ) -> CachedSession:
+        if len(pairs) > self.max_pairs:
+            pair_offset += len(pairs) - self.max_pairs
+            pairs = pairs[len(pairs) - self.max_pairs:]
+        return CachedSession(
+            version=version,
+            pairs=tuple(pairs),
+            pair_offset=pair_offset,
+            size=_ENTRY_OVERHEAD + sum(_pair_size(pair) for pair in pairs),
+            last_access=time.monotonic(),
+        )
+
+    def get(self, session_id: str, version: Optional[int]) -> Optional[CachedSession]:
+        """查找与数据库版本一致的缓存条目
+
+        Args:
+            session_id: 会话 ID
+            version: 会话文档当前的 turn_count
+
+        Returns:
+            Optional[CachedSession]: 命中的条目；未缓存、已过期或版本不一致时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            now = time.monotonic()
+            if entry is not None and now - entry.last_access > self.idle_seconds:
+                self._remove(session_id)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if version is None or entry.version != version:
+                self._remove(session_id)
+                self.stale += 1
+                return None
+            entry.last_access = now
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        session_id: str,
+        version: Optional[int],
+        pairs: List[Tuple[str, str]],
+        pair_offset: int = 0,
+    ) -> None:
+        """缓存从数据库加载的会话历史
+
+        Args:
+            session_id: 会话 ID
+            version: 加载时会话文档的 turn_count（None 表示没有版本，不缓存）
+            pairs: 按时间顺序排列的问答对
+            pair_offset: 未加载的更早问答对数
+        """
+        if version is None:
+            return
+        with self._lock:
+            self._store(session_id, self._make_entry(version, pairs, pair_offset))
+
+    def append(self, session_id: str, turn_id: int, pair: Optional[Tuple[str, str]]) -> None:
+        """写穿：本进程写入的轮次追加到缓存
+
+        只有轮次紧接在缓存版本之后时才能追加（否则中间有缓存中没有的轮次），
+        不满足时删除条目，下次请求重新加载。
+
+        Args:
+            session_id: 会话 ID
+            turn_id: 已写入数据库的轮次 ID
+            pair: 进入对话历史的问答对；已取消的轮次为 None，只推进版本
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            if entry.version != turn_id - 1:
+                self._remove(session_id)
+                return
+            pairs = list(entry.pairs) + ([pair] if pair else [])
+            self._store(session_id, self._make_entry(turn_id, pairs, entry.pair_offset))
+
+    def invalidate(self, session_id: str) -> None:
+        """删除会话的缓存条目"""
+        with self._lock:
+            self._remove(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计
+
+        Returns:
+            Dict[str, Any]: 条目数、占用字节数、命中/未命中/版本失效/淘汰/过期次数和命中率
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """清空缓存条目"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_session_cache = SessionCache(
+    max_bytes=settings.session_cache_max_bytes,
+    idle_seconds=settings.session_cache_idle_seconds,
+    max_pairs=settings.history_load_turns,
+)
+
+
+def get_session_cache() -> SessionCache:
+    """获取进程级共享的会话缓存"""
+    return _session_cache
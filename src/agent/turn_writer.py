@@ -0,0 +1,131 @@
+"""流式轮次的增量持久化
+
+流式运行开始时写入一条 running 状态的轮次，每个 AgentStep 完成后进入待写队列，
+攒够一批（或距上次写入超过间隔）时用一次更新追加到该轮次，运行结束时写入最终回复、
+状态和度量。步骤完成回调在事件循环中执行，只做入队；所有数据库写入按提交顺序
+在独立任务中串行执行（异步 Motor 写入，不阻塞事件循环），也不随运行取消而中断。
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Set
+
+from src.agent.instrumentation import RunMetricsCallbackHandler
+from src.agent.async_mongodb_memory import AsyncMongoDBConversationMemory
+from src.models.mongodb_models import AgentStep
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TurnWriter:
+    """一轮流式对话的增量写入器"""
+
+    def __init__(self, user_input: str, batch_size: int = 4, flush_interval: float = 2.0):
+        """初始化写入器
+
+        Args:
+            user_input: 用户输入
+            batch_size: 待写步骤达到该数量时写入
+            flush_interval: 距上次写入超过该时间（秒）时，新完成的步骤立即写入
+        """
+        self.user_input = user_input
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.memory: Optional[AsyncMongoDBConversationMemory] = None
+        self.turn_id: Optional[int] = None
+        self.writes = 0
+
+        self._pending: List[AgentStep] = []
+        self._submitted: Set[int] = set()  # 已提交写入的步骤编号
+        self._last_flush = time.monotonic()
+        self._tail: Optional[asyncio.Task] = None
+
+    def begin(self, memory: AsyncMongoDBConversationMemory) -> None:
+        """写入 running 状态的轮次（执行器创建完成、会话记忆可用后调用）
+
+        Args:
+            memory: 会话记忆
+        """
+        self.memory = memory
+        self._submit(self._begin_turn)
+
+    async def _begin_turn(self) -> None:
+        self.turn_id = await self.memory.begin_turn(self.user_input)
+
+    def add_step(self, step: AgentStep) -> None:
+        """步骤完成回调（RunMetricsCallbackHandler.on_step_complete），只入队不做 IO
+
+        Args:
+            step: 已完成的步骤
+        """
+        self._pending.append(step)
+        if (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """把待写步骤作为一批提交写入"""
+        if not self._pending or self.memory is None:
+            return
+        steps, self._pending = self._pending, []
+        self._submitted.update(step.step_number for step in steps)
+        self._last_flush = time.monotonic()
+        self._submit(lambda: self.memory.append_steps(self.turn_id, steps))
+
+    async def finish(
+        self,
+        final_response: str,
+        metrics: RunMetricsCallbackHandler,
+        status: str = "completed",
+    ) -> None:
+        """写入最终回复、状态和度量，并等待所有写入完成
+
+        剩余步骤（包括待写批次和工具未返回的步骤）随最终更新一起写入，
+        完成后的记录与一次性保存的记录一致。
+
+        Args:
+            final_response: 最终回复
+            metrics: 本轮的度量回调
+            status: 轮次状态 (completed/partial/cancelled)
+        """
+        self._pending = []
+        agent_steps = metrics.agent_steps
+        turn_metrics = metrics.turn_metrics()
+
+        async def finish_turn() -> None:
+            # begin_turn 未成功时 finish_turn 退回一次性写入，需要全部步骤
+            steps = (
+                agent_steps if self.turn_id is None
+                else [step for step in agent_steps if step.step_number not in self._submitted]
+            )
+            await self.memory.finish_turn(
+                self.turn_id,
+                self.user_input,
+                final_response,
+                agent_steps=steps,
+                status=status,
+                **turn_metrics,
+            )
+
+        self._submit(finish_turn)
+        await self._tail
+
+    def _submit(self, write: Callable[[], Awaitable[None]]) -> None:
+        """提交一次写入：在上一次写入完成后执行"""
+        self._tail = asyncio.get_running_loop().create_task(self._run_after(self._tail, write))
+        self.writes += 1
+
+    @staticmethod
+    async def _run_after(
+        previous: Optional[asyncio.Task], write: Callable[[], Awaitable[None]]
+    ) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await write()
+        except Exception as e:
+            logger.error(f"流式轮次写入失败: {str(e)}")
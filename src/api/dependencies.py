@@ -3,19 +3,45 @@
 定义 FastAPI 的依赖项。
 """
 
-from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
 
 from src.agent.devops_agent import DevOpsAgent
-from src.models.database import get_db
+from src.utils.logger import get_logger
 
+logger = get_logger(__name__)
 
-def get_agent(db: Session = next(get_db())) -> DevOpsAgent:
+
+def init_agent(app) -> DevOpsAgent:
+    """在应用启动时构建进程级共享的 Agent
+
+    LLM 客户端、工具对象和 ReAct runnable 只构建一次，
+    之后所有请求复用同一实例（每个请求仍会创建独立的执行器和记忆对象）。
+
+    Args:
+        app: FastAPI 应用
+
+    Returns:
+        DevOpsAgent: 共享的 Agent 实例
+    """
+    agent = DevOpsAgent()
+    app.state.agent = agent
+    logger.info("共享 DevOps Agent 已就绪")
+    return agent
+
+
+def get_agent(request: HTTPConnection) -> DevOpsAgent:
     """获取 DevOps Agent 实例
 
+    返回应用启动时构建的共享实例；如果启动阶段未完成初始化
+    （例如测试中直接挂载路由），则在首次使用时惰性构建。
+
     Args:
-        db: 数据库会话
+        request: 当前请求或 WebSocket 连接
 
     Returns:
         DevOpsAgent: Agent 实例
     """
-    return DevOpsAgent(db=db)
+    agent = getattr(request.app.state, "agent", None)
+    if agent is None:
+        agent = init_agent(request.app)
+    return agent
@@ -5,9 +5,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
-from src.api.routes import analysis, chat, chat_stream, health
+from src.api.dependencies import init_agent
+from src.api.routes import agent_ws, analysis, chat, chat_stream, health
 from src.config import settings
-from src.models.mongodb import MongoDBManager
+from src.models.mongodb import AsyncMongoDBManager, MongoDBManager
+from src.utils.llm_transport import close_llm_transport, get_llm_transport
 from src.utils.logger import get_logger, setup_logging
 from src.utils.langchain_patch import apply_reasoning_patch
 
@@ -70,6 +72,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api/v1")
 app.include_router(chat_stream.router, prefix="/api/v1")  # 流式对话接口
+app.include_router(agent_ws.router, prefix="/api/v1")  # WebSocket 流式接口
 app.include_router(analysis.router, prefix="/api/v1")
 
 
@@ -85,6 +88,13 @@ async def startup_event():
         logger.warning(f"MongoDB 连接失败: {str(e)}")
         logger.warning("服务将继续运行，但数据持久化功能不可用")
 
+    # 构建进程级共享 Agent（LLM 客户端、工具、ReAct runnable 只初始化一次）
+    init_agent(app)
+
+    # 预热 LLM 连接，首个请求无需再做 TCP/TLS 握手
+    if settings.llm_warmup:
+        await get_llm_transport().awarm_up(settings.deepseek_api_key)
+
     logger.info("DHUCI Agent API 启动成功")
     logger.info(f"API 地址: http://{settings.api_host}:{settings.api_port}")
     logger.info(f"API 文档: http://{settings.api_host}:{settings.api_port}/docs")
@@ -94,6 +104,10 @@ async def startup_event():
 async def shutdown_event():
     """应用关闭事件"""
     MongoDBManager.close()
+    AsyncMongoDBManager.close()
+    # 共享 Agent 持有连接池的客户端，随连接池一起释放
+    app.state.agent = None
+    await close_llm_transport()
     logger.info("DHUCI Agent API 关闭")
 
 
@@ -0,0 +1,241 @@
+"""WebSocket 流式运行接口（AG-UI 协议）
+
+与 SSE 接口共用运行登记表和 AG-UI 适配器，事件集合完全相同。一个连接上可以同时
+进行多个运行，客户端通过同一连接发送取消请求，不需要断开连接或另发 HTTP 请求。
+
+客户端消息（JSON 文本帧）：
+- {"type": "run", ...RunAgentInput}: 启动运行（或加入进行中的相同运行）
+- {"type": "resume", "runId": "...", "lastEventId": 42}: 订阅运行，从事件 ID 之后续传
+- {"type": "cancel", "runId": "..."}: 取消本连接上订阅的运行。由本连接启动的运行被取消，
+  所有订阅者都收到 RUN_ERROR；加入的运行只结束本连接的订阅（收到 code 为 UNSUBSCRIBED 的
+  RUN_ERROR），运行和其它订阅者不受影响
+
+run 和 resume 请求按发送顺序依次分配通道号 0, 1, 2...（请求失败也占用通道号）。
+服务端事件帧：
+- 默认：文本帧 {"runId": "...", "eventId": 1, "event": {AG-UI 事件}}
+- compact=1：二进制帧，内容为 UTF-8 JSON 数组 [通道号, 事件 ID, AG-UI 事件]，
+  以通道号代替运行 ID，省去每帧重复的键名和运行 ID
+
+请求本身出错时（格式错误、没有用户消息、运行不存在）返回事件 ID 为 0 的 RUN_ERROR。
+订阅者消费过慢被断开时返回 code 为 RESUBSCRIBE 的 RUN_ERROR，客户端以最后收到的事件 ID
+发送 resume 续传。连接断开时本连接的订阅随之结束，运行按宽限期规则继续或取消。
+"""
+
+import asyncio
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set, Union
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from src.agent.devops_agent import DevOpsAgent
+from src.api.dependencies import get_agent
+from src.api.routes.chat_stream import start_or_join_agent_run
+from src.models.schemas import AGUIRunAgentInput
+from src.utils.agui_adapter import AGUIEventType
+from src.utils.logger import get_logger
+from src.utils.run_registry import StreamRun, get_run_registry
+
+logger = get_logger(__name__)
+router = APIRouter(tags=["对话"])
+
+
+def encode_frame(
+    channel: Optional[int],
+    run_id: Optional[str],
+    event_id: int,
+    payload: str,
+    compact: bool = False,
+) -> Union[str, bytes]:
+    """把序列化后的 AG-UI 事件包装为 WebSocket 帧（事件 JSON 原样拼接，不重新序列化）
+
+    Args:
+        channel: 通道号（紧凑帧使用）
+        run_id: 运行 ID（文本帧使用）
+        event_id: 事件 ID
+        payload: 事件 JSON
+        compact: 是否使用紧凑二进制帧
+
+    Returns:
+        Union[str, bytes]: 文本帧内容或二进制帧内容
+    """
+    if compact:
+        return f"[{'null' if channel is None else channel},{event_id},{payload}]".encode("utf-8")
+    return f'{{"runId":{_json_string(run_id)},"eventId":{event_id},"event":{payload}}}'
+
+
+@lru_cache(maxsize=1024)
+def _json_string(value: Optional[str]) -> str:
+    """运行 ID 的 JSON 表示（同一运行的每一帧都要用到）"""
+    return json.dumps(value, ensure_ascii=False)
+
+
+class _Connection:
+    """一个 WebSocket 连接：多个运行的订阅复用同一连接"""
+
+    def __init__(self, websocket: WebSocket, agent: DevOpsAgent, compact: bool):
+        self.websocket = websocket
+        self.agent = agent
+        self.compact = compact
+        self.runs: Dict[str, StreamRun] = {}
+        # 由本连接启动（而不是加入）的运行 ID，只有这些运行可以被本连接取消
+        self.started: Set[str] = set()
+        self._channels = 0
+        self._forwarders: Dict[int, asyncio.Task] = {}
+        self._channel_runs: Dict[int, str] = {}
+        # 多个转发任务共用连接，整帧发送需互斥
+        self._send_lock = asyncio.Lock()
+
+    async def handle(self, message: Dict[str, Any]) -> None:
+        """处理一条客户端消息"""
+        message_type = message.get("type")
+        if message_type == "run":
+            channel = self._open_channel()
+            try:
+                request = AGUIRunAgentInput(**message)
+            except ValidationError as e:
+                await self.send_error(channel, message.get("runId"), f"Invalid run request: {e}")
+                return
+            existing = get_run_registry().get(request.runId) if request.runId else None
+            run = start_or_join_agent_run(self.agent, request)
+            if run is None:
+                await self.send_error(channel, request.runId, "No user message found")
+                return
+            if run is not existing:
+                self.started.add(run.run_id)
+            self._follow(channel, run, 0)
+
+        elif message_type == "resume":
+            channel = self._open_channel()
+            run_id = message.get("runId")
+            run = get_run_registry().get(run_id) if isinstance(run_id, str) else None
+            if run is None:
+                await self.send_error(channel, run_id, f"运行不存在或已过期: {run_id}")
+                return
+            last_event_id = message.get("lastEventId")
+            self._follow(channel, run, last_event_id if isinstance(last_event_id, int) else 0)
+
+        elif message_type == "cancel":
+            run = self.runs.get(message.get("runId"))
+            if run is None:
+                await self.send_error(None, message.get("runId"), "运行不在本连接上")
+                return
+            if run.run_id in self.started:
+                # 运行以 RUN_ERROR 结束，各订阅者（包括其它连接上的观察者）都会收到
+                run.cancel()
+            else:
+                await self._unsubscribe(run)
+
+        else:
+            await self.send_error(None, None, f"Unknown message type: {message_type}")
+
+    def _open_channel(self) -> int:
+        channel = self._channels
+        self._channels += 1
+        return channel
+
+    def _follow(self, channel: int, run: StreamRun, last_event_id: int) -> None:
+        self.runs[run.run_id] = run
+        self._channel_runs[channel] = run.run_id
+        self._forwarders[channel] = asyncio.create_task(
+            self._forward(channel, run, last_event_id), name=f"ws_forward:{run.run_id}"
+        )
+
+    async def _unsubscribe(self, run: StreamRun) -> None:
+        """结束本连接对运行的订阅，运行按宽限期规则继续或取消"""
+        self.runs.pop(run.run_id, None)
+        channels = [
+            channel for channel, run_id in self._channel_runs.items() if run_id == run.run_id
+        ]
+        forwarders = [
+            self._forwarders[channel] for channel in channels if channel in self._forwarders
+        ]
+        for task in forwarders:
+            task.cancel()
+        await asyncio.gather(*forwarders, return_exceptions=True)
+        for channel in channels:
+            await self.send_error(channel, run.run_id, "已取消订阅", "UNSUBSCRIBED")
+
+    async def _forward(self, channel: int, run: StreamRun, last_event_id: int) -> None:
+        """把运行的事件转发到连接；连接断开由接收循环发现并取消本任务"""
+        try:
+            async for event_id, payload in run.subscribe(last_event_id):
+                await self._send(encode_frame(channel, run.run_id, event_id, payload, self.compact))
+            if not run.finished:
+                # 积压超出上限被断开：提示客户端从最后收到的事件续传
+                error = "Subscriber too slow, resume from lastEventId"
+                await self.send_error(channel, run.run_id, error, "RESUBSCRIBE")
+        except (WebSocketDisconnect, RuntimeError):
+            pass  # 连接已关闭
+        finally:
+            self._forwarders.pop(channel, None)
+            self._channel_runs.pop(channel, None)
+
+    async def _send(self, frame: Union[str, bytes]) -> None:
+        async with self._send_lock:
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+
+    async def send_error(
+        self,
+        channel: Optional[int],
+        run_id: Optional[str],
+        error: str,
+        code: Optional[str] = None,
+    ) -> None:
+        """发送 RUN_ERROR 帧"""
+        event = {"type": AGUIEventType.RUN_ERROR, "runId": run_id, "error": error}
+        if code is not None:
+            event["code"] = code
+        payload = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        await self._send(encode_frame(channel, run_id, 0, payload, self.compact))
+
+    async def close(self) -> None:
+        """结束本连接的所有订阅"""
+        forwarders = list(self._forwarders.values())
+        for task in forwarders:
+            task.cancel()
+        await asyncio.gather(*forwarders, return_exceptions=True)
+
+
+@router.websocket("/agent/ws")
+async def agent_ws(
+    websocket: WebSocket,
+    compact: bool = Query(False),
+    agent: DevOpsAgent = Depends(get_agent),
+):
+    """AG-UI 协议 WebSocket 端点：单连接复用多个运行，支持连接内取消
+
+    ```javascript
+    const ws = new WebSocket('ws://localhost:8000/api/v1/agent/ws');
+    ws.onopen = () => ws.send(JSON.stringify({
+      type: 'run', threadId: 'thread-123', runId: 'run-456',
+      messages: [{role: 'user', content: '请帮我检查Navigation项目的代码覆盖率'}],
+    }));
+    ws.onmessage = (msg) => {
+      const {runId, eventId, event} = JSON.parse(msg.data);
+      console.log(runId, eventId, event.type, event);
+    };
+    // 取消：ws.send(JSON.stringify({type: 'cancel', runId: 'run-456'}))
+    ```
+    """
+    await websocket.accept()
+    connection = _Connection(websocket, agent, compact)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await connection.send_error(None, None, "Invalid message: expected JSON object")
+                continue
+            await connection.handle(message)
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket 连接断开（运行 {len(connection.runs)} 个）")
+    finally:
+        await connection.close()
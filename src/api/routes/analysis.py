@@ -3,10 +3,11 @@
 from datetime import datetime, timedelta
 from typing import List
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 
 from src.agent.devops_agent import DevOpsAgent
-from src.models.mongodb import get_analysis_records_collection
+from src.api.dependencies import get_agent
+from src.models.mongodb import get_async_analysis_records_collection
 from src.models.schemas import (
     AnalysisRequest,
     AnalysisResponse,
@@ -15,56 +16,62 @@ from src.models.schemas import (
     TrendDataPoint,
     TrendResponse,
 )
+from src.utils.deadline import Deadline
 
 router = APIRouter(prefix="/analysis", tags=["分析与报告"])
 
 
 @router.post("/project", response_model=AnalysisResponse)
-async def analyze_project(request: AnalysisRequest) -> AnalysisResponse:
+async def analyze_project(
+    request: AnalysisRequest, agent: DevOpsAgent = Depends(get_agent)
+) -> AnalysisResponse:
     """分析项目整体状况
 
     对指定项目进行全面分析，包括代码质量、测试情况、构建状态等。
 
     Args:
         request: 分析请求
+        agent: 共享的 Agent 实例
 
     Returns:
         AnalysisResponse: 分析结果
     """
-    # 创建 Agent
-    agent = DevOpsAgent()
-
-    # 执行项目分析
-    result = agent.analyze_project(request.project_name)
+    # 执行项目分析（默认并行预取全部数据源后单次 LLM 汇总）
+    result = await agent.aanalyze_project(
+        request.project_name,
+        deadline=Deadline.for_endpoint("analysis", request.deadline_seconds),
+    )
 
     return AnalysisResponse(
         project_name=request.project_name,
         metrics={},  # 这里可以添加具体的指标数据
         analysis=result["response"],
         timestamp=datetime.now(),
+        partial=result.get("partial", False),
     )
 
 
 @router.post("/report", response_model=ReportResponse)
-async def generate_report(request: ReportRequest) -> ReportResponse:
+async def generate_report(
+    request: ReportRequest, agent: DevOpsAgent = Depends(get_agent)
+) -> ReportResponse:
     """生成项目报告
 
     生成指定类型的项目健康报告。
 
     Args:
         request: 报告请求
+        agent: 共享的 Agent 实例
 
     Returns:
         ReportResponse: 报告内容
     """
-    # 创建 Agent
-    agent = DevOpsAgent()
-
-    # 生成报告提示
-    report_prompt = f"请为项目 {request.project_name} 生成一份{request.report_type}报告，包括关键指标、问题分析和改进建议。"
-
-    # 执行分析
-    result = agent.chat(report_prompt)
+    # 生成报告（默认并行预取全部数据源后单次 LLM 汇总）
+    result = await agent.agenerate_report(
+        request.project_name,
+        request.report_type,
+        deadline=Deadline.for_endpoint("report", request.deadline_seconds),
+    )
 
     # Mock 报告 ID（实际应保存到数据库）
     report_id = 1
@@ -76,6 +83,7 @@ async def generate_report(request: ReportRequest) -> ReportResponse:
         summary="项目整体健康状况良好",
         content=result["response"],
         created_at=datetime.now(),
+        partial=result.get("partial", False),
     )
 
 
@@ -100,17 +108,15 @@ async def get_trend(
     # 计算查询起始时间
     start_date = datetime.now() - timedelta(days=days)
 
-    # 从 MongoDB 查询历史记录
-    collection = get_analysis_records_collection()
-    records = list(
-        collection.find(
-            {
-                "project_name": project,
-                "metric_type": metric,
-                "timestamp": {"$gte": start_date},
-            }
-        ).sort("timestamp", 1)  # 按时间升序排序
-    )
+    # 从 MongoDB 查询历史记录（Motor 异步查询，不阻塞事件循环）
+    collection = get_async_analysis_records_collection()
+    records = await collection.find(
+        {
+            "project_name": project,
+            "metric_type": metric,
+            "timestamp": {"$gte": start_date},
+        }
+    ).sort("timestamp", 1).to_list(length=None)  # 按时间升序排序
 
     # 转换为数据点列表
     data_points = [
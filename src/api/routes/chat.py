@@ -2,37 +2,39 @@
 
 from datetime import datetime
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from src.agent.devops_agent import DevOpsAgent
+from src.api.dependencies import get_agent
 from src.models.schemas import ChatRequest, ChatResponse
+from src.utils.deadline import Deadline
 
 router = APIRouter(prefix="/chat", tags=["对话"])
 
 
 @router.post("", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest, agent: DevOpsAgent = Depends(get_agent)) -> ChatResponse:
     """对话接口
 
     与 Agent 进行对话式交互，查询项目信息。
 
     Args:
         request: 对话请求
+        agent: 共享的 Agent 实例
 
     Returns:
         ChatResponse: Agent 响应
     """
-    # 创建 Agent（不再需要 db 参数）
-    agent = DevOpsAgent()
-
-    # 执行对话
-    result = agent.chat(
+    # 执行对话（Agent 和会话记忆均为异步，不阻塞事件循环）
+    result = await agent.achat(
         message=request.message,
         session_id=request.session_id,
+        deadline=Deadline.for_endpoint("chat", request.deadline_seconds),
     )
 
     return ChatResponse(
         response=result["response"],
         session_id=result["session_id"],
         timestamp=datetime.now(),
+        partial=result.get("partial", False),
     )
@@ -1,38 +1,53 @@
 """流式对话接口路由（基于 Callbacks）"""
 
 from datetime import datetime
-from typing import AsyncGenerator, Any, Dict, List
+from typing import AsyncGenerator, Any, Dict, List, Optional, Tuple
 import asyncio
 import json
-from queue import Queue
+import logging
+import uuid
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.callbacks import AsyncCallbackHandler
 
 from src.agent.devops_agent import DevOpsAgent
-from src.models.schemas import ChatRequest, AGUIRunAgentInput
+from src.agent.instrumentation import RunMetricsCallbackHandler
+from src.agent.turn_writer import TurnWriter
+from src.api.dependencies import get_agent
+from src.config import settings
+from src.models.schemas import ChatRequest, AGUIRunAgentInput, Message
 from src.utils.logger import get_logger
 from src.utils.agui_adapter import AGUIAdapter
+from src.utils.background import spawn_background
+from src.utils.deadline import Deadline, deadline_scope
+from src.utils.run_registry import StreamRun, get_run_registry
 
 logger = get_logger(__name__)
 router = APIRouter(tags=["对话"])
 
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
 
-class StreamingCallbackHandler(BaseCallbackHandler):
-    """流式回调处理器
 
-    捕获 Agent 执行过程中的各种事件并放入队列。
+class StreamingCallbackHandler(AsyncCallbackHandler):
+    """流式回调处理器（异步版本）
+
+    捕获 Agent 执行过程中的各种事件并直接放入 asyncio.Queue，
+    回调在事件循环中执行，消费端 await 即可立即拿到事件，无需轮询。
     """
 
-    def __init__(self, queue: Queue):
+    def __init__(self, queue: asyncio.Queue):
         self.queue = queue
 
-    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
         """LLM 开始"""
-        self.queue.put({"type": "thinking", "content": "正在思考..."})
+        self.queue.put_nowait({"type": "thinking", "content": "正在思考..."})
 
-    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
         """LLM 生成新 token - 实现逐字显示
 
         🔥 支持 reasoning_content：
@@ -52,19 +67,19 @@ class StreamingCallbackHandler(BaseCallbackHandler):
                     reasoning = msg.additional_kwargs.get('reasoning_content')
                     if reasoning:
                         # 发送 reasoning token 事件
-                        self.queue.put({
+                        self.queue.put_nowait({
                             "type": "reasoning_token",
                             "content": reasoning
                         })
                         return  # reasoning token 不需要再发送普通 token
 
         # 发送普通 content token
-        self.queue.put({
+        self.queue.put_nowait({
             "type": "token",
             "content": token
         })
 
-    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
         """工具调用开始"""
         tool_name = serialized.get("name", "unknown")
 
@@ -72,111 +87,380 @@ class StreamingCallbackHandler(BaseCallbackHandler):
         if tool_name == "_Exception":
             return  # 不发送到队列
 
-        self.queue.put({
+        # run_id 用于区分同一轮中并发执行的多个工具调用
+        self.queue.put_nowait({
             "type": "tool_start",
             "tool": tool_name,
-            "input": input_str[:200]
+            "input": input_str[:200],
+            "run_id": str(kwargs.get("run_id", "")),
         })
 
-    def on_tool_end(self, output: str, **kwargs: Any) -> None:
+    async def on_tool_end(self, output: str, **kwargs: Any) -> None:
         """工具调用结束"""
         # 🔥 检查是否是内部错误消息（格式错误）
         if "Invalid Format:" in output or "Parsing LLM output produced" in output:
             return  # 不发送到队列
 
-        self.queue.put({
+        self.queue.put_nowait({
             "type": "tool_end",
-            "output": output[:200]
+            "output": output[:200],
+            "run_id": str(kwargs.get("run_id", "")),
         })
 
-    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+    async def on_agent_action(self, action: Any, **kwargs: Any) -> None:
         """Agent 行动"""
-        self.queue.put({
+        self.queue.put_nowait({
             "type": "action",
             "action": action.tool,
             "thought": action.log[:300] if hasattr(action, 'log') else ""
         })
 
-    def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
+    async def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
         """Agent 完成"""
         output = finish.return_values.get("output", "") if hasattr(finish, 'return_values') else ""
-        self.queue.put({
+        if DevOpsAgent.is_stopped_response(output):
+            return  # 提前停止，随后会强制生成最终回答，由 final 事件结束
+        self.queue.put_nowait({
             "type": "done",
             "response": output
         })
 
 
-async def stream_with_callback(agent: DevOpsAgent, message: str, session_id: str) -> AsyncGenerator[str, None]:
-    """使用回调的流式返回（AG-UI 协议）"""
-    queue = Queue()
-
-    try:
-        # 创建 AG-UI 适配器（🔥 启用调试模式）
-        adapter = AGUIAdapter(session_id=session_id, debug=True)
-
-        # 发送会话开始事件
-        start_events = adapter.convert_event({"type": "start", "session_id": session_id or "new"})
-        for event in start_events:
-            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
-
-        # 创建回调处理器
-        callback = StreamingCallbackHandler(queue)
-
-        # 在后台线程中运行 Agent
-        def run_agent():
-            try:
-                executor, sid, memory = agent.create_executor(session_id)
-
-                # 添加回调
-                result = executor.invoke(
-                    {"input": message},
-                    config={"callbacks": [callback]}
-                )
-
-                # 放入最终结果
-                queue.put({
-                    "type": "final",
-                    "response": result.get("output", ""),
-                    "session_id": sid
-                })
-
-            except Exception as e:
-                queue.put({"type": "error", "error": str(e)})
-            finally:
-                queue.put(None)  # 结束标记
-
-        # 启动后台线程
-        import threading
-        thread = threading.Thread(target=run_agent)
-        thread.start()
-
-        # 从队列读取并流式发送
-        while True:
-            await asyncio.sleep(0.1)  # 避免CPU占用过高
+def start_agent_run(
+    agent: DevOpsAgent,
+    message: str,
+    session_id: Optional[str],
+    deadline: Optional[Deadline] = None,
+    coalesce_ms: Optional[float] = None,
+    run_id: Optional[str] = None,
+    history: Optional[List[Tuple[str, str]]] = None,
+) -> StreamRun:
+    """在后台任务中启动流式 Agent 运行并登记，事件写入运行的回放缓冲区
+
+    Agent 通过 AgentExecutor.ainvoke 在事件循环中以协程方式运行，
+    异步回调把事件写入 asyncio.Queue，这里 await 队列逐个转换为 AG-UI 事件，
+    不占用线程，也不依赖轮询间隔。运行与 HTTP 连接解耦：连接断开不会中断运行，
+    客户端可通过 /agent/runs/{run_id}/stream 重连。
+
+    推理循环在请求时限前（预留强制回答时间）被停止，进行中的 LLM 和工具调用随之取消，
+    随后基于已获取的数据流式输出最终回答，RUN_FINISHED 带 partial 标记。
+
+    所有订阅者断开且宽限期内无人重连时取消运行：进行中的 LLM 流式请求和工具调用
+    随之取消，本轮记为 cancelled。在线程中执行的同步工具无法中断，其结果会被丢弃。
+
+    同一消息的连续增量内容在 coalesce_ms 窗口内合并为一个事件，
+    队列空闲时按窗口到期时间输出暂存内容。
+
+    Args:
+        agent: 共享的 Agent 实例
+        message: 用户消息
+        session_id: 会话 ID（None 表示新会话）
+        deadline: 请求时限
+        coalesce_ms: 增量内容合并窗口（毫秒），None 使用默认配置
+        run_id: 运行 ID，None 时自动生成
+        history: 客户端提供的对话历史（无状态模式），None 时从 MongoDB 加载
+
+    Returns:
+        StreamRun: 已启动的运行
+    """
+    if coalesce_ms is None:
+        coalesce_ms = settings.stream_coalesce_ms
+    run = StreamRun(
+        run_id or str(uuid.uuid4()),
+        buffer_size=settings.stream_replay_buffer_events,
+        grace_seconds=settings.stream_reconnect_grace_seconds,
+        subscriber_max_bytes=settings.stream_subscriber_max_bytes,
+        subscriber_compact_bytes=settings.stream_subscriber_compact_bytes,
+    )
+    # 创建 AG-UI 适配器（仅在 DEBUG 日志级别下输出阶段切换日志）
+    adapter = AGUIAdapter(
+        session_id=session_id,
+        run_id=run.run_id,
+        debug=logger.isEnabledFor(logging.DEBUG),
+        react_format=agent.backend != "tool_calling",
+        coalesce_ms=min(coalesce_ms, settings.stream_coalesce_max_ms),
+        coalesce_max_chars=settings.stream_coalesce_max_chars,
+    )
 
-            while not queue.empty():
-                event = queue.get()
+    async def produce(run: StreamRun) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        run_task = None
+        dispatcher = None
+
+        try:
+            # 发送会话开始事件
+            for agui_event in adapter.convert_event({"type": "start", "session_id": session_id or "new"}):
+                run.publish(agui_event)
+
+            # 创建回调处理器（流式事件 + 度量；完成的步骤交给增量写入器批量持久化）
+            callback = StreamingCallbackHandler(queue)
+            writer = TurnWriter(
+                message,
+                batch_size=settings.stream_persist_batch_steps,
+                flush_interval=settings.stream_persist_flush_seconds,
+            )
+            metrics = RunMetricsCallbackHandler(on_step_complete=writer.add_step)
+            callbacks = [callback, metrics]
+
+            # ReAct 模式下识别到完整 Action 即提前启动工具
+            dispatcher = agent.create_early_dispatcher()
+            if dispatcher is not None:
+                callbacks.append(dispatcher)
+
+            async def run_agent():
+                sid, memory = session_id, None
+                try:
+                    with deadline_scope(deadline):
+                        # 会话记忆通过 Motor 异步加载；无状态模式下历史来自客户端，不访问数据库
+                        executor, sid, memory = await agent.acreate_executor(
+                            session_id,
+                            max_execution_time=agent.loop_budget(deadline),
+                            history=history,
+                        )
+                        writer.begin(memory)
+
+                        # 添加回调
+                        result = await executor.ainvoke(
+                            {"input": message, "chat_history": agent.build_chat_history(memory)},
+                            config={"callbacks": callbacks}
+                        )
+
+                        # 推理循环被提前停止：基于已获取的数据强制作答（流式输出）
+                        output = result.get("output", "")
+                        partial = agent.is_stopped_response(output)
+                        if partial:
+                            queue.put_nowait({"type": "answer_start"})
+                            output = await agent.aforce_final_answer(
+                                message, metrics, deadline, callbacks=[callback, metrics]
+                            )
+
+                    metrics.finish()
+
+                    # 放入最终结果
+                    queue.put_nowait({
+                        "type": "final",
+                        "response": output,
+                        "session_id": sid,
+                        "partial": partial,
+                    })
+
+                    # 持久化（含度量）和摘要更新在后台进行，不延迟流的结束
+                    spawn_background(
+                        agent.asave_turn(
+                            memory,
+                            message,
+                            output,
+                            metrics,
+                            status="partial" if partial else "completed",
+                            writer=writer,
+                        ),
+                        name=f"save_turn:{sid}",
+                    )
+
+                except asyncio.CancelledError:
+                    # 运行被取消：记录已取消的轮次，已完成的步骤和度量仍会保存
+                    metrics.finish()
+                    if memory is not None:
+                        spawn_background(
+                            agent.asave_turn(
+                                memory, message, "", metrics, status="cancelled", writer=writer
+                            ),
+                            name=f"save_turn:{sid}",
+                        )
+                    raise
+                except Exception as e:
+                    queue.put_nowait({"type": "error", "error": str(e)})
+                finally:
+                    queue.put_nowait(None)  # 结束标记
+
+            run_task = asyncio.create_task(run_agent())
+
+            # 从队列读取、转换并写入回放缓冲区
+            while True:
+                timeout = adapter.flush_timeout()
+                if not queue.empty():
+                    event = queue.get_nowait()
+                elif timeout is None:
+                    event = await queue.get()
+                else:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        # 合并窗口到期，输出暂存的增量内容
+                        for agui_event in adapter.flush():
+                            run.publish(agui_event)
+                        continue
 
                 if event is None:  # 结束标记
+                    for agui_event in adapter.flush():
+                        run.publish(agui_event)
                     return
 
-                # 🔥 通过 AG-UI 适配器转换事件
-                agui_events = adapter.convert_event(event)
+                # 🔥 通过 AG-UI 适配器转换事件（可能是多个）
+                for agui_event in adapter.convert_event(event):
+                    run.publish(agui_event)
+
+        except asyncio.CancelledError:
+            # 运行被取消（客户端主动取消或断开超过宽限期）：以 RUN_ERROR 结束事件流
+            cancelled = adapter.convert_event({"type": "error", "error": "运行已取消"})
+            for agui_event in adapter.flush() + cancelled:
+                run.publish(agui_event)
+            raise
+
+        except Exception as e:
+            logger.error(f"流式响应错误: {str(e)}")
+            # 发送错误事件
+            for agui_event in adapter.flush() + adapter.convert_event({"type": "error", "error": str(e)}):
+                run.publish(agui_event)
+
+        finally:
+            # 运行被取消时一并取消 Agent 任务
+            if run_task is not None and not run_task.done():
+                run_task.cancel()
+                await asyncio.gather(run_task, return_exceptions=True)
+            if dispatcher is not None:
+                dispatcher.cancel_pending()
+
+    get_run_registry().register(run)
+    run.start(produce)
+    return run
+
+
+async def stream_run_events(
+    run: StreamRun,
+    request: Optional[Request] = None,
+    last_event_id: int = 0,
+) -> AsyncGenerator[str, None]:
+    """以 SSE 格式订阅运行的事件
+
+    每个事件带 id 字段，客户端断线后携带最后收到的 ID 重连即可从断点继续。
+    SSE 连接只有在下一次写入时才会发现对端已关闭，而工具调用期间可能长时间没有事件，
+    因此传入 request 时在空闲期间主动轮询连接状态。
+
+    Args:
+        run: 流式运行
+        request: 当前请求（用于检测断开）
+        last_event_id: 客户端已收到的最后一个事件 ID
+    """
+    async for event_id, payload in run.subscribe(
+        last_event_id,
+        is_disconnected=request.is_disconnected if request is not None else None,
+        poll_interval=settings.stream_disconnect_poll_seconds,
+    ):
+        yield f"id: {event_id}\ndata: {payload}\n\n"
+
+
+async def stream_with_callback(
+    agent: DevOpsAgent,
+    message: str,
+    session_id: Optional[str],
+    deadline: Optional[Deadline] = None,
+    request: Optional[Request] = None,
+    coalesce_ms: Optional[float] = None,
+) -> AsyncGenerator[str, None]:
+    """启动流式运行并以 SSE 格式订阅其事件（AG-UI 协议）"""
+    run = start_agent_run(agent, message, session_id, deadline, coalesce_ms)
+    async for chunk in stream_run_events(run, request):
+        yield chunk
+
+
+def client_history(messages: List[Message], max_turns: int) -> List[Tuple[str, str]]:
+    """从客户端消息中提取最近的对话历史（不含最后一条用户消息）
+
+    用户消息与紧随其后的助手回复组成一轮；没有回复的用户消息、system 消息等不进入历史。
+    从末尾向前扫描，取够 max_turns 轮即停止，历史再长也只处理需要的部分。
+
+    Args:
+        messages: RunAgentInput.messages
+        max_turns: 最多保留的轮次数
+
+    Returns:
+        List[Tuple[str, str]]: 按时间顺序排列的 (用户输入, 回复)
+    """
+    last_user = max(
+        (i for i, msg in enumerate(messages) if msg.role == "user"), default=len(messages)
+    )
+    pairs: List[Tuple[str, str]] = []
+    i = last_user - 1
+    while i > 0 and len(pairs) < max_turns:
+        if messages[i].role == "assistant" and messages[i - 1].role == "user":
+            pairs.append((messages[i - 1].content, messages[i].content))
+            i -= 2
+        else:
+            i -= 1
+    pairs.reverse()
+    return pairs
+
+
+def start_or_join_agent_run(agent: DevOpsAgent, request: AGUIRunAgentInput) -> Optional[StreamRun]:
+    """按 RunAgentInput 启动运行，或加入进行中的相同运行（SSE 和 WebSocket 端点共用）
+
+    以最后一条用户消息作为输入、threadId 作为会话 ID；forwardedProps.deadlineSeconds
+    和 forwardedProps.coalesceMs 分别覆盖请求时限和增量内容合并窗口。只按显式的 runId
+    去重：对应的运行仍在进行或在保留期内已结束时直接返回该运行（订阅者加入或回放），
+    不重复执行 Agent；同一会话中重复发送相同消息是新的提问，启动新的运行。
+
+    无状态模式（forwardedProps.stateless，默认见 agent_run_stateless）以 messages 中的
+    对话作为历史，按最近轮次数和 token 预算裁剪，请求路径不访问 MongoDB。
+
+    Args:
+        agent: 共享的 Agent 实例
+        request: AG-UI RunAgentInput
+
+    Returns:
+        Optional[StreamRun]: 运行；请求中没有用户消息时返回 None
+    """
+    # 提取最后一条用户消息
+    user_messages = [msg for msg in request.messages if msg.role == "user"]
+    if not user_messages:
+        return None
+    last_user_message = user_messages[-1].content
+    logger.info(f"提取的用户消息: {last_user_message}")
 
-                # 发送转换后的事件（可能是多个）
-                for agui_event in agui_events:
-                    yield f"data: {json.dumps(agui_event, ensure_ascii=False)}\n\n"
+    # 使用 threadId 作为 session_id
+    session_id = request.threadId or request.runId
 
-    except Exception as e:
-        logger.error(f"流式响应错误: {str(e)}")
-        # 发送错误事件
-        error_events = adapter.convert_event({"type": "error", "error": str(e)})
-        for event in error_events:
-            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    # 同一 runId 的运行仍在登记表中时作为观察者加入（已结束则回放），不重复执行 Agent
+    run = get_run_registry().get(request.runId) if request.runId else None
+    if run is not None:
+        logger.info(f"加入运行 {run.run_id}（已结束: {run.finished}，当前订阅者 {run.subscribers}）")
+        return run
+
+    # 请求时限：forwardedProps.deadlineSeconds 覆盖接口配置
+    forwarded = request.forwardedProps or {}
+    override = forwarded.get("deadlineSeconds")
+    deadline = Deadline.for_endpoint(
+        "agent_run", float(override) if isinstance(override, (int, float)) and override > 0 else None
+    )
+
+    # 增量内容合并窗口：forwardedProps.coalesceMs 覆盖默认配置
+    coalesce_ms = forwarded.get("coalesceMs")
+    if not isinstance(coalesce_ms, (int, float)) or coalesce_ms < 0:
+        coalesce_ms = None
+
+    # 无状态模式：forwardedProps.stateless 覆盖默认配置
+    stateless = forwarded.get("stateless")
+    if not isinstance(stateless, bool):
+        stateless = settings.agent_run_stateless
+    history = client_history(request.messages, settings.history_recent_turns) if stateless else None
+
+    return start_agent_run(
+        agent,
+        last_user_message,
+        session_id,
+        deadline,
+        coalesce_ms=coalesce_ms,
+        run_id=request.runId,
+        history=history,
+    )
 
 
 @router.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    agent: DevOpsAgent = Depends(get_agent),
+):
     """流式对话接口（AG-UI 协议）- 简化格式
 
     符合 AG-UI 协议标准的流式 SSE 接口，支持 TDesign Chat 组件直接集成。
@@ -187,6 +471,9 @@ async def chat_stream(request: ChatRequest):
     - TEXT_MESSAGE_*: 正式回答内容
     - TOOL_CALL_*: 工具调用过程
 
+    断线重连：每个事件带 SSE id，响应头 X-Run-Id 为运行 ID，
+    断线后通过 GET /agent/runs/{run_id}/stream 携带 Last-Event-ID 续传，Agent 不会重新执行。
+
     前端集成示例（Vue3 + TDesign Chat）：
     ```vue
     <template>
@@ -218,21 +505,23 @@ async def chat_stream(request: ChatRequest):
       -d '{"message": "查询项目状态", "session_id": null}'
     ```
     """
-    agent = DevOpsAgent()
-
+    deadline = Deadline.for_endpoint("chat_stream", request.deadline_seconds)
+    run = start_agent_run(
+        agent, request.message, request.session_id, deadline, coalesce_ms=request.coalesce_ms
+    )
     return StreamingResponse(
-        stream_with_callback(agent, request.message, request.session_id),
+        stream_run_events(run, http_request),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+        headers={**_SSE_HEADERS, "X-Run-Id": run.run_id},
     )
 
 
 @router.post("/agent/run")
-async def agent_run(request: AGUIRunAgentInput):
+async def agent_run(
+    request: AGUIRunAgentInput,
+    http_request: Request,
+    agent: DevOpsAgent = Depends(get_agent),
+):
     """AG-UI 协议标准端点 (RunAgentInput)
 
     完全符合 AG-UI 协议标准的接口，接收 RunAgentInput 格式请求。
@@ -255,6 +544,9 @@ async def agent_run(request: AGUIRunAgentInput):
 
     返回：AG-UI 标准事件流 (SSE)
 
+    多个客户端订阅同一运行：runId 对应的运行仍在进行（或在保留期内已结束）时，请求作为
+    观察者加入，从头回放已产生的事件后跟随实时事件，不会再次执行 Agent。
+
     前端集成示例（TDesign Chat）：
     ```vue
     <script setup>
@@ -276,11 +568,8 @@ async def agent_run(request: AGUIRunAgentInput):
         logger.info(f"    [{i}] role={msg.role}, content={msg.content[:50]}...")
     logger.info("=" * 80)
 
-    agent = DevOpsAgent()
-
-    # 提取最后一条用户消息
-    user_messages = [msg for msg in request.messages if msg.role == "user"]
-    if not user_messages:
+    run = start_or_join_agent_run(agent, request)
+    if run is None:
         # 如果没有用户消息，返回错误
         logger.warning("请求中没有用户消息")
         async def error_stream():
@@ -289,26 +578,39 @@ async def agent_run(request: AGUIRunAgentInput):
         return StreamingResponse(
             error_stream(),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            }
+            headers=_SSE_HEADERS,
         )
+    return StreamingResponse(
+        stream_run_events(run, http_request),
+        media_type="text/event-stream",
+        headers={**_SSE_HEADERS, "X-Run-Id": run.run_id},
+    )
 
-    # 获取最后一条用户消息
-    last_user_message = user_messages[-1].content
-    logger.info(f"提取的用户消息: {last_user_message}")
 
-    # 使用 threadId 作为 session_id
-    session_id = request.threadId or request.runId
+@router.get("/agent/runs/{run_id}/stream")
+async def agent_run_stream(
+    run_id: str,
+    http_request: Request,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    last_event_id_param: Optional[int] = Query(None, alias="lastEventId", ge=0),
+):
+    """重连流式运行
+
+    断线后从 Last-Event-ID 请求头（或 lastEventId 查询参数）之后补发错过的事件，
+    然后继续跟随运行的实时事件，不会重新执行 Agent。运行 ID 即 RUN_STARTED 事件的
+    runId（也在响应头 X-Run-Id 中返回）；运行结束后在保留期内仍可回放。
+
+    ```bash
+    curl -N http://localhost:8000/api/v1/agent/runs/<runId>/stream -H "Last-Event-ID: 42"
+    ```
+    """
+    run = get_run_registry().get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"运行不存在或已过期: {run_id}")
 
+    cursor = last_event_id if last_event_id is not None else last_event_id_param
     return StreamingResponse(
-        stream_with_callback(agent, last_user_message, session_id),
+        stream_run_events(run, http_request, cursor or 0),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+        headers={**_SSE_HEADERS, "X-Run-Id": run.run_id},
     )
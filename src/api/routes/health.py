@@ -1,10 +1,15 @@
 """健康检查路由"""
 
 from datetime import datetime
+from typing import Any, Dict
 
 from fastapi import APIRouter
 
+from src.agent.session_cache import get_session_cache
 from src.models.schemas import HealthResponse
+from src.tools.base import get_tool_cache
+from src.utils.llm_transport import get_llm_transport
+from src.utils.run_registry import get_run_registry
 
 router = APIRouter(prefix="/health", tags=["健康检查"])
 
@@ -21,3 +26,18 @@ async def health_check() -> HealthResponse:
         version="0.1.0",
         timestamp=datetime.now(),
     )
+
+
+@router.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """运行时指标接口
+
+    Returns:
+        Dict[str, Any]: 各组件的运行时统计
+    """
+    return {
+        "tool_cache": get_tool_cache().stats(),
+        "llm_transport": get_llm_transport().stats(),
+        "stream_runs": get_run_registry().stats(),
+        "session_cache": get_session_cache().stats(),
+    }
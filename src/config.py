@@ -4,7 +4,7 @@
 """
 
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -31,6 +31,134 @@ class Settings(BaseSettings):
         description="Deepseek Model Name",
     )
 
+    # Agent 配置
+    agent_backend: str = Field(
+        default="react",
+        description="Agent 后端 (react: 文本 ReAct 格式 / tool_calling: 原生函数调用，支持单轮并行调用多个工具)",
+    )
+    analysis_mode: str = Field(
+        default="prefetch",
+        description="项目分析模式 (prefetch: 并行预取数据后单次 LLM 汇总 / react: ReAct 逐步调用工具)",
+    )
+
+    react_early_dispatch: bool = Field(
+        default=True,
+        description="ReAct 流式输出中识别到完整 Action 后立即启动工具（依赖工具结果缓存合并调用）",
+    )
+
+    # LLM 连接池配置（进程内所有 LLM 调用共享）
+    llm_max_connections: int = Field(default=20, description="LLM 连接池最大连接数")
+    llm_max_keepalive_connections: int = Field(default=10, description="LLM 连接池最多保留的空闲连接数")
+    llm_keepalive_expiry: float = Field(default=60.0, description="LLM 空闲连接保留时间（秒）")
+    llm_http2: bool = Field(default=False, description="LLM 连接是否启用 HTTP/2（需要安装 h2）")
+    llm_connect_timeout: float = Field(default=10.0, description="LLM 建立连接的超时时间（秒）")
+    llm_warmup: bool = Field(default=True, description="启动时预热 LLM 连接")
+
+    # 请求时限配置
+    request_deadline_seconds: float = Field(
+        default=120.0,
+        description="请求默认墙钟时限（秒），0 表示不限时",
+    )
+    request_deadlines: Dict[str, float] = Field(
+        default_factory=dict,
+        description='按接口覆盖时限（秒），JSON 格式，键为 chat/chat_stream/agent_run/analysis/report，例如 {"chat_stream": 60}',
+    )
+    deadline_answer_reserve_seconds: float = Field(
+        default=15.0,
+        description="为超时后强制生成最终回答预留的时间（秒），最多占请求时限的 1/4",
+    )
+
+    # 流式接口配置
+    stream_disconnect_poll_seconds: float = Field(
+        default=1.0,
+        description="流式接口检测客户端断开连接的轮询间隔（秒）",
+    )
+    stream_coalesce_ms: float = Field(
+        default=30.0,
+        description="默认合并连续增量内容的时间窗口（毫秒），低于人眼可感知的延迟；0 表示逐 token 发送",
+    )
+    stream_coalesce_max_ms: float = Field(default=1000.0, description="客户端可指定的合并窗口上限（毫秒）")
+    stream_coalesce_max_chars: int = Field(default=512, description="合并内容达到该字符数时立即发送")
+    stream_replay_buffer_events: int = Field(
+        default=2000,
+        description="每次流式运行保留的已发送事件数，断线重连时从中回放",
+    )
+    stream_subscriber_compact_bytes: int = Field(
+        default=64 * 1024,
+        description="订阅者积压超过该字节数时合并增量内容、丢弃中间的工具参数增量",
+    )
+    stream_subscriber_max_bytes: int = Field(
+        default=1024 * 1024,
+        description="订阅者积压压缩后仍超过该字节数时断开（客户端可凭 Last-Event-ID 续传）",
+    )
+    stream_reconnect_grace_seconds: float = Field(
+        default=30.0,
+        description="所有客户端断开后等待重连的时间（秒），超时取消 Agent 执行；0 表示立即取消",
+    )
+    stream_persist_batch_steps: int = Field(
+        default=4,
+        description="流式轮次的已完成步骤攒够该数量时批量写入 MongoDB",
+    )
+    stream_persist_flush_seconds: float = Field(
+        default=2.0,
+        description="距上次写入超过该时间（秒）时，新完成的步骤立即写入",
+    )
+    stream_run_retention_seconds: float = Field(
+        default=300.0,
+        description="运行结束后保留事件以供重连回放的时间（秒）",
+    )
+
+    # 对话历史配置
+    history_recent_turns: int = Field(default=4, description="Prompt 中原样保留的最近对话轮次数")
+    history_token_budget: int = Field(default=2000, description="Prompt 中对话历史的 token 上限")
+    history_summary_batch: int = Field(
+        default=2,
+        description="窗口外未摘要的轮次累计达到该数量时才增量更新摘要",
+    )
+    history_summary_max_tokens: int = Field(default=500, description="滚动摘要的最大 token 数")
+    history_load_turns: int = Field(
+        default=50,
+        description=(
+            "加载会话时读取的最近轮次数上限（只读取问答字段），"
+            "应大于 history_recent_turns + history_summary_batch"
+        ),
+    )
+    agent_run_stateless: bool = Field(
+        default=False,
+        description=(
+            "/agent/run 默认使用无状态模式：以客户端 messages 作为对话历史，请求路径不读 MongoDB，"
+            "轮次在后台写入；forwardedProps.stateless 可按请求覆盖"
+        ),
+    )
+
+    # 会话缓存配置
+    session_cache_enabled: bool = Field(default=True, description="是否启用进程内会话历史缓存")
+    session_cache_max_bytes: int = Field(
+        default=32 * 1024 * 1024, description="会话缓存容量上限（字节，超出时按 LRU 淘汰）"
+    )
+    session_cache_idle_seconds: float = Field(
+        default=1800.0, description="会话缓存条目的空闲过期时间（秒）"
+    )
+
+    # 工具结果缓存配置
+    tool_cache_enabled: bool = Field(default=True, description="是否启用工具结果缓存")
+    tool_cache_max_entries: int = Field(default=512, description="工具结果缓存最大条目数（LRU 淘汰）")
+    tool_cache_ttls: Dict[str, float] = Field(
+        default_factory=dict,
+        description='按工具名覆盖缓存有效期（秒），JSON 格式，例如 {"jenkins": 5}',
+    )
+
+    # 工具结果格式配置
+    observation_format: str = Field(
+        default="json",
+        description="工具结果写入 Prompt 的格式 (pretty: 缩进 JSON / json: 最小化 JSON / compact: 投影+表格化+截断)",
+    )
+    observation_top_k: int = Field(default=5, description="compact 格式下每个列表最多保留的元素数，0 表示不截断")
+    observation_fields: Dict[str, List[str]] = Field(
+        default_factory=dict,
+        description='compact 格式下按工具名覆盖保留的字段，JSON 格式，例如 {"jenkins": ["job_name", "summary"]}',
+    )
+
     # 数据库配置
     database_url: str = Field(
         default="sqlite:///./devops_agent.db",
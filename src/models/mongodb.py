@@ -6,7 +6,7 @@
 from typing import Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from pymongo.database import Database
 
 from src.config import settings
@@ -64,6 +64,12 @@ class MongoDBManager:
         conversations.create_index([("updated_at", DESCENDING)])
         conversations.create_index([("user_id", ASCENDING), ("updated_at", DESCENDING)])
 
+        # conversation_turns 集合索引（轮次按会话和轮次 ID 读写）
+        conversation_turns = db.conversation_turns
+        conversation_turns.create_index(
+            [("session_id", ASCENDING), ("turn_id", ASCENDING)], unique=True
+        )
+
         # analysis_records 集合索引
         analysis_records = db.analysis_records
         analysis_records.create_index([("project_name", ASCENDING), ("metric_type", ASCENDING)])
@@ -75,6 +81,42 @@ class MongoDBManager:
 
         logger.info("MongoDB 索引创建完成")
 
+    @classmethod
+    def migrate_embedded_turns(cls) -> int:
+        """将旧会话文档内嵌的 turns 数组迁移到 conversation_turns 集合
+
+        逐个会话写入轮次（已存在的轮次不覆盖），再将 turn_count 设为最大轮次 ID 并删除
+        turns 数组。可重复执行，中断后重新执行即可继续。
+
+        Returns:
+            int: 迁移的会话数
+        """
+        db = cls.get_database()
+        migrated = 0
+        legacy = db.conversations.find(
+            {"turns": {"$exists": True}}, {"session_id": 1, "turns": 1, "turn_count": 1}
+        )
+        for doc in legacy:
+            turns = doc.get("turns") or []
+            if turns:
+                db.conversation_turns.bulk_write([
+                    UpdateOne(
+                        {"session_id": doc["session_id"], "turn_id": turn["turn_id"]},
+                        {"$setOnInsert": {k: v for k, v in turn.items() if k != "turn_id"}},
+                        upsert=True,
+                    )
+                    for turn in turns
+                ])
+            turn_count = max([doc.get("turn_count") or 0] + [turn["turn_id"] for turn in turns])
+            db.conversations.update_one(
+                {"_id": doc["_id"]}, {"$set": {"turn_count": turn_count}, "$unset": {"turns": ""}}
+            )
+            migrated += 1
+
+        if migrated:
+            logger.info(f"迁移了 {migrated} 个会话的内嵌轮次到 conversation_turns 集合")
+        return migrated
+
 
 class AsyncMongoDBManager:
     """MongoDB 连接管理器（异步版本）"""
@@ -87,7 +129,13 @@ class AsyncMongoDBManager:
         """获取异步 MongoDB 客户端"""
         if cls._client is None:
             logger.info(f"连接 MongoDB (异步): {settings.mongodb_url}")
-            cls._client = AsyncIOMotorClient(settings.mongodb_url)
+            # 与同步客户端相同的短超时，MongoDB 不可用时尽快降级
+            cls._client = AsyncIOMotorClient(
+                settings.mongodb_url,
+                serverSelectionTimeoutMS=2000,
+                connectTimeoutMS=2000,
+                socketTimeoutMS=2000,
+            )
         return cls._client
 
     @classmethod
@@ -126,6 +174,11 @@ def get_conversations_collection():
     return get_db().conversations
 
 
+def get_conversation_turns_collection():
+    """获取 conversation_turns 集合"""
+    return get_db().conversation_turns
+
+
 def get_analysis_records_collection():
     """获取 analysis_records 集合"""
     return get_db().analysis_records
@@ -134,3 +187,18 @@ def get_analysis_records_collection():
 def get_reports_collection():
     """获取 reports 集合"""
     return get_db().reports
+
+
+def get_async_conversations_collection():
+    """获取 conversations 集合（异步）"""
+    return get_async_db().conversations
+
+
+def get_async_conversation_turns_collection():
+    """获取 conversation_turns 集合（异步）"""
+    return get_async_db().conversation_turns
+
+
+def get_async_analysis_records_collection():
+    """获取 analysis_records 集合（异步）"""
+    return get_async_db().analysis_records
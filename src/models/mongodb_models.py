@@ -18,6 +18,12 @@ class AgentStep(BaseModel):
     action_input: Optional[Dict[str, Any]] = Field(None, description="工具输入参数")
     observation: Optional[str] = Field(None, description="工具返回结果")
     duration_ms: Optional[int] = Field(None, description="执行耗时（毫秒）")
+    llm_duration_ms: Optional[int] = Field(None, description="LLM 耗时（毫秒）")
+    tool_duration_ms: Optional[int] = Field(None, description="工具耗时（毫秒）")
+    ttft_ms: Optional[int] = Field(None, description="LLM 首 token 延迟（毫秒）")
+    prompt_tokens: Optional[int] = Field(None, description="Prompt token 数")
+    completion_tokens: Optional[int] = Field(None, description="Completion token 数")
+    reasoning_tokens: Optional[int] = Field(None, description="Reasoning token 数")
     timestamp: datetime = Field(default_factory=datetime.now, description="时间戳")
 
 
@@ -38,6 +44,20 @@ class ConversationTurn(BaseModel):
     final_response: str = Field(..., description="最终回复")
     total_tokens: Optional[int] = Field(None, description="总 token 消耗")
     duration_ms: Optional[int] = Field(None, description="总耗时（毫秒）")
+    prompt_tokens: Optional[int] = Field(None, description="Prompt token 数")
+    completion_tokens: Optional[int] = Field(None, description="Completion token 数")
+    reasoning_tokens: Optional[int] = Field(None, description="Reasoning token 数")
+    llm_calls: Optional[int] = Field(None, description="LLM 调用次数")
+    llm_duration_ms: Optional[int] = Field(None, description="LLM 总耗时（毫秒）")
+    tool_duration_ms: Optional[int] = Field(None, description="工具总耗时（毫秒）")
+    ttft_ms: Optional[int] = Field(None, description="首 token 延迟（毫秒）")
+    status: str = Field(
+        "completed",
+        description=(
+            "轮次状态 (completed: 正常完成 / partial: 因请求时限基于部分数据作答 / "
+            "cancelled: 客户端断开后取消 / running: 流式轮次进行中，步骤逐批写入)"
+        ),
+    )
     timestamp: datetime = Field(default_factory=datetime.now, description="时间戳")
 
 
@@ -48,8 +68,13 @@ class ConversationDocument(BaseModel):
     user_id: Optional[str] = Field(None, description="用户 ID")
     title: Optional[str] = Field(None, description="对话标题")
 
-    # 所有对话轮次
+    # 所有对话轮次：单独存储在 conversation_turns 集合中，读取完整对话时组装，不写入会话文档
     turns: List[ConversationTurn] = Field(default_factory=list, description="对话轮次列表")
+    turn_count: int = Field(0, description="已分配的轮次 ID 数（与追加轮次在同一次更新中原子递增）")
+
+    # 滚动摘要：较早的轮次压缩为摘要，按需增量更新
+    summary: Optional[str] = Field(None, description="较早对话轮次的滚动摘要")
+    summarized_turns: int = Field(0, description="已压缩进摘要的轮次数（从第 1 轮开始计）")
 
     # 元数据
     metadata: Dict[str, Any] = Field(default_factory=dict, description="元数据")
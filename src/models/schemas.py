@@ -29,6 +29,13 @@ class AGUIRunAgentInput(BaseModel):
     tools: Optional[List[Dict[str, Any]]] = Field(None, description="可用工具")
     state: Optional[Dict[str, Any]] = Field(None, description="状态数据")
     context: Optional[Dict[str, Any]] = Field(None, description="上下文信息")
+    forwardedProps: Optional[Dict[str, Any]] = Field(
+        None,
+        description=(
+            "透传参数，支持 deadlineSeconds（本次请求时限，秒）、coalesceMs（增量内容合并窗口，毫秒）、"
+            "stateless（是否以 messages 作为对话历史、不读取服务端会话，默认见 AGENT_RUN_STATELESS）"
+        ),
+    )
 
 
 class ChatRequest(BaseModel):
@@ -36,6 +43,12 @@ class ChatRequest(BaseModel):
 
     message: str = Field(..., description="用户消息", min_length=1)
     session_id: Optional[str] = Field(None, description="会话 ID")
+    deadline_seconds: Optional[float] = Field(
+        None, description="本次请求时限（秒），不指定则使用接口配置", gt=0
+    )
+    coalesce_ms: Optional[float] = Field(
+        None, description="流式接口合并增量内容的时间窗口（毫秒），0 表示逐 token 发送", ge=0
+    )
 
 
 class ChatResponse(BaseModel):
@@ -44,6 +57,7 @@ class ChatResponse(BaseModel):
     response: str = Field(..., description="Agent 响应")
     session_id: str = Field(..., description="会话 ID")
     timestamp: datetime = Field(..., description="响应时间")
+    partial: bool = Field(False, description="是否因请求时限基于部分数据生成")
 
 
 # ========== 分析相关 ==========
@@ -56,6 +70,9 @@ class AnalysisRequest(BaseModel):
     metrics: Optional[List[str]] = Field(
         None, description="指定要分析的指标列表，不指定则分析全部"
     )
+    deadline_seconds: Optional[float] = Field(
+        None, description="本次请求时限（秒），不指定则使用接口配置", gt=0
+    )
 
 
 class AnalysisResponse(BaseModel):
@@ -65,6 +82,7 @@ class AnalysisResponse(BaseModel):
     metrics: Dict[str, Any] = Field(..., description="指标数据")
     analysis: str = Field(..., description="分析结果")
     timestamp: datetime = Field(..., description="分析时间")
+    partial: bool = Field(False, description="是否因请求时限基于部分数据生成")
 
 
 # ========== 报告相关 ==========
@@ -75,6 +93,9 @@ class ReportRequest(BaseModel):
 
     project_name: str = Field(..., description="项目名称", min_length=1)
     report_type: str = Field(default="daily", description="报告类型 (daily/weekly/monthly)")
+    deadline_seconds: Optional[float] = Field(
+        None, description="本次请求时限（秒），不指定则使用接口配置", gt=0
+    )
 
 
 class ReportResponse(BaseModel):
@@ -86,6 +107,7 @@ class ReportResponse(BaseModel):
     summary: str = Field(..., description="报告摘要")
     content: str = Field(..., description="报告内容")
     created_at: datetime = Field(..., description="创建时间")
+    partial: bool = Field(False, description="是否因请求时限基于部分数据生成")
 
 
 # ========== 趋势相关 ==========
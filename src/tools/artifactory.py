@@ -3,7 +3,7 @@
 查询 Artifactory 制品信息和版本管理。
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from src.config import settings
 from src.tools.base import DevOpsBaseTool
@@ -19,6 +19,20 @@ class ArtifactoryTool(DevOpsBaseTool):
     返回: 最新制品版本、版本列表、制品大小等信息
     """
 
+    # 制品版本变化慢，可缓存数分钟
+    cache_ttl: float = 300.0
+
+    # 校验和、存储路径对分析没有帮助，compact 格式下不发送给 LLM
+    observation_fields: Optional[List[str]] = [
+        "artifact",
+        "repository",
+        "latest_version.version",
+        "latest_version.size_mb",
+        "latest_version.created",
+        "versions",
+        "statistics",
+    ]
+
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行 Artifactory 查询
 
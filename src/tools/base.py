@@ -3,19 +3,237 @@
 所有 DevOps Tools 的基类，提供通用功能。
 """
 
+import asyncio
+import json
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from langchain_core.tools import BaseTool as LangChainBaseTool
-from langchain_core.callbacks.manager import CallbackManagerForToolRun
+from langchain_core.callbacks.manager import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
 from pydantic import BaseModel
 
+from src.config import settings
+from src.tools.formatters import get_formatter
+from src.utils.deadline import DeadlineExceeded, current_deadline
 from src.utils.http_client import HTTPClient
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+class _FetchAbandoned(Exception):
+    """发起请求的协程被取消，等待同一结果的调用方需要自行重新获取"""
+
+
+class ToolResultCache:
+    """工具结果缓存
+
+    进程内共享，按 "工具名 + 规范化查询" 缓存工具的原始结果字典：
+    - 每个条目按调用方给出的 TTL 过期
+    - 条目数有上限，超出时按 LRU 淘汰
+    - 相同 key 的并发请求合并为一次实际调用（同步线程和协程均可等待）
+    - 只缓存成功结果，异常不缓存
+    """
+
+    def __init__(self, max_entries: int = 512):
+        """初始化缓存
+
+        Args:
+            max_entries: 最大条目数
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(tool_name: str, query: str) -> str:
+        """生成缓存 key
+
+        去掉首尾空白和引号并合并连续空白；JSON 输入按 key 排序后重新序列化，
+        使 LLM 生成的等价输入命中同一条目。
+
+        Args:
+            tool_name: 工具名称
+            query: 原始查询参数
+
+        Returns:
+            str: 缓存 key
+        """
+        text = query.strip().strip("\"'").strip()
+        try:
+            normalized = json.dumps(
+                json.loads(text), ensure_ascii=False, sort_keys=True, separators=(",", ":")
+            )
+        except ValueError:
+            normalized = " ".join(text.split())
+        return f"{tool_name}:{normalized}"
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找未过期的条目（调用方需持有锁）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _begin(self, key: str) -> Tuple[Optional[Dict[str, Any]], Future, bool]:
+        """查找缓存或登记进行中的请求
+
+        Returns:
+            (命中的结果, 进行中的 Future, 当前调用方是否负责实际获取)
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value, None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+            self.misses += 1
+            future = Future()
+            self._inflight[key] = future
+            return None, future, True
+
+    def _complete(self, key: str, future: Future, ttl: float, value: Dict[str, Any]) -> None:
+        """写入结果并唤醒等待方"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._inflight.pop(key, None)
+        if not future.done():
+            future.set_result(value)
+
+    def _fail(self, key: str, future: Future, error: BaseException) -> None:
+        """登记失败并唤醒等待方"""
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not future.done():
+            future.set_exception(error)
+
+    def get_or_fetch(
+        self, key: str, ttl: float, fetch: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """同步获取：命中直接返回，否则调用 fetch（并发请求只调用一次）
+
+        Args:
+            key: 缓存 key
+            ttl: 有效期（秒）
+            fetch: 实际获取结果的函数
+
+        Returns:
+            Dict[str, Any]: 结果字典
+        """
+        while True:
+            value, future, owner = self._begin(key)
+            if value is not None:
+                return value
+            if not owner:
+                try:
+                    return future.result()
+                except _FetchAbandoned:
+                    continue
+
+            try:
+                value = fetch()
+            except Exception as e:
+                self._fail(key, future, e)
+                raise
+            self._complete(key, future, ttl, value)
+            return value
+
+    async def aget_or_fetch(
+        self, key: str, ttl: float, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """异步获取：语义同 get_or_fetch
+
+        Args:
+            key: 缓存 key
+            ttl: 有效期（秒）
+            fetch: 实际获取结果的协程函数
+
+        Returns:
+            Dict[str, Any]: 结果字典
+        """
+        while True:
+            value, future, owner = self._begin(key)
+            if value is not None:
+                return value
+            if not owner:
+                try:
+                    # shield：等待方被取消（时限到期、客户端断开）时不取消共享的 Future，
+                    # 否则发起方和其他等待方会一起失败
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except _FetchAbandoned:
+                    continue
+
+            try:
+                value = await fetch()
+            except asyncio.CancelledError:
+                # 发起方被取消不代表其他等待方也要放弃，让它们重新获取
+                self._fail(key, future, _FetchAbandoned())
+                raise
+            except Exception as e:
+                self._fail(key, future, e)
+                raise
+            self._complete(key, future, ttl, value)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计
+
+        Returns:
+            Dict[str, Any]: 条目数、命中/未命中/合并/淘汰次数和命中率
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """清空缓存条目（不影响进行中的请求）"""
+        with self._lock:
+            self._entries.clear()
+
+
+_tool_cache = ToolResultCache(max_entries=settings.tool_cache_max_entries)
+
+
+def get_tool_cache() -> ToolResultCache:
+    """获取进程级共享的工具结果缓存"""
+    return _tool_cache
+
+
 class DevOpsBaseTool(LangChainBaseTool, ABC):
     """DevOps 工具基类
 
@@ -26,6 +244,13 @@ class DevOpsBaseTool(LangChainBaseTool, ABC):
     name: str
     description: str
 
+    # 结果缓存有效期（秒），0 表示不缓存；可通过 TOOL_CACHE_TTLS 按工具名覆盖
+    cache_ttl: float = 0.0
+
+    # compact 格式下保留的字段（点号分隔的路径），None 表示全部保留；
+    # 可通过 OBSERVATION_FIELDS 按工具名覆盖
+    observation_fields: Optional[List[str]] = None
+
     def _run(
         self,
         query: str,
@@ -42,13 +267,66 @@ class DevOpsBaseTool(LangChainBaseTool, ABC):
         """
         logger.info(f"执行工具: {self.name}, 查询: {query}")
         try:
-            result = self._execute(query)
+            result = self._fetch(query)
             logger.info(f"工具 {self.name} 执行成功")
             return self._format_result(result)
         except Exception as e:
             logger.error(f"工具 {self.name} 执行失败: {str(e)}")
             return self._format_error(str(e))
 
+    def _effective_cache_ttl(self) -> float:
+        """获取当前工具生效的缓存有效期（秒）"""
+        if not settings.tool_cache_enabled:
+            return 0.0
+        return settings.tool_cache_ttls.get(self.name, self.cache_ttl)
+
+    def _fetch(self, query: str) -> Dict[str, Any]:
+        """获取工具结果（经过共享缓存）
+
+        Args:
+            query: 查询参数
+
+        Returns:
+            Dict[str, Any]: 执行结果字典
+        """
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            # 同步调用无法中途取消，时限已到时不再发起新的请求
+            raise DeadlineExceeded("已超过请求时限")
+
+        ttl = self._effective_cache_ttl()
+        if ttl <= 0:
+            return self._execute(query)
+        key = ToolResultCache.make_key(self.name, query)
+        return get_tool_cache().get_or_fetch(key, ttl, lambda: self._execute(query))
+
+    async def _afetch(self, query: str) -> Dict[str, Any]:
+        """异步获取工具结果（经过共享缓存）
+
+        处于请求时限内时，超过剩余时间即取消本次获取。
+
+        Args:
+            query: 查询参数
+
+        Returns:
+            Dict[str, Any]: 执行结果字典
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            return await self._afetch_cached(query)
+        try:
+            return await asyncio.wait_for(self._afetch_cached(query), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("已超过请求时限") from None
+
+    async def _afetch_cached(self, query: str) -> Dict[str, Any]:
+        """异步获取工具结果（经过共享缓存，不受请求时限约束）"""
+        ttl = self._effective_cache_ttl()
+        if ttl <= 0:
+            return await self._aexecute(query)
+        key = ToolResultCache.make_key(self.name, query)
+        return await get_tool_cache().aget_or_fetch(key, ttl, lambda: self._aexecute(query))
+
     @abstractmethod
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行具体的工具逻辑
@@ -72,9 +350,8 @@ class DevOpsBaseTool(LangChainBaseTool, ABC):
         Returns:
             str: 格式化后的字符串
         """
-        import json
-
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        fields = settings.observation_fields.get(self.name, self.observation_fields)
+        return get_formatter().format(result, fields)
 
     def _format_error(self, error: str) -> str:
         """格式化错误信息
@@ -87,13 +364,29 @@ class DevOpsBaseTool(LangChainBaseTool, ABC):
         """
         return f"错误: {error}"
 
-    async def _async_run(
+    async def _aexecute(self, query: str) -> Dict[str, Any]:
+        """异步执行具体的工具逻辑
+
+        默认在线程池中调用同步的 _execute；对接真实 REST API 的子类
+        应直接覆盖此方法（配合 HTTPClient），避免占用线程。
+
+        Args:
+            query: 查询参数
+
+        Returns:
+            Dict[str, Any]: 执行结果字典
+        """
+        return await asyncio.to_thread(self._execute, query)
+
+    async def _arun(
         self,
         query: str,
-        run_manager: Optional[CallbackManagerForToolRun] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> str:
         """异步执行工具
 
+        AgentExecutor.ainvoke 和并行预取都会走此路径。
+
         Args:
             query: 查询参数
             run_manager: 回调管理器
@@ -101,5 +394,11 @@ class DevOpsBaseTool(LangChainBaseTool, ABC):
         Returns:
             str: 执行结果
         """
-        # 默认调用同步方法
-        return self._run(query, run_manager)
+        logger.info(f"执行工具(异步): {self.name}, 查询: {query}")
+        try:
+            result = await self._afetch(query)
+            logger.info(f"工具 {self.name} 执行成功")
+            return self._format_result(result)
+        except Exception as e:
+            logger.error(f"工具 {self.name} 执行失败: {str(e)}")
+            return self._format_error(str(e))
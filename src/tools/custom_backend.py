@@ -20,6 +20,9 @@ class CustomBackendTool(DevOpsBaseTool):
     返回: 自定义后端 API 的响应数据
     """
 
+    # 自定义指标默认短时缓存
+    cache_ttl: float = 30.0
+
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行自定义后端查询
 
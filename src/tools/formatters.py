@@ -0,0 +1,192 @@
+"""工具结果格式化
+
+工具结果会作为 Observation 写入 agent_scratchpad，并在之后的每次迭代中
+重复发送给 LLM，因此格式越紧凑，多步推理的 prompt token 越少。
+
+内置格式：
+- pretty:  缩进 JSON（旧格式，便于人工阅读）
+- json:    最小化 JSON（默认）
+- compact: 在最小化 JSON 基础上做字段投影、同构列表表格化和 top-k 截断
+
+可通过 register_formatter 注册自定义格式，并用 OBSERVATION_FORMAT 配置选择。
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.config import settings
+
+
+class ObservationFormatter(ABC):
+    """工具结果格式化器基类"""
+
+    @abstractmethod
+    def format(self, result: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> str:
+        """将工具结果格式化为 Observation 文本
+
+        实现不得修改 result（结果可能来自共享缓存）。
+
+        Args:
+            result: 工具结果字典
+            fields: 需要保留的字段（点号分隔的路径），None 表示全部保留
+
+        Returns:
+            str: 格式化后的文本
+        """
+
+
+class PrettyJSONFormatter(ObservationFormatter):
+    """缩进 JSON"""
+
+    def format(self, result: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> str:
+        return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+class JSONFormatter(ObservationFormatter):
+    """最小化 JSON（去掉缩进和分隔符后的空格）"""
+
+    def format(self, result: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> str:
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+
+class CompactFormatter(ObservationFormatter):
+    """紧凑格式
+
+    输出仍是合法的最小化 JSON，在此基础上：
+    - 按 fields 做字段投影
+    - 元素均为扁平字典的列表（如 recent_builds、failed_cases、versions）
+      编码为 {"columns": [...], "rows": [[...], ...]}，字段名只出现一次
+    - 列表只保留前 top_k 项，并用 "more" 记录省略的数量
+    """
+
+    def __init__(self, top_k: int = 5):
+        """初始化紧凑格式化器
+
+        Args:
+            top_k: 每个列表最多保留的元素数，0 表示不截断
+        """
+        self.top_k = top_k
+
+    def format(self, result: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> str:
+        data = project_fields(result, fields) if fields else result
+        return json.dumps(self._encode(data), ensure_ascii=False, separators=(",", ":"))
+
+    def _encode(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return self._encode_list(value)
+        return value
+
+    def _encode_list(self, items: List[Any]) -> Any:
+        omitted = 0
+        if self.top_k and len(items) > self.top_k:
+            omitted = len(items) - self.top_k
+            items = items[: self.top_k]
+
+        if _is_table(items):
+            columns: List[str] = []
+            for item in items:
+                columns.extend(key for key in item if key not in columns)
+            encoded: Dict[str, Any] = {
+                "columns": columns,
+                "rows": [[item.get(column) for column in columns] for item in items],
+            }
+            if omitted:
+                encoded["more"] = omitted
+            return encoded
+
+        encoded_items = [self._encode(item) for item in items]
+        if omitted:
+            encoded_items.append(f"...另有 {omitted} 项")
+        return encoded_items
+
+
+def _is_table(items: List[Any]) -> bool:
+    """列表是否可以表格化：至少两项，且每项都是值为标量的字典"""
+    if len(items) < 2:
+        return False
+    return all(
+        isinstance(item, dict)
+        and not any(isinstance(value, (dict, list)) for value in item.values())
+        for item in items
+    )
+
+
+def project_fields(data: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """按字段路径投影字典（返回新字典，不修改原数据）
+
+    路径用点号分隔，例如 "latest_version.version" 只保留 latest_version 下的
+    version 字段；路径指向列表时对列表中的每个字典元素做同样的投影。
+
+    Args:
+        data: 原始字典
+        fields: 字段路径列表
+
+    Returns:
+        Dict[str, Any]: 投影后的字典
+    """
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[parts[-1]] = None
+    return _project(data, tree)
+
+
+def _project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+
+_FORMATTERS: Dict[str, Callable[[], ObservationFormatter]] = {
+    "pretty": PrettyJSONFormatter,
+    "json": JSONFormatter,
+    "compact": lambda: CompactFormatter(top_k=settings.observation_top_k),
+}
+
+
+def register_formatter(name: str, factory: Callable[[], ObservationFormatter]) -> None:
+    """注册自定义格式
+
+    Args:
+        name: 格式名称（OBSERVATION_FORMAT 的取值）
+        factory: 创建格式化器的工厂函数
+    """
+    _FORMATTERS[name] = factory
+
+
+def available_formats() -> List[str]:
+    """已注册的格式名称"""
+    return list(_FORMATTERS)
+
+
+def get_formatter(name: Optional[str] = None) -> ObservationFormatter:
+    """获取格式化器
+
+    Args:
+        name: 格式名称，默认使用 OBSERVATION_FORMAT 配置
+
+    Returns:
+        ObservationFormatter: 格式化器
+
+    Raises:
+        ValueError: 格式未注册
+    """
+    name = name or settings.observation_format
+    factory = _FORMATTERS.get(name)
+    if factory is None:
+        raise ValueError(f"未知的 Observation 格式: {name}，可选: {', '.join(_FORMATTERS)}")
+    return factory()
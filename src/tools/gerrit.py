@@ -19,6 +19,9 @@ class GerritTool(DevOpsBaseTool):
     返回: Patchset 合并统计、待审核列表等信息
     """
 
+    # 代码审查状态分钟级变化
+    cache_ttl: float = 60.0
+
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行 Gerrit 查询
 
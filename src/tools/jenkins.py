@@ -19,6 +19,9 @@ class JenkinsTool(DevOpsBaseTool):
     返回: 构建状态、成功率、失败任务等信息
     """
 
+    # 构建状态变化快，只缓存数秒
+    cache_ttl: float = 10.0
+
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行 Jenkins 查询
 
@@ -19,6 +19,9 @@ class TestCasesTool(DevOpsBaseTool):
     返回: 测试用例通过率、失败用例列表等信息
     """
 
+    # 测试执行结果按批次更新
+    cache_ttl: float = 120.0
+
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行测试用例查询
 
@@ -20,6 +20,9 @@ class TestCoverageTool(DevOpsBaseTool):
     返回: 项目的总覆盖率和模块覆盖率详情
     """
 
+    # 覆盖率数据变化慢，可缓存数分钟
+    cache_ttl: float = 300.0
+
     def _execute(self, query: str) -> Dict[str, Any]:
         """执行覆盖率查询
 
@@ -4,10 +4,12 @@
 参考：https://tdesign.tencent.com/chat
 """
 
+import time
 import uuid
 from typing import Dict, Any, Optional, List
 from enum import Enum
 from src.utils.logger import get_logger
+from src.utils.marker_matcher import MARKER, MarkerMatcher
 
 logger = get_logger(__name__)
 
@@ -38,6 +40,25 @@ class AGUIEventType(str, Enum):
     TOOL_CALL_RESULT = "TOOL_CALL_RESULT"
 
 
+# 可合并的增量内容事件 -> 所属消息的 ID 字段
+_COALESCIBLE_EVENTS = {
+    AGUIEventType.TEXT_MESSAGE_CONTENT: "messageId",
+    AGUIEventType.THINKING_TEXT_MESSAGE_CONTENT: "thinkingId",
+}
+
+# ReAct 格式标记 -> 阶段
+REACT_MARKERS = {
+    "Action Input:": "action_input",
+    "Final Answer:": "final_answer",
+    "Observation:": "observation",
+    "Thought:": "thought",
+    "Action:": "action",
+}
+
+# 内容需要作为消息输出的阶段
+_MESSAGE_STAGES = ("thought", "final_answer")
+
+
 class AGUIAdapter:
     """AG-UI 协议适配器
 
@@ -45,18 +66,32 @@ class AGUIAdapter:
     支持流式逐字输出、思考过程展示、工具调用等。
     """
 
-    def __init__(self, session_id: Optional[str] = None, debug: bool = False):
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        run_id: Optional[str] = None,
+        debug: bool = False,
+        react_format: bool = True,
+        coalesce_ms: float = 0,
+        coalesce_max_chars: int = 512,
+    ):
         """初始化适配器
 
         Args:
-            session_id: 会话 ID，用作 runId
+            session_id: 会话 ID，未指定 run_id 时用作 runId
+            run_id: 运行 ID
             debug: 是否启用调试日志
+            react_format: content 流是否为 ReAct 文本格式；
+                原生函数调用模式下为 False，content 直接作为回答输出
+            coalesce_ms: 合并同一消息连续增量内容的时间窗口（毫秒），0 表示不合并
+            coalesce_max_chars: 合并内容达到该字符数时立即输出
         """
-        self.run_id = session_id or str(uuid.uuid4())
+        self.run_id = run_id or session_id or str(uuid.uuid4())
         self.message_id = f"msg_{uuid.uuid4().hex[:8]}"
         self.thinking_id = f"thinking_{uuid.uuid4().hex[:8]}"
         self.tool_call_id = f"tool_{uuid.uuid4().hex[:8]}"
         self.debug = debug
+        self.react_format = react_format
 
         # 状态追踪
         self.run_started = False
@@ -67,21 +102,95 @@ class AGUIAdapter:
 
         # 当前工具调用信息
         self.current_tool: Optional[str] = None
+        # 并发工具调用：LangChain run_id -> toolCallId
+        self.tool_calls: Dict[str, str] = {}
 
         # Agent ReAct 阶段追踪
         self.current_stage = None  # None, "thought", "action", "action_input", "observation", "final_answer"
-        self.line_buffer = ""  # 用于检测行标记
-        self.pending_tokens = []  # 等待确认的 token 缓冲
+        self.marker_matcher = MarkerMatcher(REACT_MARKERS)
+
+        # 增量内容合并
+        self.coalesce_window = coalesce_ms / 1000
+        self.coalesce_max_chars = coalesce_max_chars
+        self._pending_delta: Optional[Dict[str, Any]] = None  # 尚未输出的合并事件
+        self._pending_chunks: List[str] = []
+        self._pending_chars = 0
+        self._pending_since = 0.0
 
     def convert_event(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
         """转换内部事件为 AG-UI 事件
 
+        启用合并时，同一消息的连续 TEXT_MESSAGE_CONTENT / THINKING_TEXT_MESSAGE_CONTENT
+        增量会暂存并合并为一个事件，在窗口到期、达到字符上限或出现其它事件时输出。
+        调用方需要在 flush_timeout() 到期时调用 flush()，避免流空闲时内容滞留。
+
         Args:
             event: 内部事件字典，格式如 {"type": "token", "content": "..."}
 
         Returns:
             AG-UI 事件列表（可能包含多个事件，如 START + CONTENT）
         """
+        events = self._convert(event)
+        if self.coalesce_window <= 0:
+            return events
+        return self._coalesce(events)
+
+    def _coalesce(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """合并连续的增量内容事件"""
+        output: List[Dict[str, Any]] = []
+        for event in events:
+            id_key = _COALESCIBLE_EVENTS.get(event["type"])
+            if id_key is None:
+                # 其它事件之前先输出暂存内容，保持事件顺序
+                output.extend(self.flush())
+                output.append(event)
+                continue
+
+            pending = self._pending_delta
+            if pending is None or pending["type"] != event["type"] or pending[id_key] != event[id_key]:
+                output.extend(self.flush())
+                self._pending_delta = event
+                self._pending_chunks = [event["delta"]]
+                self._pending_chars = len(event["delta"])
+                self._pending_since = time.monotonic()
+            else:
+                self._pending_chunks.append(event["delta"])
+                self._pending_chars += len(event["delta"])
+
+            if self._pending_chars >= self.coalesce_max_chars:
+                output.extend(self.flush())
+
+        if self._pending_delta is not None and self.flush_timeout() == 0:
+            output.extend(self.flush())
+        return output
+
+    def flush_timeout(self) -> Optional[float]:
+        """距离暂存内容必须输出还剩多少秒
+
+        Returns:
+            Optional[float]: 没有暂存内容时返回 None
+        """
+        if self._pending_delta is None:
+            return None
+        return max(self._pending_since + self.coalesce_window - time.monotonic(), 0.0)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """输出暂存的合并内容
+
+        Returns:
+            List[Dict[str, Any]]: 合并后的事件（没有暂存内容时为空）
+        """
+        pending = self._pending_delta
+        if pending is None:
+            return []
+        self._pending_delta = None
+        pending["delta"] = "".join(self._pending_chunks)
+        self._pending_chunks = []
+        self._pending_chars = 0
+        return [pending]
+
+    def _convert(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """按内部事件类型分发到对应的处理方法"""
         event_type = event.get("type")
 
         # 会话开始
@@ -96,6 +205,10 @@ class AGUIAdapter:
         elif event_type == "token":
             return self._handle_answer_token(event)
 
+        # 强制回答开始（推理循环因请求时限被停止）
+        elif event_type == "answer_start":
+            return self._handle_answer_start(event)
+
         # 工具调用
         elif event_type == "action":
             return self._handle_action(event)
@@ -160,191 +273,91 @@ class AGUIAdapter:
 
         return events
 
-    def _detect_and_handle_react_markers(self, token: str) -> tuple[List[str], Optional[str]]:
-        """检测 ReAct 格式标记，返回要发送的 tokens 和阶段切换信息
+    def _start_new_message(self) -> List[Dict[str, Any]]:
+        """结束进行中的 THINKING 和 MESSAGE，开启新的 MESSAGE"""
+        events = []
 
-        Args:
-            token: 当前 token
+        # 先结束之前的 THINKING（如果有）
+        if self.thinking_started:
+            if self.thinking_text_started:
+                events.append({
+                    "type": AGUIEventType.THINKING_TEXT_MESSAGE_END,
+                    "thinkingId": self.thinking_id
+                })
+                self.thinking_text_started = False
+            events.append({
+                "type": AGUIEventType.THINKING_END,
+                "thinkingId": self.thinking_id
+            })
+            self.thinking_started = False
 
-        Returns:
-            (tokens_to_send, stage_info):
-                - tokens_to_send: 要发送的 token 列表（可能包含之前缓存的）
-                - stage_info: 阶段切换信息 ("thought", "final_answer", None)
-        """
-        self.line_buffer += token
-
-        # 🔥 调试日志
-        if self.debug:
-            logger.debug(f"[ReAct] Token: {repr(token)}, Stage: {self.current_stage}, "
-                        f"Buffer: {repr(self.line_buffer[-50:])}, Pending: {len(self.pending_tokens)}")
-
-        # 限制缓冲区大小
-        if len(self.line_buffer) > 100:
-            self.line_buffer = self.line_buffer[-100:]
-
-        # 检测标记（按照长度降序，优先匹配长标记）
-        markers = {
-            "Action Input:": "action_input",
-            "Final Answer:": "final_answer",
-            "Observation:": "observation",
-            "Thought:": "thought",
-            "Action:": "action",
-        }
-
-        # 检查是否匹配到完整标记
-        for marker, stage in markers.items():
-            if marker in self.line_buffer:
-                # 找到标记，清空 pending_tokens（不发送）
-                if self.debug:
-                    logger.debug(f"[ReAct] 🎯 Detected marker: {marker} -> {stage}, "
-                                f"Discarding {len(self.pending_tokens)} pending tokens")
-                self.pending_tokens.clear()
+        # 结束上一个 MESSAGE（如果有）
+        if self.message_started:
+            events.append({
+                "type": AGUIEventType.TEXT_MESSAGE_END,
+                "messageId": self.message_id
+            })
+            self.message_started = False
 
-                # 从缓冲区中移除标记及之前的内容
-                marker_pos = self.line_buffer.find(marker)
-                self.line_buffer = self.line_buffer[marker_pos + len(marker):]
+        # 生成新的 MESSAGE ID
+        self.message_id = f"msg_{uuid.uuid4().hex[:8]}"
 
-                # 切换阶段
-                old_stage = self.current_stage
-                self.current_stage = stage
-                if self.debug:
-                    logger.debug(f"[ReAct] Stage transition: {old_stage} -> {stage}")
-
-                # 只有 Thought 和 Final Answer 需要通知上层开启新消息
-                if stage in ["thought", "final_answer"]:
-                    return ([], stage)
-                else:
-                    # Action/Observation 不开启消息，直接返回
-                    return ([], None)
-
-        # 检测换行符
-        if '\n' in token or '\r' in token:
-            self.line_buffer = ""
-
-        # 检查 line_buffer 是否以可能的标记关键词结尾（需要等待下一个 token 确认）
-        # 🔥 包含双词标记："Final Answer", "Action Input"
-        marker_prefixes = ["Thought", "Action", "Action Input", "Observation", "Final", "Final Answer"]
-        buffer_ends_with_prefix = any(
-            self.line_buffer.rstrip().endswith(prefix) for prefix in marker_prefixes
-        )
-
-        if buffer_ends_with_prefix:
-            # 可能是标记的开始，缓存当前 token，等待确认
-            if self.debug:
-                logger.debug(f"[ReAct] ⏸️ Buffering token (possible marker prefix)")
-            self.pending_tokens.append(token)
-            return ([], None)
-
-        # 没有检测到标记前缀，发送之前缓存的 tokens + 当前 token
-        tokens_to_send = []
-        if len(self.pending_tokens) > 0:
-            tokens_to_send.extend(self.pending_tokens)
-            if self.debug:
-                logger.debug(f"[ReAct] ✅ Releasing {len(self.pending_tokens)} pending tokens")
-            self.pending_tokens.clear()
-        tokens_to_send.append(token)
-
-        # 根据当前阶段决定是否发送
-        if self.current_stage in ["thought", "final_answer"]:
-            # Thought 或 Final Answer 内容，发送
-            if self.debug and len(tokens_to_send) > 0:
-                logger.debug(f"[ReAct] 📤 Sending {len(tokens_to_send)} tokens in stage {self.current_stage}")
-            return (tokens_to_send, None)
-        elif self.current_stage in ["action", "action_input", "observation"]:
-            # Action/Observation 内容，不发送
-            if self.debug:
-                logger.debug(f"[ReAct] 🚫 Discarding token in stage {self.current_stage}")
-            return ([], None)
-        else:
-            # 初始阶段（第一个 Thought 之前），不发送
-            if self.debug:
-                logger.debug(f"[ReAct] 🚫 Discarding token (before first Thought)")
-            return ([], None)
+        # 开启新的 MESSAGE
+        events.append({
+            "type": AGUIEventType.TEXT_MESSAGE_START,
+            "messageId": self.message_id,
+            "role": "assistant"
+        })
+        self.message_started = True
+
+        return events
 
     def _handle_answer_token(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
         """处理正式回答 token（来自 content 流，包含 ReAct 格式）
 
         返回 TEXT_MESSAGE_* 系列事件
         """
-        events = []
         content = event.get("content", "")
 
-        # 🔥 检测 ReAct 标记和阶段切换
-        tokens_to_send, stage_info = self._detect_and_handle_react_markers(content)
-
-        # 如果检测到新的 Thought 或 Final Answer 阶段
-        if stage_info in ["thought", "final_answer"]:
-            # 先结束之前的 THINKING（如果有）
-            if self.thinking_started:
-                if self.thinking_text_started:
-                    events.append({
-                        "type": AGUIEventType.THINKING_TEXT_MESSAGE_END,
-                        "thinkingId": self.thinking_id
-                    })
-                    self.thinking_text_started = False
-                events.append({
-                    "type": AGUIEventType.THINKING_END,
-                    "thinkingId": self.thinking_id
-                })
-                self.thinking_started = False
-
-            # 结束上一个 MESSAGE（如果有）
-            if self.message_started:
-                events.append({
-                    "type": AGUIEventType.TEXT_MESSAGE_END,
-                    "messageId": self.message_id
-                })
-                self.message_started = False
-
-            # 生成新的 MESSAGE ID
-            self.message_id = f"msg_{uuid.uuid4().hex[:8]}"
+        if not self.react_format:
+            # 原生函数调用模式：content 即回答内容（工具调用 chunk 的 content 为空）
+            return self._emit_answer_text(content) if content else []
 
-            # 开启新的 MESSAGE
-            events.append({
-                "type": AGUIEventType.TEXT_MESSAGE_START,
-                "messageId": self.message_id,
-                "role": "assistant"
-            })
-            self.message_started = True
-
-            return events
+        # 增量匹配 ReAct 标记：标记文本本身不输出，可能是标记开头的尾部字符暂存到下一个 token
+        events = []
+        for kind, value in self.marker_matcher.feed(content):
+            if kind == MARKER:
+                if self.debug:
+                    logger.debug(f"[ReAct] Stage transition: {self.current_stage} -> {value}")
+                self.current_stage = value
+                # 只有 Thought 和 Final Answer 开启新消息，Action/Observation 只切换阶段
+                if value in _MESSAGE_STAGES:
+                    events.extend(self._start_new_message())
+            elif self.current_stage in _MESSAGE_STAGES:
+                # Action/Observation 内容和第一个 Thought 之前的内容不发送
+                events.extend(self._emit_answer_text(value))
+        return events
 
-        # 如果有需要发送的内容
-        if len(tokens_to_send) > 0:
-            # 确保消息已经开启（如果还没开启，开启一个）
-            if not self.message_started:
-                # 先结束 THINKING（如果有）
-                if self.thinking_started:
-                    if self.thinking_text_started:
-                        events.append({
-                            "type": AGUIEventType.THINKING_TEXT_MESSAGE_END,
-                            "thinkingId": self.thinking_id
-                        })
-                        self.thinking_text_started = False
-                    events.append({
-                        "type": AGUIEventType.THINKING_END,
-                        "thinkingId": self.thinking_id
-                    })
-                    self.thinking_started = False
-
-                # 开启新消息
-                self.message_id = f"msg_{uuid.uuid4().hex[:8]}"
-                events.append({
-                    "type": AGUIEventType.TEXT_MESSAGE_START,
-                    "messageId": self.message_id,
-                    "role": "assistant"
-                })
-                self.message_started = True
+    def _emit_answer_text(self, text: str) -> List[Dict[str, Any]]:
+        """输出回答文本，消息尚未开启时先结束 THINKING 并开启新消息"""
+        events = []
+        if not self.message_started:
+            events.extend(self._start_new_message())
+        events.append({
+            "type": AGUIEventType.TEXT_MESSAGE_CONTENT,
+            "messageId": self.message_id,
+            "delta": text
+        })
+        return events
 
-            # 发送所有 tokens
-            for token in tokens_to_send:
-                events.append({
-                    "type": AGUIEventType.TEXT_MESSAGE_CONTENT,
-                    "messageId": self.message_id,
-                    "delta": token
-                })
+    def _handle_answer_start(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """处理强制回答开始
 
-        return events
+        强制回答的输出不带 ReAct 标记，直接进入 Final Answer 阶段并开启新消息。
+        """
+        self.marker_matcher.reset()
+        self.current_stage = "final_answer"
+        return self._start_new_message()
 
     def _handle_action(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
         """处理 Agent action 决策
@@ -385,6 +398,9 @@ class AGUIAdapter:
         # 生成新的 tool_call_id
         self.tool_call_id = f"tool_{uuid.uuid4().hex[:8]}"
         self.tool_call_started = True
+        run_id = event.get("run_id")
+        if run_id:
+            self.tool_calls[run_id] = self.tool_call_id
 
         tool_name = event.get("tool", "unknown")
         tool_input = event.get("input", "")
@@ -407,8 +423,16 @@ class AGUIAdapter:
         return events
 
     def _handle_tool_end(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """处理工具调用结束"""
-        if not self.tool_call_started:
+        """处理工具调用结束
+
+        并发执行的工具按 run_id 匹配各自的 toolCallId，结束顺序可与开始顺序不同。
+        """
+        run_id = event.get("run_id")
+        if run_id and run_id in self.tool_calls:
+            tool_call_id = self.tool_calls.pop(run_id)
+        elif self.tool_call_started:
+            tool_call_id = self.tool_call_id
+        else:
             return []
 
         events = []
@@ -416,7 +440,7 @@ class AGUIAdapter:
         # 发送 TOOL_CALL_END
         events.append({
             "type": AGUIEventType.TOOL_CALL_END,
-            "toolCallId": self.tool_call_id
+            "toolCallId": tool_call_id
         })
 
         # 发送工具执行结果
@@ -424,17 +448,22 @@ class AGUIAdapter:
         if output:
             events.append({
                 "type": AGUIEventType.TOOL_CALL_RESULT,
-                "toolCallId": self.tool_call_id,
+                "toolCallId": tool_call_id,
                 "content": output
             })
 
-        self.tool_call_started = False
+        self.tool_call_started = len(self.tool_calls) > 0
         return events
 
     def _handle_finish(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
         """处理会话结束"""
         events = []
 
+        # 输出流末尾暂存的文本（形如标记开头但最终不是标记）
+        held = self.marker_matcher.flush()
+        if held and self.current_stage in _MESSAGE_STAGES:
+            events.extend(self._emit_answer_text(held))
+
         # 结束所有未完成的事件
         if self.thinking_started:
             if self.thinking_text_started:
@@ -461,7 +490,8 @@ class AGUIAdapter:
             events.append({
                 "type": AGUIEventType.RUN_FINISHED,
                 "runId": self.run_id,
-                "sessionId": event.get("session_id")  # 保留原始 session_id
+                "sessionId": event.get("session_id"),  # 保留原始 session_id
+                "partial": event.get("partial", False),  # 是否因请求时限基于部分数据作答
             })
             self.run_started = False
 
@@ -0,0 +1,41 @@
+"""后台任务管理
+
+用于与请求生命周期解耦的异步副作用（持久化、摘要更新等）。
+"""
+
+import asyncio
+from typing import Any, Coroutine, Set
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 持有后台任务的强引用，避免任务在完成前被垃圾回收
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def spawn_background(coro: Coroutine[Any, Any, Any], name: str = "background") -> asyncio.Task:
+    """启动不随请求取消的后台任务
+
+    Args:
+        coro: 协程
+        name: 任务名称（用于日志）
+
+    Returns:
+        asyncio.Task: 后台任务
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task) -> None:
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error(f"后台任务 {name} 失败: {str(t.exception())}")
+
+    task.add_done_callback(_done)
+    return task
+
+
+def pending_background_tasks() -> int:
+    """当前未完成的后台任务数"""
+    return len(_background_tasks)
@@ -0,0 +1,104 @@
+"""请求时限
+
+每个请求按接口配置（可被请求参数覆盖）得到一个墙钟时限。时限通过
+contextvars 向下传递：在同一上下文中启动的协程、asyncio 任务和
+asyncio.to_thread 线程都能通过 current_deadline() 取到它，
+工具调用和 HTTP 请求据此收紧各自的超时。
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from src.config import settings
+
+# 强制回答的预留时间最多占总时限的比例，短时限仍留有推理循环的时间
+_MAX_RESERVE_FRACTION = 0.25
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求时限已到"""
+
+
+class Deadline:
+    """请求墙钟时限"""
+
+    def __init__(self, seconds: float):
+        """初始化时限
+
+        Args:
+            seconds: 从现在起允许的总时长（秒）
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def for_endpoint(cls, endpoint: str, override: Optional[float] = None) -> Optional["Deadline"]:
+        """按接口配置创建时限
+
+        Args:
+            endpoint: 接口名称（REQUEST_DEADLINES 的键，如 chat、chat_stream、agent_run）
+            override: 请求参数中指定的时限（秒），优先于配置
+
+        Returns:
+            Optional[Deadline]: 配置为 0 且未指定时返回 None（不限时）
+        """
+        seconds = override or settings.request_deadlines.get(
+            endpoint, settings.request_deadline_seconds
+        )
+        if not seconds or seconds <= 0:
+            return None
+        return cls(seconds)
+
+    def remaining(self) -> float:
+        """剩余时间（秒），已超时返回 0"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def budget(self, reserve: float) -> float:
+        """扣除预留时间后可用于 Agent 推理循环的时间（秒）
+
+        预留时间不超过总时限的 1/4，否则短于预留时间的时限会跳过全部工具调用。
+
+        Args:
+            reserve: 为强制生成最终回答预留的时间（秒）
+        """
+        reserve = min(reserve, self.seconds * _MAX_RESERVE_FRACTION)
+        return max(self.remaining() - reserve, 0.0)
+
+    def expired(self) -> bool:
+        """是否已超时"""
+        return self.remaining() <= 0
+
+    def cap(self, timeout: Optional[float]) -> float:
+        """将超时时间限制在剩余时间内
+
+        Args:
+            timeout: 原超时时间（秒），None 表示不限
+
+        Returns:
+            float: 不超过剩余时间的超时时间
+        """
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """获取当前上下文的请求时限"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """在当前上下文中设置请求时限
+
+    Args:
+        deadline: 请求时限，None 表示不限时
+    """
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
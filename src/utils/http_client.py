@@ -8,6 +8,7 @@ from typing import Any, Dict, Optional
 import httpx
 from httpx import AsyncClient, Response
 
+from src.utils.deadline import current_deadline
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -38,11 +39,15 @@ class HTTPClient:
         self._client: Optional[AsyncClient] = None
 
     async def __aenter__(self) -> "HTTPClient":
-        """异步上下文管理器入口"""
+        """异步上下文管理器入口
+
+        处于请求时限内时，超时时间不超过剩余时间。
+        """
+        deadline = current_deadline()
         self._client = AsyncClient(
             base_url=self.base_url,
             headers=self.headers,
-            timeout=self.timeout,
+            timeout=deadline.cap(self.timeout) if deadline else self.timeout,
             auth=self.auth,
         )
         return self
@@ -0,0 +1,257 @@
+"""LLM HTTP 传输层
+
+进程内所有 ChatOpenAI 调用共享同一组 httpx 连接池（同步、异步各一个），
+连接保持 keep-alive 复用，避免每次请求重新建立 TCP/TLS 连接；
+启动时预热一条连接，降低首个请求的首 token 延迟。
+
+池内连接状态来自 httpcore 连接池，排队等待时间通过 httpcore 的
+trace 扩展测量：从请求进入连接池到第一个连接事件（新建连接或在已有
+连接上发送请求头）之间的时间。
+"""
+
+import asyncio
+import importlib.util
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from src.config import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _PoolStats:
+    """连接池请求统计（线程安全，同步和异步客户端共用）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.connect_ms_total = 0.0
+
+    def record(self, wait_ms: float, connect_ms: Optional[float]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            if connect_ms is not None:
+                self.new_connections += 1
+                self.connect_ms_total += connect_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": self.requests - self.new_connections,
+                "avg_wait_ms": round(self.wait_ms_total / self.requests, 2) if self.requests else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 2),
+                "avg_connect_ms": (
+                    round(self.connect_ms_total / self.new_connections, 2)
+                    if self.new_connections
+                    else 0.0
+                ),
+            }
+
+
+class _RequestTrace:
+    """单个请求的 httpcore trace 回调，记录排队和建连耗时"""
+
+    def __init__(self, stats: _PoolStats):
+        self.stats = stats
+        self.started_at = time.perf_counter()
+        self.wait_ms: Optional[float] = None
+        self.connect_started_at: Optional[float] = None
+        self.recorded = False
+
+    def on_event(self, name: str) -> None:
+        if self.recorded:
+            return
+        now = time.perf_counter()
+        if self.wait_ms is None:
+            # 第一个事件出现时请求已拿到连接（或开始新建连接），之前的时间即排队时间
+            self.wait_ms = (now - self.started_at) * 1000
+            if name.startswith("connection.connect_tcp"):
+                self.connect_started_at = now
+        if name.endswith("send_request_headers.started"):
+            connect_ms = (
+                (now - self.connect_started_at) * 1000 if self.connect_started_at is not None else None
+            )
+            self.stats.record(self.wait_ms, connect_ms)
+            self.recorded = True
+
+    def sync_trace(self, name: str, info: Dict[str, Any]) -> None:
+        self.on_event(name)
+
+    async def async_trace(self, name: str, info: Dict[str, Any]) -> None:
+        self.on_event(name)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 依赖 h2 包（httpx[http2]）"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class LLMTransport:
+    """进程级共享的 LLM HTTP 连接池"""
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        connect_timeout: float = 10.0,
+    ):
+        """初始化连接池
+
+        Args:
+            base_url: LLM 服务地址（用于预热）
+            max_connections: 最大连接数，超出时请求在池中排队
+            max_keepalive_connections: 最多保留的空闲连接数
+            keepalive_expiry: 空闲连接的保留时间（秒）
+            http2: 是否启用 HTTP/2（需要安装 h2，未安装时退回 HTTP/1.1）
+            connect_timeout: 建立连接的超时时间（秒）；读取超时由 ChatOpenAI 按请求设置
+        """
+        if http2 and not _http2_available():
+            logger.warning("未安装 h2，LLM 连接退回 HTTP/1.1（pip install 'httpx[http2]' 以启用 HTTP/2）")
+            http2 = False
+
+        self.base_url = base_url.rstrip("/")
+        self.http2 = http2
+        self.connect_timeout = connect_timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._stats = _PoolStats()
+
+        timeout = httpx.Timeout(None, connect=connect_timeout)
+        self.client = httpx.Client(
+            limits=self.limits,
+            http2=http2,
+            timeout=timeout,
+            event_hooks={"request": [self._attach_sync_trace]},
+        )
+        self.async_client = httpx.AsyncClient(
+            limits=self.limits,
+            http2=http2,
+            timeout=timeout,
+            event_hooks={"request": [self._attach_async_trace]},
+        )
+
+    def _attach_sync_trace(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = _RequestTrace(self._stats).sync_trace
+
+    async def _attach_async_trace(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = _RequestTrace(self._stats).async_trace
+
+    async def awarm_up(self, api_key: str) -> None:
+        """预热连接：提前完成 TCP/TLS 握手，连接保留在池中供首个请求复用
+
+        异步连接池在事件循环中预热，同步连接池在线程中预热。预热请求（包括读取响应）
+        不超过 connect_timeout，服务端接受连接但迟迟不响应时不会阻塞启动。失败只记录日志。
+
+        Args:
+            api_key: LLM 服务的 API Key（预热请求访问 /models）
+        """
+        url = f"{self.base_url}/models"
+        headers = {"Authorization": f"Bearer {api_key}"}
+        start = time.perf_counter()
+        timeout = self.connect_timeout
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self.async_client.get(url, headers=headers, timeout=timeout),
+                    asyncio.to_thread(self.client.get, url, headers=headers, timeout=timeout),
+                ),
+                timeout,
+            )
+            logger.info(
+                f"LLM 连接预热完成: {self.base_url}, "
+                f"HTTP/{'2' if self.http2 else '1.1'}, 耗时 {(time.perf_counter() - start) * 1000:.0f}ms"
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM 连接预热超时（{timeout}s），跳过预热")
+        except Exception as e:
+            logger.warning(f"LLM 连接预热失败: {str(e)}")
+
+    @staticmethod
+    def _pool_state(client: Any) -> Dict[str, Optional[int]]:
+        """读取 httpcore 连接池中的连接状态"""
+        try:
+            pool = client._transport._pool
+            connections = list(pool.connections)
+            idle = sum(1 for conn in connections if conn.is_idle())
+            return {
+                "connections": len(connections),
+                "active": sum(
+                    1 for conn in connections if not conn.is_idle() and not conn.is_closed()
+                ),
+                "idle": idle,
+                "queued": sum(1 for request in pool._requests if request.is_queued()),
+            }
+        except AttributeError:
+            return {"connections": None, "active": None, "idle": None, "queued": None}
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池指标
+
+        Returns:
+            Dict[str, Any]: 连接池配置、同步/异步池的连接状态和请求排队统计
+        """
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "async_pool": self._pool_state(self.async_client),
+            "sync_pool": self._pool_state(self.client),
+            **self._stats.snapshot(),
+        }
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        await self.async_client.aclose()
+        self.client.close()
+
+
+_llm_transport: Optional[LLMTransport] = None
+_llm_transport_lock = threading.Lock()
+
+
+def get_llm_transport() -> LLMTransport:
+    """获取进程级共享的 LLM 连接池
+
+    Returns:
+        LLMTransport: 共享实例
+    """
+    global _llm_transport
+    if _llm_transport is None:
+        with _llm_transport_lock:
+            if _llm_transport is None:
+                _llm_transport = LLMTransport(
+                    base_url=settings.deepseek_base_url,
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_keepalive_connections,
+                    keepalive_expiry=settings.llm_keepalive_expiry,
+                    http2=settings.llm_http2,
+                    connect_timeout=settings.llm_connect_timeout,
+                )
+    return _llm_transport
+
+
+async def close_llm_transport() -> None:
+    """关闭共享连接池并重置实例，之后 get_llm_transport() 会创建新的连接池"""
+    global _llm_transport
+    with _llm_transport_lock:
+        transport, _llm_transport = _llm_transport, None
+    if transport is not None:
+        await transport.aclose()
@@ -0,0 +1,135 @@
+"""流式文本标记匹配
+
+基于 Aho-Corasick 自动机的增量多模式匹配：文本按 token 逐段送入，
+在任意位置识别预先编译的标记（如 ReAct 的 "Thought:"、"Final Answer:"），
+每个字符的均摊处理代价为 O(1)，不需要回扫已处理的文本。
+
+可能是标记开头的尾部字符会暂存，直到能确定它们不属于标记时才输出，
+因此标记即使被切分到多个 token 中也不会漏出。
+"""
+
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# feed() 返回的片段类型
+TEXT = "text"
+MARKER = "marker"
+
+
+class MarkerMatcher:
+    """增量标记匹配器
+
+    feed() 返回按顺序排列的片段：(TEXT, 文本) 为确定不属于任何标记的文本，
+    (MARKER, 标签) 表示识别到一个完整标记（标记文本本身不输出）。
+    """
+
+    def __init__(self, markers: Dict[str, str]):
+        """编译标记
+
+        Args:
+            markers: 标记文本 -> 标签，例如 {"Final Answer:": "final_answer"}
+        """
+        # 自动机：状态 0 为根，goto[state][ch] 为转移，fail 为失配链接
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        # 命中的 (标签, 标记长度)
+        self._output: List[Optional[Tuple[str, int]]] = [None]
+
+        for marker, label in markers.items():
+            state = 0
+            for ch in marker:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+                    self._output.append(None)
+                    self._goto[state][ch] = next_state
+                state = next_state
+            self._output[state] = (label, len(marker))
+
+        # 按 BFS 顺序计算失配链接（较短的标记若是较长标记的后缀，其输出沿失配链继承）
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+                queue.append(next_state)
+
+        # 根状态下快速跳到下一个可能的标记起始字符
+        self._first_chars = re.compile("[" + re.escape("".join(self._goto[0])) + "]")
+
+        self._state = 0
+        self._held = ""
+
+    def reset(self) -> None:
+        """丢弃暂存文本，回到初始状态"""
+        self._state = 0
+        self._held = ""
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """送入一段文本
+
+        Args:
+            text: 新的文本（通常是一个 token）
+
+        Returns:
+            List[Tuple[str, str]]: 按顺序排列的 (TEXT, 文本) / (MARKER, 标签) 片段
+        """
+        goto, fail, depth, output = self._goto, self._fail, self._depth, self._output
+        state = self._state
+        data = self._held + text if self._held else text
+        i = len(self._held)
+        start = 0  # 尚未输出的第一个字符
+        segments: List[Tuple[str, str]] = []
+
+        while i < len(data):
+            if state == 0:
+                # 根状态：直接跳到下一个可能的标记起始字符
+                match = self._first_chars.search(data, i)
+                if match is None:
+                    break
+                i = match.start()
+
+            ch = data[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            i += 1
+
+            hit = output[state]
+            if hit is not None:
+                label, length = hit
+                marker_start = i - length
+                if marker_start > start:
+                    segments.append((TEXT, data[start:marker_start]))
+                segments.append((MARKER, label))
+                start = i
+                state = 0
+
+        # 末尾 depth[state] 个字符可能是标记开头，暂存到下一次 feed
+        safe = len(data) - depth[state]
+        if safe > start:
+            segments.append((TEXT, data[start:safe]))
+            start = safe
+        self._held = data[start:]
+        self._state = state
+        return segments
+
+    def flush(self) -> str:
+        """输出暂存的文本（流结束时调用）
+
+        Returns:
+            str: 暂存的文本
+        """
+        held = self._held
+        self.reset()
+        return held
@@ -0,0 +1,401 @@
+"""流式运行登记
+
+每次流式 Agent 运行作为独立于 HTTP 连接的后台任务执行，转换后的 AG-UI 事件
+按递增的事件 ID 写入有界环形缓冲区。连接只是运行的订阅者：断线后客户端携带
+Last-Event-ID 重新订阅，从缓冲区补发错过的事件后继续跟随实时事件，
+不会重新执行 LLM 或工具调用。
+
+同一运行可以有多个订阅者（多个浏览器打开同一会话、看板镜像进行中的分析）：
+事件按订阅者扇出到各自按字节计量的有界待发送队列。慢订阅者的积压超过压缩阈值时，
+合并同一消息的连续增量内容、丢弃同一工具调用中间的参数增量；压缩后仍超过上限则
+断开该订阅者，客户端凭 Last-Event-ID 从环形缓冲区续传，不影响运行和其它订阅者。
+
+最后一个订阅者离开后运行保留一段宽限期，期间无人重连才取消；
+结束的运行在保留期内仍可回放。
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from src.config import settings
+from src.utils.agui_adapter import AGUIEventType
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 积压压缩时可合并的增量内容事件 -> 所属消息的 ID 字段
+_MERGEABLE_EVENTS = {
+    AGUIEventType.TEXT_MESSAGE_CONTENT: "messageId",
+    AGUIEventType.THINKING_TEXT_MESSAGE_CONTENT: "thinkingId",
+}
+
+# (事件 ID, 序列化后的事件 JSON, UTF-8 字节数)
+_Item = Tuple[int, str, int]
+
+
+def _dumps(event: Dict[str, Any]) -> str:
+    """序列化事件（紧凑分隔符，SSE 和 WebSocket 帧直接复用）"""
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+class _SlowConsumerStats:
+    """慢订阅者处理统计（进程级累计）"""
+
+    def __init__(self):
+        self.compactions = 0
+        self.merged_events = 0
+        self.dropped_tool_args = 0
+        self.disconnects = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "compactions": self.compactions,
+            "merged_events": self.merged_events,
+            "dropped_tool_args": self.dropped_tool_args,
+            "slow_disconnects": self.disconnects,
+        }
+
+
+_slow_consumer_stats = _SlowConsumerStats()
+
+
+class Subscriber:
+    """运行的一个订阅者：按字节计量的有界待发送事件队列"""
+
+    def __init__(self, max_bytes: int, compact_bytes: int):
+        """初始化订阅者
+
+        Args:
+            max_bytes: 待发送事件的字节上限，压缩后仍超出时断开该订阅者
+            compact_bytes: 积压超过该字节数时压缩待发送事件
+        """
+        self.max_bytes = max_bytes
+        self.compact_bytes = compact_bytes
+        self.pending: Deque[_Item] = deque()
+        self.pending_bytes = 0
+        self.overflowed = False
+        self._compact_at = compact_bytes
+        self._ready = asyncio.Event()
+
+    def push(self, item: _Item) -> None:
+        """追加待发送事件，积压过多时压缩或标记溢出"""
+        if self.overflowed:
+            return
+        self.pending.append(item)
+        self.pending_bytes += item[2]
+        if self.pending_bytes > self._compact_at:
+            self._compact()
+            if self.pending_bytes > self.max_bytes:
+                # 溢出：释放积压，消费端随即断开，客户端从最后收到的事件续传
+                self.overflowed = True
+                self.pending.clear()
+                self.pending_bytes = 0
+                _slow_consumer_stats.disconnects += 1
+            else:
+                # 积压翻倍前不再压缩，避免每个事件都扫描整个队列
+                self._compact_at = max(self.compact_bytes, self.pending_bytes * 2)
+        self._ready.set()
+
+    def pop(self) -> Tuple[int, str]:
+        """取出下一个待发送事件"""
+        event_id, payload, size = self.pending.popleft()
+        self.pending_bytes -= size
+        if self.pending_bytes < self.compact_bytes:
+            self._compact_at = self.compact_bytes
+        return event_id, payload
+
+    def _compact(self) -> None:
+        """压缩积压：合并同一消息的连续增量内容，工具参数增量只保留每个调用的最后一个
+
+        合并后的事件使用被合并事件中最大的事件 ID，客户端从该 ID 续传不会丢失内容。
+        """
+        items = list(self.pending)
+        events = [json.loads(payload) for _, payload, _ in items]
+        last_args = {
+            event.get("toolCallId"): i
+            for i, event in enumerate(events)
+            if event.get("type") == AGUIEventType.TOOL_CALL_ARGS
+        }
+
+        # [事件 ID, 事件, 序列化结果（被修改过则为 None）]
+        compacted: List[list] = []
+        for i, ((event_id, payload, _), event) in enumerate(zip(items, events)):
+            event_type = event.get("type")
+            if event_type == AGUIEventType.TOOL_CALL_ARGS and last_args[event.get("toolCallId")] != i:
+                _slow_consumer_stats.dropped_tool_args += 1
+                continue
+            id_key = _MERGEABLE_EVENTS.get(event_type)
+            if id_key is not None and compacted:
+                previous = compacted[-1][1]
+                if previous.get("type") == event_type and previous.get(id_key) == event.get(id_key):
+                    previous["delta"] = previous.get("delta", "") + event.get("delta", "")
+                    compacted[-1][0] = event_id
+                    compacted[-1][2] = None
+                    _slow_consumer_stats.merged_events += 1
+                    continue
+            compacted.append([event_id, event, payload])
+
+        self.pending.clear()
+        self.pending_bytes = 0
+        for event_id, event, payload in compacted:
+            if payload is None:
+                payload = _dumps(event)
+            size = len(payload.encode("utf-8"))
+            self.pending.append((event_id, payload, size))
+            self.pending_bytes += size
+        _slow_consumer_stats.compactions += 1
+
+    def wake(self) -> None:
+        """唤醒等待中的消费端（运行结束时）"""
+        self._ready.set()
+
+    async def wait(self, timeout: Optional[float]) -> bool:
+        """等待新事件
+
+        Returns:
+            bool: 超时返回 False
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._ready.clear()
+
+
+class StreamRun:
+    """一次流式运行：事件环形缓冲区 + 执行任务 + 订阅者"""
+
+    def __init__(
+        self,
+        run_id: str,
+        buffer_size: int = 2000,
+        grace_seconds: float = 30.0,
+        subscriber_max_bytes: int = 1 << 20,
+        subscriber_compact_bytes: int = 64 << 10,
+    ):
+        """初始化运行
+
+        Args:
+            run_id: 运行 ID
+            buffer_size: 环形缓冲区保留的事件数，更早的事件无法回放
+            grace_seconds: 最后一个订阅者断开后等待重连的时间（秒），0 表示立即取消
+            subscriber_max_bytes: 每个订阅者待发送事件的字节上限
+            subscriber_compact_bytes: 订阅者积压超过该字节数时压缩
+        """
+        self.run_id = run_id
+        self.grace_seconds = grace_seconds
+        self.subscriber_max_bytes = subscriber_max_bytes
+        self.subscriber_compact_bytes = subscriber_compact_bytes
+        self.task: Optional[asyncio.Task] = None
+        self.finished_at: Optional[float] = None
+
+        # 事件 ID 从 1 开始连续递增
+        self._events: Deque[_Item] = deque(maxlen=buffer_size)
+        self._events_bytes = 0
+        self.last_event_id = 0
+
+        self._subscribers: Set[Subscriber] = set()
+        self._grace_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def start(self, producer: Callable[["StreamRun"], Awaitable[None]]) -> None:
+        """在后台任务中执行 producer，producer 通过 publish() 写入事件
+
+        Args:
+            producer: 接收本运行对象的协程函数
+        """
+        self.task = asyncio.create_task(self._run(producer), name=f"stream_run:{self.run_id}")
+
+    async def _run(self, producer: Callable[["StreamRun"], Awaitable[None]]) -> None:
+        try:
+            await producer(self)
+        finally:
+            self.finished_at = time.monotonic()
+            self._cancel_grace()
+            for subscriber in self._subscribers:
+                subscriber.wake()
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """写入一个事件并扇出给所有订阅者（事件只序列化一次）
+
+        Args:
+            event: AG-UI 事件
+
+        Returns:
+            int: 事件 ID
+        """
+        self.last_event_id += 1
+        payload = _dumps(event)
+        item = (self.last_event_id, payload, len(payload.encode("utf-8")))
+        if len(self._events) == self._events.maxlen:
+            self._events_bytes -= self._events[0][2]
+        self._events.append(item)
+        self._events_bytes += item[2]
+        for subscriber in self._subscribers:
+            subscriber.push(item)
+        return self.last_event_id
+
+    async def subscribe(
+        self,
+        last_event_id: int = 0,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        poll_interval: float = 1.0,
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """订阅事件：先回放 last_event_id 之后的缓冲事件，再跟随实时事件，运行结束时返回
+
+        Args:
+            last_event_id: 客户端已收到的最后一个事件 ID（0 表示从头开始）
+            is_disconnected: 检测客户端是否已断开；空闲期间按 poll_interval 轮询
+            poll_interval: 轮询间隔（秒）
+
+        Yields:
+            Tuple[int, str]: (事件 ID, 事件 JSON)
+        """
+        subscriber = Subscriber(self.subscriber_max_bytes, self.subscriber_compact_bytes)
+        # 取回放快照与登记订阅者之间没有 await，之后的事件都会进入订阅者队列
+        replay = self._replay_from(last_event_id)
+        self._attach(subscriber)
+        try:
+            for event_id, payload, _ in replay:
+                yield event_id, payload
+
+            while True:
+                if subscriber.pending:
+                    yield subscriber.pop()
+                    continue
+                if subscriber.overflowed:
+                    # 积压压缩后仍超出上限：断开该订阅者，客户端可凭 Last-Event-ID 续传
+                    logger.warning(f"运行 {self.run_id} 的订阅者消费过慢，断开连接")
+                    return
+                if self.finished:
+                    return
+
+                ready = await subscriber.wait(poll_interval if is_disconnected else None)
+                if not ready and await is_disconnected():
+                    logger.info(f"客户端已断开运行 {self.run_id} 的订阅")
+                    return
+        finally:
+            self._detach(subscriber)
+
+    def _replay_from(self, last_event_id: int) -> List[_Item]:
+        """环形缓冲区中 last_event_id 之后的事件快照"""
+        if last_event_id >= self.last_event_id:
+            return []
+        first = self.last_event_id - len(self._events) + 1
+        if last_event_id + 1 < first:
+            logger.warning(f"运行 {self.run_id} 的事件 {last_event_id + 1}~{first - 1} 已移出回放缓冲区")
+            last_event_id = first - 1
+        return list(islice(self._events, last_event_id + 1 - first, None))
+
+    def _attach(self, subscriber: Subscriber) -> None:
+        self._subscribers.add(subscriber)
+        self._cancel_grace()
+
+    def _detach(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        if self._subscribers or self.finished or self.task is None:
+            return
+        if self.grace_seconds <= 0:
+            self.cancel()
+        else:
+            logger.info(f"运行 {self.run_id} 已无订阅者，{self.grace_seconds}s 内无人重连将取消")
+            self._grace_handle = asyncio.get_running_loop().call_later(self.grace_seconds, self.cancel)
+
+    def _cancel_grace(self) -> None:
+        if self._grace_handle is not None:
+            self._grace_handle.cancel()
+            self._grace_handle = None
+
+    def buffer_stats(self) -> Dict[str, Any]:
+        """缓冲区指标：回放缓冲区字节数和各订阅者积压字节数"""
+        pending = [subscriber.pending_bytes for subscriber in self._subscribers]
+        return {
+            "run_id": self.run_id,
+            "finished": self.finished,
+            "subscribers": len(pending),
+            "replay_events": len(self._events),
+            "replay_bytes": self._events_bytes,
+            "pending_bytes": sum(pending),
+            "max_pending_bytes": max(pending, default=0),
+        }
+
+    def cancel(self) -> None:
+        """取消执行任务"""
+        if self.task is not None and not self.task.done():
+            logger.info(f"取消运行 {self.run_id}")
+            self.task.cancel()
+
+
+class RunRegistry:
+    """进程内运行登记表：运行 ID -> StreamRun"""
+
+    def __init__(self, retention_seconds: float = 300.0):
+        """初始化登记表
+
+        Args:
+            retention_seconds: 结束的运行保留多久以供回放（秒）
+        """
+        self.retention_seconds = retention_seconds
+        self._runs: Dict[str, StreamRun] = {}
+        self._lock = threading.Lock()
+
+    def register(self, run: StreamRun) -> None:
+        """登记运行（同一 ID 的旧运行被替换），顺带清理过期的已结束运行"""
+        with self._lock:
+            self._expire()
+            self._runs[run.run_id] = run
+
+    def get(self, run_id: str) -> Optional[StreamRun]:
+        """按 ID 查找运行（已过保留期的运行视为不存在）"""
+        with self._lock:
+            self._expire()
+            return self._runs.get(run_id)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.retention_seconds
+        for run_id in [
+            run_id for run_id, run in self._runs.items()
+            if run.finished and run.finished_at < cutoff
+        ]:
+            del self._runs[run_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """登记表指标：运行数、缓冲字节数（按运行列出进行中的运行）和慢订阅者处理统计"""
+        with self._lock:
+            runs = list(self._runs.values())
+        streams = [run.buffer_stats() for run in runs]
+        return {
+            "runs": len(runs),
+            "active_runs": sum(1 for stream in streams if not stream["finished"]),
+            "subscribers": sum(stream["subscribers"] for stream in streams),
+            "replay_bytes": sum(stream["replay_bytes"] for stream in streams),
+            "pending_bytes": sum(stream["pending_bytes"] for stream in streams),
+            "max_pending_bytes": max((stream["max_pending_bytes"] for stream in streams), default=0),
+            **_slow_consumer_stats.snapshot(),
+            "streams": [stream for stream in streams if not stream["finished"]],
+        }
+
+
+_run_registry: Optional[RunRegistry] = None
+
+
+def get_run_registry() -> RunRegistry:
+    """获取进程级运行登记表"""
+    global _run_registry
+    if _run_registry is None:
+        _run_registry = RunRegistry(retention_seconds=settings.stream_run_retention_seconds)
+    return _run_registry
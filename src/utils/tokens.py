@@ -0,0 +1,43 @@
+"""Token 估算工具
+
+用于 Prompt 预算控制的轻量 token 估算，不依赖具体模型的分词器。
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 token 数
+
+    中日韩等非 ASCII 字符按每字符 1 个 token 计，ASCII 字符按每 4 个字符 1 个 token 计，
+    对 Deepseek/OpenAI 系分词器偏保守，适合做预算上限判断。
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: 估算的 token 数
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """按估算 token 数截断文本（保留开头部分）
+
+    Args:
+        text: 文本
+        max_tokens: 最大 token 数
+
+    Returns:
+        str: 截断后的文本，发生截断时以 "…" 结尾
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    used = 0.0
+    for i, ch in enumerate(text):
+        used += 1 if ord(ch) >= 128 else 0.25
+        if used > max_tokens:
+            return text[:i] + "…"
+    return text
@@ -0,0 +1,269 @@
+"""测试基于 Motor 的异步对话记忆"""
+
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import async_mongodb_memory, devops_agent, session_cache
+from src.agent.async_mongodb_memory import AsyncMongoDBConversationMemory
+from src.agent.devops_agent import DevOpsAgent
+from src.agent.session_cache import SessionCache, get_session_cache
+
+
+@pytest.fixture(autouse=True)
+def _fresh_session_cache(monkeypatch):
+    """每个测试使用独立的会话缓存"""
+    cache = SessionCache(max_bytes=1 << 20, idle_seconds=60, max_pairs=50)
+    monkeypatch.setattr(session_cache, "_session_cache", cache)
+
+
+def _evaluate(expr, doc):
+    """计算轮次 ID 分配管道用到的聚合表达式"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if not isinstance(expr, dict):
+        return expr
+    (op, arg), = expr.items()
+    if op == "$literal":
+        return arg
+    args = [_evaluate(item, doc) for item in (arg if isinstance(arg, list) else [arg])]
+    if op == "$ifNull":
+        return args[0] if args[0] is not None else args[1]
+    if op == "$size":
+        return len(args[0])
+    if op == "$add":
+        return sum(args)
+    raise NotImplementedError(op)
+
+
+class _Collection:
+    """保存单个会话文档的异步集合"""
+
+    def __init__(self, doc=None):
+        self.doc = doc
+        self.updates = []
+
+    async def find_one(self, query, *args, **kwargs):
+        return self.doc
+
+    async def insert_one(self, doc):
+        self.doc = doc
+
+    async def find_one_and_update(self, query, pipeline, projection=None, return_document=None):
+        await asyncio.sleep(0)  # 让并发写入交错
+        self.updates.append((query, pipeline))
+        for stage in pipeline:
+            fields = {key: _evaluate(value, self.doc) for key, value in stage["$set"].items()}
+            self.doc.update(fields)
+        return {"turn_count": self.doc["turn_count"]}
+
+    async def delete_one(self, query):
+        self.doc = None
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        return _Cursor(sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0))
+
+    def limit(self, n):
+        return _Cursor(self.docs[:n])
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _TurnsCollection:
+    """conversation_turns 集合：每轮一个文档"""
+
+    def __init__(self, turns=()):
+        self.turns = list(turns)
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        after = query.get("turn_id", {}).get("$gt", 0)
+        docs = [turn for turn in self.turns if turn["turn_id"] > after]
+        if projection:
+            docs = [{k: v for k, v in doc.items() if projection.get(k)} for doc in docs]
+        return _Cursor(docs)
+
+    async def count_documents(self, query):
+        return sum(
+            turn["turn_id"] < query["turn_id"]["$lt"]
+            and turn["status"] not in query["status"]["$nin"]
+            for turn in self.turns
+        )
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(0)
+        self.turns.append(doc)
+
+    async def delete_many(self, query):
+        self.turns = [turn for turn in self.turns if turn["session_id"] != query["session_id"]]
+
+
+def _turn(turn_id, status="completed"):
+    return {
+        "session_id": "async-test",
+        "turn_id": turn_id,
+        "user_input": f"问题{turn_id}",
+        "final_response": f"回答{turn_id}",
+        "status": status,
+    }
+
+
+def _patch(monkeypatch, collection, turns_collection):
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", lambda: collection
+    )
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversation_turns_collection", lambda: turns_collection
+    )
+
+
+async def test_loads_history_and_appends_turn(monkeypatch):
+    """测试异步加载会话历史（跳过已取消的轮次），新轮次写入轮次集合且编号连续"""
+    collection = _Collection({
+        "session_id": "async-test",
+        "turn_count": 2,
+        "summary": "早期摘要",
+        "summarized_turns": 0,
+    })
+    turns_collection = _TurnsCollection([_turn(2, status="cancelled"), _turn(1)])
+    _patch(monkeypatch, collection, turns_collection)
+
+    memory = await AsyncMongoDBConversationMemory.create("async-test")
+    assert memory.get_turn_pairs() == [("问题1", "回答1")]
+    assert memory.summary == "早期摘要"
+
+    await memory.add_turn(user_input="问题3", final_response="回答3", total_tokens=10)
+    query, _ = collection.updates[-1]
+    assert query == {"session_id": "async-test"}
+    assert collection.doc["turn_count"] == 3
+    assert "turns" not in collection.doc  # 会话文档只保存元数据和计数器
+    new_turn = turns_collection.turns[-1]
+    assert (new_turn["session_id"], new_turn["turn_id"]) == ("async-test", 3)
+    assert new_turn["total_tokens"] == 10
+    assert memory.get_turn_pairs()[-1] == ("问题3", "回答3")
+
+    # 分页读取只查询请求的范围
+    page = await memory.get_turns(after_turn_id=1, limit=1)
+    assert [turn.turn_id for turn in page] == [2]
+    assert turns_collection.queries[-1] == {"session_id": "async-test", "turn_id": {"$gt": 1}}
+
+
+async def test_loads_only_recent_turns_without_agent_steps(monkeypatch):
+    """测试加载会话只读取最近 N 轮的问答字段，摘要位置按未加载的问答对数换算"""
+    steps = [{"step_number": 1, "thought": "查询", "observation": "很长的工具输出" * 100}]
+    turns = [
+        {**_turn(turn_id, "cancelled" if turn_id == 2 else "completed"), "agent_steps": steps}
+        for turn_id in range(1, 7)
+    ]
+    collection = _Collection({
+        "session_id": "async-test", "turn_count": 6, "summary": "摘要", "summarized_turns": 2
+    })
+    _patch(monkeypatch, collection, _TurnsCollection(turns))
+    monkeypatch.setattr(async_mongodb_memory.settings, "history_load_turns", 3)
+    loaded = []
+    load_history = AsyncMongoDBConversationMemory._load_history
+
+    def spy(self, doc, turns, skipped_pairs=0):
+        loaded.extend(turns)
+        load_history(self, doc, turns, skipped_pairs)
+
+    monkeypatch.setattr(AsyncMongoDBConversationMemory, "_load_history", spy)
+
+    memory = await AsyncMongoDBConversationMemory.create("async-test")
+
+    assert [turn["turn_id"] for turn in loaded] == [4, 5, 6]
+    assert all("agent_steps" not in turn for turn in loaded)
+    # 第 1、3 轮已摘要（第 2 轮已取消），窗口外待摘要的是第 4、5 轮
+    assert memory.get_turns_to_summarize(recent_turns=1) == [("问题4", "回答4"), ("问题5", "回答5")]
+    assert "用户: 问题6" in memory.build_history(recent_turns=1, token_budget=1000)
+
+
+async def test_session_cache_skips_turn_reads_until_version_changes(monkeypatch):
+    """测试会话缓存：版本一致时不读取轮次，本进程写入的轮次写穿，其它进程写入后重新加载"""
+    collection = _Collection({
+        "session_id": "async-test", "turn_count": 1, "summary": None, "summarized_turns": 0
+    })
+    turns_collection = _TurnsCollection([_turn(1)])
+    _patch(monkeypatch, collection, turns_collection)
+
+    memory = await AsyncMongoDBConversationMemory.create("async-test")
+    await memory.add_turn(user_input="问题2", final_response="回答2")
+    assert len(turns_collection.queries) == 1
+
+    # 同一进程的下一次请求：版本一致，直接使用缓存（包含写穿的第 2 轮）
+    memory = await AsyncMongoDBConversationMemory.create("async-test")
+    assert memory.get_turn_pairs() == [("问题1", "回答1"), ("问题2", "回答2")]
+    assert len(turns_collection.queries) == 1
+
+    # 其它进程写入第 3 轮：turn_count 变化，重新加载
+    turns_collection.turns.append({**_turn(3), "user_input": "问题3"})
+    collection.doc["turn_count"] = 3
+    memory = await AsyncMongoDBConversationMemory.create("async-test")
+    assert memory.get_turn_pairs()[-1] == ("问题3", "回答3")
+    assert len(turns_collection.queries) == 2
+
+    stats = get_session_cache().stats()
+    assert (stats["hits"], stats["misses"], stats["stale"]) == (1, 1, 1)
+
+
+async def test_delete_session_clears_cache_and_memory(monkeypatch):
+    """测试删除会话同时删除轮次、缓存条目和内存中的对话历史"""
+    collection = _Collection({
+        "session_id": "async-test", "turn_count": 1, "summary": None, "summarized_turns": 0
+    })
+    turns_collection = _TurnsCollection([_turn(1)])
+    _patch(monkeypatch, collection, turns_collection)
+
+    memory = await AsyncMongoDBConversationMemory.create("async-test")
+    assert get_session_cache().stats()["entries"] == 1
+
+    await memory.delete_session()
+
+    assert collection.doc is None
+    assert turns_collection.turns == []
+    assert get_session_cache().stats()["entries"] == 0
+    assert memory.get_turn_pairs() == []
+
+
+async def test_concurrent_writers_get_distinct_turn_ids(monkeypatch):
+    """测试并发写入同一会话时轮次 ID 由一次原子更新分配，互不重复且有序
+
+    尚未迁移的旧文档没有 turn_count，以内嵌 turns 数组的长度为起点。
+    """
+    collection = _Collection({"session_id": "async-race", "turns": [_turn(1), _turn(2)]})
+    turns_collection = _TurnsCollection()
+    _patch(monkeypatch, collection, turns_collection)
+
+    memories = [await AsyncMongoDBConversationMemory.create("async-race") for _ in range(5)]
+    turn_ids = await asyncio.gather(
+        *(memory.begin_turn(f"问题{i}") for i, memory in enumerate(memories))
+    )
+
+    assert sorted(turn_ids) == [3, 4, 5, 6, 7]
+    assert sorted(turn["turn_id"] for turn in turns_collection.turns) == [3, 4, 5, 6, 7]
+    assert len(collection.updates) == 5
+
+
+async def test_achat_degrades_to_memory_only(monkeypatch):
+    """测试异步对话接口在 MongoDB 不可用时以纯内存模式完成对话"""
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    fake = FakeListChatModel(responses=["Thought: 数据已足够\nFinal Answer: 一切正常", "unused"])
+    monkeypatch.setattr(async_mongodb_memory, "get_async_conversations_collection", unavailable)
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+
+    result = await DevOpsAgent().achat("项目状态如何", session_id="achat-test")
+
+    assert result["success"] is True
+    assert result["response"] == "一切正常"
+    assert result["session_id"] == "achat-test"
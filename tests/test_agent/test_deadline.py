@@ -0,0 +1,78 @@
+"""测试请求时限与部分回答"""
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import async_mongodb_memory, devops_agent
+from src.agent.devops_agent import DevOpsAgent
+from src.api.routes.chat_stream import stream_with_callback
+from src.tools.base import get_tool_cache
+from src.tools.jenkins import JenkinsTool
+from src.utils.deadline import Deadline
+
+
+@pytest.fixture(autouse=True)
+def slow_jenkins(monkeypatch):
+    """Jenkins 工具响应很慢，其它数据源正常；不连接 MongoDB"""
+
+    async def slow(self, query):
+        await asyncio.sleep(5)
+        return {}
+
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    monkeypatch.setattr(JenkinsTool, "_aexecute", slow)
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", unavailable
+    )
+    monkeypatch.setattr(devops_agent.settings, "deadline_answer_reserve_seconds", 0.3)
+    get_tool_cache().clear()
+
+
+def test_short_deadline_keeps_loop_budget(monkeypatch):
+    """测试短于预留时间的时限按比例缩小预留，推理循环仍有时间调用工具"""
+    monkeypatch.setattr(devops_agent.settings, "deadline_answer_reserve_seconds", 15.0)
+
+    short = DevOpsAgent.loop_budget(Deadline(10))
+    assert 7.0 < short <= 7.5
+    # 较长的时限仍扣除完整的预留时间
+    assert 44.0 < DevOpsAgent.loop_budget(Deadline(60)) <= 45.0
+
+
+async def test_analysis_returns_partial_result(monkeypatch):
+    """测试预取超出时限的数据源记为错误，仍基于其余数据完成汇总"""
+    monkeypatch.setattr(devops_agent.settings, "analysis_mode", "prefetch")
+    agent = DevOpsAgent()
+    agent.llm = FakeListChatModel(responses=["部分分析", "unused"])
+
+    result = await agent.aanalyze_project("test-project", deadline=Deadline(0.6))
+
+    assert result["success"] is True
+    assert result["partial"] is True
+    assert result["response"] == "部分分析"
+
+
+async def test_stream_forces_final_answer_before_deadline(monkeypatch):
+    """测试推理循环到时被停止，强制作答后以带 partial 的 RUN_FINISHED 结束"""
+    fake = FakeListChatModel(
+        responses=["Thought: 查询构建\nAction: jenkins\nAction Input: my-job\n", "部分回答", "unused"]
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(devops_agent.settings, "react_early_dispatch", False)
+    agent = DevOpsAgent()
+
+    events = [
+        json.loads(chunk.split("data: ", 1)[1])
+        async for chunk in stream_with_callback(agent, "构建状态如何", "deadline-test", Deadline(0.8))
+    ]
+
+    finished = [event for event in events if event["type"] == "RUN_FINISHED"]
+    assert len(finished) == 1
+    assert finished[0]["partial"] is True
+    # 第一次调用给出 Action，第二次是强制回答
+    assert fake.i == 2
@@ -0,0 +1,35 @@
+"""测试 ReAct 工具提前调度"""
+
+from src.agent.early_dispatch import ReActEarlyDispatcher
+
+parse = ReActEarlyDispatcher.parse_action
+
+
+def test_parse_waits_for_complete_input():
+    """测试 Action Input 未换行前不调度"""
+    assert parse("Thought: 查询\nAction: jenkins\nAction Input: my-j", complete=False) is None
+    assert parse("Thought: 查询\nAction: jenkins\nAction Input: my-job\n", complete=False) == (
+        "jenkins",
+        "my-job",
+    )
+
+
+def test_parse_waits_for_complete_json():
+    """测试跨行 JSON 输入完整后才调度"""
+    partial = 'Action: gerrit\nAction Input: {"project_name":\n'
+    assert parse(partial, complete=False) is None
+    assert parse(partial + ' "demo"}\n', complete=False) == (
+        "gerrit",
+        '{"project_name":\n "demo"}',
+    )
+
+
+def test_parse_cuts_at_observation():
+    """测试忽略模型臆造的 Observation"""
+    text = 'Action: jenkins\nAction Input: "my-job"\nObservation: 成功'
+    assert parse(text, complete=False) == ("jenkins", "my-job")
+
+
+def test_parse_ignores_final_answer():
+    """测试最终答案不触发调度"""
+    assert parse("Thought: 完成\nFinal Answer: 构建正常\n", complete=True) is None
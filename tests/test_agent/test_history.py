@@ -0,0 +1,61 @@
+"""测试受 token 预算限制的对话历史"""
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import mongodb_memory
+from src.agent.devops_agent import DevOpsAgent
+from src.agent.mongodb_memory import MongoDBConversationMemory
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    """纯内存模式的会话记忆（不连接 MongoDB）"""
+
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    monkeypatch.setattr(mongodb_memory, "get_conversations_collection", unavailable)
+    return MongoDBConversationMemory(session_id="history-test")
+
+
+def test_empty_history(memory):
+    """测试没有历史时的占位文本"""
+    assert memory.build_history(recent_turns=4, token_budget=1000) == "（无）"
+
+
+def test_history_keeps_recent_turns_within_budget(memory):
+    """测试只保留最近 N 轮且不超出 token 预算"""
+    for i in range(10):
+        memory.add_turn(user_input=f"问题{i}", final_response=f"回答{i}" * 50)
+
+    history = memory.build_history(recent_turns=3, token_budget=10_000)
+    assert "问题9" in history and "问题7" in history
+    assert "问题6" not in history
+
+    small = memory.build_history(recent_turns=3, token_budget=150)
+    assert "问题9" in small
+    assert "问题7" not in small
+
+
+def test_summary_refresh_is_incremental(memory, monkeypatch):
+    """测试摘要只合并新移出窗口的轮次"""
+    monkeypatch.setattr("src.agent.devops_agent.settings.history_recent_turns", 2)
+    monkeypatch.setattr("src.agent.devops_agent.settings.history_summary_batch", 2)
+
+    agent = DevOpsAgent()
+    agent.llm = FakeListChatModel(responses=["摘要A", "摘要B"])
+
+    for i in range(3):
+        memory.add_turn(user_input=f"问题{i}", final_response=f"回答{i}")
+    agent.refresh_history_summary(memory)
+    assert memory.summary is None  # 窗口外只有 1 轮，未达到批量阈值
+
+    memory.add_turn(user_input="问题3", final_response="回答3")
+    agent.refresh_history_summary(memory)
+    assert memory.summary == "摘要A"
+    assert memory.summarized_turns == 2
+
+    history = memory.build_history(recent_turns=2, token_budget=1000)
+    assert history.startswith("之前对话的摘要: 摘要A")
+    assert "问题0" not in history and "问题3" in history
@@ -0,0 +1,91 @@
+"""测试 Agent 执行度量回调"""
+
+import time
+from uuid import uuid4
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from src.agent.instrumentation import RunMetricsCallbackHandler
+
+
+def _llm_result(prompt_tokens: int, completion_tokens: int, reasoning_tokens: int = 0) -> LLMResult:
+    message = AIMessage(
+        content="",
+        usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "output_token_details": {"reasoning": reasoning_tokens},
+        },
+    )
+    return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+def test_step_and_turn_metrics():
+    """测试 LLM 度量归属到步骤，并汇总到本轮"""
+    completed = []
+    handler = RunMetricsCallbackHandler(on_step_complete=completed.append)
+
+    llm_run = uuid4()
+    handler.on_chat_model_start({}, [], run_id=llm_run)
+    handler.on_llm_new_token("T", run_id=llm_run)
+    handler.on_llm_end(_llm_result(100, 20, 5), run_id=llm_run)
+
+    handler.on_agent_action(AgentAction("jenkins", "my-job", "Thought: 查询"))
+    tool_run = uuid4()
+    handler.on_tool_start({"name": "jenkins"}, "my-job", run_id=tool_run)
+    handler.on_tool_end('{"status": "SUCCESS"}', run_id=tool_run)
+
+    final_run = uuid4()
+    handler.on_chat_model_start({}, [], run_id=final_run)
+    handler.on_llm_end(_llm_result(300, 10), run_id=final_run)
+    handler.finish()
+
+    assert len(completed) == 1
+    step = completed[0]
+    assert step.action == "jenkins"
+    assert step.observation == '{"status": "SUCCESS"}'
+    assert (step.prompt_tokens, step.completion_tokens, step.reasoning_tokens) == (100, 20, 5)
+    assert step.ttft_ms is not None
+    assert step.duration_ms == step.llm_duration_ms + step.tool_duration_ms
+
+    turn = handler.turn_metrics()
+    assert turn["prompt_tokens"] == 400
+    assert turn["completion_tokens"] == 30
+    assert turn["total_tokens"] == 430
+    assert turn["reasoning_tokens"] == 5
+    assert turn["llm_calls"] == 2
+    assert turn["duration_ms"] >= turn["llm_duration_ms"]
+
+
+def test_usage_from_llm_output():
+    """测试非流式调用从 llm_output 读取用量"""
+    handler = RunMetricsCallbackHandler()
+    run_id = uuid4()
+    handler.on_llm_start({}, ["prompt"], run_id=run_id)
+    handler.on_llm_end(
+        LLMResult(
+            generations=[[]],
+            llm_output={"token_usage": {"prompt_tokens": 7, "completion_tokens": 3}},
+        ),
+        run_id=run_id,
+    )
+    assert handler.turn_metrics()["total_tokens"] == 10
+
+
+def test_duration_includes_forced_answer_after_agent_finish():
+    """测试推理循环被提前停止（同样触发 on_agent_finish）后，强制作答的耗时计入本轮"""
+    handler = RunMetricsCallbackHandler()
+    handler.on_agent_finish(AgentFinish({"output": "Agent stopped"}, ""), run_id=uuid4())
+
+    forced_run = uuid4()
+    handler.on_chat_model_start({}, [], run_id=forced_run)
+    time.sleep(0.05)
+    handler.on_llm_end(_llm_result(50, 10), run_id=forced_run)
+    handler.finish()
+
+    turn = handler.turn_metrics()
+    assert turn["total_tokens"] == 60
+    assert turn["duration_ms"] >= turn["llm_duration_ms"] >= 50
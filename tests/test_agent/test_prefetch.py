@@ -0,0 +1,51 @@
+"""测试并行预取分析模式"""
+
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import devops_agent
+from src.agent.devops_agent import DevOpsAgent
+
+
+class _InMemoryConversation:
+    """替代 AsyncMongoDBConversationMemory，避免测试依赖 MongoDB"""
+
+    turns = []
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+
+    @classmethod
+    async def create(cls, session_id):
+        return cls(session_id)
+
+    async def add_turn(self, **kwargs):
+        self.turns.append(kwargs)
+
+
+async def test_prefetch_project_data_fetches_all_sources():
+    """测试预取一次返回全部六个数据源"""
+    agent = DevOpsAgent()
+    observations = await agent.prefetch_project_data("test-project")
+
+    assert set(observations) == {tool.name for tool in agent.tools}
+    assert json.loads(observations["jenkins"])["job_name"] == "test-project"
+    assert json.loads(observations["custom_backend"])["project"] == "test-project"
+
+
+async def test_analyze_project_uses_single_llm_call(monkeypatch):
+    """测试预取模式只调用一次 LLM 并保存全部步骤"""
+    monkeypatch.setattr(devops_agent.settings, "analysis_mode", "prefetch")
+    monkeypatch.setattr(devops_agent, "AsyncMongoDBConversationMemory", _InMemoryConversation)
+    _InMemoryConversation.turns = []
+
+    agent = DevOpsAgent()
+    agent.llm = FakeListChatModel(responses=["项目整体健康", "unused"])
+
+    result = await agent.aanalyze_project("test-project")
+
+    assert result["success"] is True
+    assert result["response"] == "项目整体健康"
+    assert agent.llm.i == 1
+    assert len(_InMemoryConversation.turns[0]["agent_steps"]) == 6
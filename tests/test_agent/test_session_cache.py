@@ -0,0 +1,61 @@
+"""测试进程内会话缓存"""
+
+import time
+
+from src.agent.session_cache import SessionCache
+
+
+def _pairs(n, text="x"):
+    return [(f"问题{i}", text) for i in range(n)]
+
+
+def test_version_check_and_write_through():
+    """测试版本一致才命中，紧接缓存版本的轮次写穿追加，否则删除条目"""
+    cache = SessionCache(max_bytes=1 << 20, idle_seconds=60, max_pairs=50)
+    cache.put("s1", 2, _pairs(2))
+
+    cache.append("s1", 3, ("问题2", "回答2"))
+    cache.append("s1", 4, None)  # 已取消的轮次只推进版本
+    entry = cache.get("s1", 4)
+    assert entry.pairs[-1] == ("问题2", "回答2")
+    assert len(entry.pairs) == 3
+
+    # 跳过了第 5 轮：缓存缺少中间的轮次，删除条目
+    cache.append("s1", 6, ("问题5", "回答5"))
+    assert cache.get("s1", 6) is None
+
+    cache.put("s2", 1, _pairs(1))
+    assert cache.get("s2", 2) is None  # 其它进程写入后版本不一致
+    assert cache.get("s2", 2) is None  # 已删除
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stale"]) == (1, 2, 1)
+
+
+def test_byte_bound_lru_and_idle_expiry():
+    """测试按字节数 LRU 淘汰和空闲过期"""
+    cache = SessionCache(max_bytes=3000, idle_seconds=0.05, max_pairs=50)
+    cache.put("a", 1, _pairs(1, "x" * 800))
+    cache.put("b", 1, _pairs(1, "x" * 800))
+    assert cache.get("a", 1) is not None  # a 变为最近使用
+    cache.put("c", 1, _pairs(1, "x" * 800))
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 3000
+
+    time.sleep(0.06)
+    assert cache.get("a", 1) is None
+    assert cache.stats()["expirations"] >= 1
+
+
+def test_trims_to_max_pairs_and_tracks_offset():
+    """测试每个会话最多缓存 max_pairs 个问答对，丢弃的计入 pair_offset"""
+    cache = SessionCache(max_bytes=1 << 20, idle_seconds=60, max_pairs=3)
+    cache.put("s", 4, _pairs(4), pair_offset=2)
+    cache.append("s", 5, ("问题4", "回答4"))
+
+    entry = cache.get("s", 5)
+    assert [user_input for user_input, _ in entry.pairs] == ["问题2", "问题3", "问题4"]
+    assert entry.pair_offset == 4
@@ -0,0 +1,31 @@
+"""测试 Agent 后端选择"""
+
+from langchain_classic.agents.agent import RunnableAgent, RunnableMultiActionAgent
+from langchain_classic.agents.output_parsers.tools import ToolsAgentOutputParser
+
+from src.agent import devops_agent
+from src.agent.devops_agent import DevOpsAgent
+
+
+def test_tool_calling_backend_builds_multi_action_executor(monkeypatch):
+    """测试 tool_calling 后端绑定全部工具，执行器可在单轮执行多个工具调用"""
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "tool_calling")
+    agent = DevOpsAgent()
+
+    executor = agent._build_executor(max_iterations=5, max_execution_time=30)
+
+    assert agent.backend == "tool_calling"
+    assert isinstance(executor.agent, RunnableMultiActionAgent)
+    assert isinstance(executor.agent.runnable.last, ToolsAgentOutputParser)
+    bound = executor.agent.runnable.steps[-2].kwargs["tools"]
+    assert [tool["function"]["name"] for tool in bound] == [tool.name for tool in agent.tools]
+    assert (executor.max_iterations, executor.max_execution_time) == (5, 30)
+
+
+def test_react_backend_builds_single_action_executor(monkeypatch):
+    """测试 react 后端每轮只执行一个工具调用"""
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+
+    executor = DevOpsAgent()._build_executor(max_iterations=5, max_execution_time=None)
+
+    assert isinstance(executor.agent, RunnableAgent)
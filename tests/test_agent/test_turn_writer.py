@@ -0,0 +1,75 @@
+"""测试流式轮次的增量持久化"""
+
+import asyncio
+
+from src.agent.turn_writer import TurnWriter
+from src.models.mongodb_models import AgentStep
+
+
+class _RecordingMemory:
+    """记录写入调用的会话记忆"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def begin_turn(self, user_input):
+        await asyncio.sleep(0.01)  # 写入完成前后续写入不会开始
+        self.calls.append(("begin", user_input))
+        return 7
+
+    async def append_steps(self, turn_id, agent_steps):
+        self.calls.append(("append", turn_id, [step.step_number for step in agent_steps]))
+
+    async def finish_turn(
+        self, turn_id, user_input, final_response, agent_steps=None, status="completed", **metrics
+    ):
+        steps = [step.step_number for step in agent_steps]
+        self.calls.append(("finish", turn_id, steps, status, metrics))
+
+
+class _Metrics:
+    def __init__(self, steps):
+        self.agent_steps = steps
+
+    def turn_metrics(self):
+        return {"total_tokens": 42}
+
+
+def _step(number):
+    return AgentStep(step_number=number, thought="t", action="jenkins", observation="ok")
+
+
+async def test_steps_are_batched_and_written_in_order():
+    """测试步骤按批追加，结束时补写剩余步骤和度量，写入按提交顺序串行执行"""
+    memory = _RecordingMemory()
+    writer = TurnWriter("构建状态如何", batch_size=2, flush_interval=3600)
+    writer.begin(memory)
+
+    steps = [_step(i) for i in range(1, 5)]
+    for step in steps[:3]:
+        writer.add_step(step)
+
+    # 第 4 步的工具未返回，只在结束时随最终更新写入
+    await writer.finish("构建正常", _Metrics(steps), status="completed")
+
+    assert memory.calls == [
+        ("begin", "构建状态如何"),
+        ("append", 7, [1, 2]),
+        ("finish", 7, [3, 4], "completed", {"total_tokens": 42}),
+    ]
+
+
+async def test_finish_without_turn_writes_all_steps():
+    """测试 begin_turn 未成功时结束写入包含全部步骤（退回一次性写入）"""
+    memory = _RecordingMemory()
+    async def no_turn(user_input):
+        return None
+
+    memory.begin_turn = no_turn
+    writer = TurnWriter("构建状态如何", batch_size=1)
+    writer.begin(memory)
+    writer.add_step(_step(1))
+
+    await writer.finish("", _Metrics([_step(1), _step(2)]), status="cancelled")
+
+    assert memory.calls[-1] == ("finish", None, [1, 2], "cancelled", {"total_tokens": 42})
@@ -0,0 +1,136 @@
+"""测试 WebSocket 流式运行接口"""
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import async_mongodb_memory, devops_agent
+from src.agent.devops_agent import DevOpsAgent
+from src.api.routes import agent_ws
+from src.api.routes.agent_ws import encode_frame
+
+
+def _client(monkeypatch, fake):
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    async def record_turn(
+        self, memory, message, agent_response, metrics, status="completed", writer=None
+    ):
+        pass
+
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", unavailable
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(devops_agent.settings, "stream_reconnect_grace_seconds", 0)
+    monkeypatch.setattr(DevOpsAgent, "asave_turn", record_turn)
+
+    app = FastAPI()
+    app.include_router(agent_ws.router)
+    return TestClient(app)
+
+
+def _run_message(run_id, content):
+    return {
+        "type": "run",
+        "threadId": f"thread-{run_id}",
+        "runId": run_id,
+        "messages": [{"role": "user", "content": content}],
+        "forwardedProps": {"coalesceMs": 0},
+    }
+
+
+def _receive_until_finished(ws, channels, compact=False):
+    """按通道收集事件，直到所有通道都结束"""
+    events = {channel: [] for channel in channels}
+    done = set()
+    while done != set(channels):
+        if compact:
+            channel, event_id, event = json.loads(ws.receive_bytes())
+        else:
+            frame = json.loads(ws.receive_text())
+            channel, event_id, event = frame["runId"], frame["eventId"], frame["event"]
+        events[channel].append((event_id, event))
+        if event["type"] in ("RUN_FINISHED", "RUN_ERROR"):
+            done.add(channel)
+    return events
+
+
+def test_multiplexes_runs_over_one_connection(monkeypatch):
+    """测试一个连接上同时进行两个运行，事件按运行区分且各自的事件 ID 连续"""
+    fake = FakeListChatModel(responses=[
+        "Thought: 数据已足够\nFinal Answer: 项目一切正常",
+        "Thought: 数据已足够\nFinal Answer: 项目一切正常",
+        "unused",
+    ])
+    with _client(monkeypatch, fake).websocket_connect("/agent/ws") as ws:
+        ws.send_json(_run_message("ws-run-a", "项目A状态"))
+        ws.send_json(_run_message("ws-run-b", "项目B状态"))
+        events = _receive_until_finished(ws, ["ws-run-a", "ws-run-b"])
+
+    for run_id, run_events in events.items():
+        assert [event_id for event_id, _ in run_events] == list(range(1, len(run_events) + 1))
+        assert run_events[0][1]["type"] == "RUN_STARTED"
+        assert run_events[-1][1] == {**run_events[-1][1], "type": "RUN_FINISHED", "runId": run_id}
+        text = "".join(event.get("delta", "") for _, event in run_events)
+        assert "项目一切正常" in text
+
+
+def test_compact_frames_and_in_band_cancel(monkeypatch):
+    """测试紧凑二进制帧按通道号区分运行，连接内取消使运行以 RUN_ERROR 结束"""
+    fake = FakeListChatModel(
+        responses=["Thought: 需要很长时间分析\nFinal Answer: " + "很长的回答" * 50, "unused"],
+        sleep=0.01,
+    )
+    with _client(monkeypatch, fake).websocket_connect("/agent/ws?compact=1") as ws:
+        ws.send_json(_run_message("ws-cancel", "详细分析"))
+        channel, event_id, event = json.loads(ws.receive_bytes())
+        assert (channel, event_id, event["type"]) == (0, 1, "RUN_STARTED")
+
+        ws.send_json({"type": "cancel", "runId": "ws-cancel"})
+        events = _receive_until_finished(ws, [0], compact=True)[0]
+        assert events[-1][1]["type"] == "RUN_ERROR"
+
+        # 未知运行的续传请求返回事件 ID 为 0 的错误
+        ws.send_json({"type": "resume", "runId": "missing-run", "lastEventId": 3})
+        channel, event_id, event = json.loads(ws.receive_bytes())
+        assert (channel, event_id, event["type"]) == (1, 0, "RUN_ERROR")
+
+
+def test_cancel_from_observer_only_detaches_its_subscription(monkeypatch):
+    """测试加入运行的连接发送取消只结束自己的订阅，启动运行的连接仍收到完整事件"""
+    fake = FakeListChatModel(
+        responses=["Thought: 需要分析\nFinal Answer: " + "回答" * 50, "unused"], sleep=0.01
+    )
+    client = _client(monkeypatch, fake)
+    with client.websocket_connect("/agent/ws") as owner, \
+            client.websocket_connect("/agent/ws") as observer:
+        owner.send_json(_run_message("ws-shared", "详细分析"))
+        assert json.loads(owner.receive_text())["event"]["type"] == "RUN_STARTED"
+
+        observer.send_json(_run_message("ws-shared", "详细分析"))
+        assert json.loads(observer.receive_text())["event"]["type"] == "RUN_STARTED"
+        observer.send_json({"type": "cancel", "runId": "ws-shared"})
+        while True:
+            frame = json.loads(observer.receive_text())
+            if frame["eventId"] == 0:
+                break
+        assert frame["event"]["code"] == "UNSUBSCRIBED"
+
+        events = _receive_until_finished(owner, ["ws-shared"])["ws-shared"]
+        assert events[-1][1]["type"] == "RUN_FINISHED"
+    assert fake.i == 1
+
+
+def test_encode_frame_wraps_payload_without_reserializing():
+    """测试帧编码直接拼接事件 JSON"""
+    payload = '{"type":"TEXT_MESSAGE_CONTENT","messageId":"m1","delta":"你好"}'
+    text = json.loads(encode_frame(0, "run-1", 7, payload))
+    assert text == {"runId": "run-1", "eventId": 7, "event": json.loads(payload)}
+    compact = encode_frame(0, "run-1", 7, payload, compact=True)
+    assert isinstance(compact, bytes)
+    assert json.loads(compact) == [0, 7, json.loads(payload)]
@@ -0,0 +1,25 @@
+"""测试 API 依赖注入"""
+
+from types import SimpleNamespace
+
+from src.api.dependencies import get_agent, init_agent
+
+
+def test_get_agent_returns_shared_instance():
+    """测试所有请求共享启动时构建的 Agent"""
+    app = SimpleNamespace(state=SimpleNamespace())
+    agent = init_agent(app)
+
+    request = SimpleNamespace(app=app)
+    assert get_agent(request) is agent
+    assert get_agent(request) is agent
+
+
+def test_get_agent_builds_lazily():
+    """测试未经启动初始化时惰性构建并缓存"""
+    app = SimpleNamespace(state=SimpleNamespace())
+    request = SimpleNamespace(app=app)
+
+    agent = get_agent(request)
+    assert app.state.agent is agent
+    assert get_agent(request) is agent
@@ -0,0 +1,97 @@
+"""测试 /agent/run 无状态模式（客户端提供对话历史）"""
+
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import async_mongodb_memory, devops_agent
+from src.agent.devops_agent import DevOpsAgent
+from src.api.routes import chat_stream
+from src.models.schemas import AGUIRunAgentInput, Message
+
+
+class _RecordingCollection:
+    """记录调用的 conversations / conversation_turns 集合"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def find_one(self, query, *args, **kwargs):
+        self.calls.append("find_one")
+        return {"session_id": query["session_id"], "turns": []}
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append("upsert" if upsert else "update_one")
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.calls.append("next_turn_id")
+        return {"turn_count": 1}
+
+    async def insert_one(self, doc):
+        self.calls.append("insert_turn")
+
+
+def test_client_history_pairs_recent_turns():
+    """测试提取问答对：跳过 system 消息和未回复的用户消息，只保留最近 N 轮"""
+    messages = [
+        Message(role="system", content="你是 DevOps 助手"),
+        Message(role="user", content="问题1"),
+        Message(role="assistant", content="回答1"),
+        Message(role="user", content="被打断的问题"),
+        Message(role="user", content="问题2"),
+        Message(role="assistant", content="回答2"),
+        Message(role="user", content="问题3"),
+        Message(role="assistant", content="回答3"),
+        Message(role="user", content="当前问题"),
+    ]
+    assert chat_stream.client_history(messages, 5) == [
+        ("问题1", "回答1"), ("问题2", "回答2"), ("问题3", "回答3")
+    ]
+    assert chat_stream.client_history(messages, 2) == [("问题2", "回答2"), ("问题3", "回答3")]
+    assert chat_stream.client_history(messages[-1:], 5) == []
+
+
+async def test_stateless_run_uses_client_history_without_mongo_reads(monkeypatch):
+    """测试无状态模式不加载会话，历史来自客户端，轮次在后台写入"""
+    collection = _RecordingCollection()
+    histories = []
+    build_chat_history = DevOpsAgent.build_chat_history
+
+    def spy(self, memory):
+        histories.append((list(collection.calls), build_chat_history(self, memory)))
+        return histories[-1][1]
+
+    fake = FakeListChatModel(responses=["Thought: 数据已足够\nFinal Answer: 覆盖率 80%", "unused"])
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", lambda: collection
+    )
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversation_turns_collection", lambda: collection
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(DevOpsAgent, "build_chat_history", spy)
+
+    request = AGUIRunAgentInput(
+        threadId="stateless-thread",
+        messages=[
+            Message(role="user", content="Navigation 的构建状态"),
+            Message(role="assistant", content="最近 10 次构建全部成功"),
+            Message(role="user", content="覆盖率呢"),
+        ],
+        forwardedProps={"stateless": True, "coalesceMs": 0},
+    )
+    run = chat_stream.start_or_join_agent_run(DevOpsAgent(), request)
+    await asyncio.wait_for(run.task, timeout=5)
+
+    calls_before_llm, history = histories[0]
+    assert "find_one" not in calls_before_llm
+    assert "用户: Navigation 的构建状态\n助手: 最近 10 次构建全部成功" in history
+
+    # 会话文档按需创建，轮次在后台写入
+    for _ in range(100):
+        if "update_one" in collection.calls:
+            break
+        await asyncio.sleep(0.01)
+    assert collection.calls[:3] == ["upsert", "next_turn_id", "insert_turn"]  # begin_turn
+    assert collection.calls[-1] == "update_one"  # finish_turn
@@ -0,0 +1,73 @@
+"""测试客户端断开时取消流式 Agent 执行"""
+
+import asyncio
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import async_mongodb_memory, devops_agent
+from src.agent.devops_agent import DevOpsAgent
+from src.api.routes import chat_stream
+from src.tools.base import get_tool_cache
+from src.tools.jenkins import JenkinsTool
+
+
+class _DisconnectingRequest:
+    """模拟在指定时间后断开连接的客户端"""
+
+    def __init__(self, after: float):
+        self.disconnect_at = asyncio.get_running_loop().time() + after
+
+    async def is_disconnected(self) -> bool:
+        return asyncio.get_running_loop().time() >= self.disconnect_at
+
+
+async def test_disconnect_cancels_run_and_records_cancelled_turn(monkeypatch):
+    """测试断开后进行中的工具调用被取消，本轮记为 cancelled"""
+    tool_cancelled = asyncio.Event()
+
+    async def slow(self, query):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            tool_cancelled.set()
+            raise
+        return {}
+
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    saved = []
+
+    async def record_turn(
+        self, memory, message, agent_response, metrics, status="completed", writer=None
+    ):
+        saved.append(status)
+
+    monkeypatch.setattr(JenkinsTool, "_aexecute", slow)
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", unavailable
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: FakeListChatModel(
+        responses=["Thought: 查询构建\nAction: jenkins\nAction Input: my-job\n", "unused"]
+    ))
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(devops_agent.settings, "react_early_dispatch", False)
+    monkeypatch.setattr(chat_stream.settings, "stream_disconnect_poll_seconds", 0.05)
+    monkeypatch.setattr(chat_stream.settings, "stream_reconnect_grace_seconds", 0)
+    monkeypatch.setattr(DevOpsAgent, "asave_turn", record_turn)
+    get_tool_cache().clear()
+
+    agent = DevOpsAgent()
+    request = _DisconnectingRequest(after=0.3)
+    run = chat_stream.start_agent_run(agent, "构建状态如何", "cancel-test")
+    events = [
+        json.loads(chunk.split("data: ", 1)[1])
+        async for chunk in chat_stream.stream_run_events(run, request)
+    ]
+    await asyncio.gather(run.task, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert tool_cancelled.is_set()
+    assert not any(event["type"] == "RUN_FINISHED" for event in events)
+    assert saved == ["cancelled"]
@@ -0,0 +1,224 @@
+"""测试流式运行断线重连和多订阅者"""
+
+import asyncio
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agent import async_mongodb_memory, devops_agent
+from src.agent.devops_agent import DevOpsAgent
+from src.api.routes import chat_stream
+from src.models.schemas import AGUIRunAgentInput, Message
+from src.tools.base import get_tool_cache
+from src.tools.jenkins import JenkinsTool
+from src.utils.run_registry import StreamRun, get_run_registry
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def _parse(chunk):
+    id_line, data_line = chunk.strip().split("\n")
+    return int(id_line[len("id: "):]), json.loads(data_line[len("data: "):])
+
+
+async def test_reconnect_replays_missed_events_without_rerun(monkeypatch):
+    """测试断线后运行继续执行，重连从 Last-Event-ID 之后补发事件且不重新执行 Agent"""
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    async def record_turn(
+        self, memory, message, agent_response, metrics, status="completed", writer=None
+    ):
+        pass
+
+    fake = FakeListChatModel(responses=["Thought: 数据已足够\nFinal Answer: 项目整体健康", "unused"])
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", unavailable
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(DevOpsAgent, "asave_turn", record_turn)
+
+    agent = DevOpsAgent()
+    run = chat_stream.start_agent_run(agent, "项目状况如何", "resume-test", coalesce_ms=0)
+    assert get_run_registry().get(run.run_id) is run
+
+    # 第一个连接只收到前 3 个事件就断开
+    first = []
+    stream = chat_stream.stream_run_events(run)
+    async for chunk in stream:
+        first.append(_parse(chunk))
+        if len(first) == 3:
+            break
+    await stream.aclose()
+
+    # 宽限期内运行继续执行直到结束
+    await asyncio.wait_for(run.task, timeout=5)
+
+    resumed = [_parse(chunk) async for chunk in chat_stream.stream_run_events(run, last_event_id=3)]
+    ids = [event_id for event_id, _ in first + resumed]
+    assert ids == list(range(1, len(ids) + 1))
+    assert resumed[-1][1]["type"] == "RUN_FINISHED"
+    assert resumed[-1][1]["runId"] == run.run_id
+
+    text = "".join(
+        event.get("delta", "") for _, event in first + resumed if event["type"] == "TEXT_MESSAGE_CONTENT"
+    )
+    assert "项目整体健康" in text
+    # 只调用了一次 LLM
+    assert fake.i == 1
+
+
+async def test_same_run_id_attaches_as_observer(monkeypatch):
+    """测试相同 runId 的请求加入进行中的运行，两个订阅者收到相同事件且 Agent 只执行一次"""
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    async def record_turn(
+        self, memory, message, agent_response, metrics, status="completed", writer=None
+    ):
+        pass
+
+    async def slow(self, query):
+        await asyncio.sleep(0.2)
+        return {"status": "SUCCESS"}
+
+    fake = FakeListChatModel(responses=[
+        "Thought: 查询构建\nAction: jenkins\nAction Input: my-job\n",
+        "Thought: 数据已足够\nFinal Answer: 构建正常",
+        "unused",
+    ])
+    monkeypatch.setattr(JenkinsTool, "_aexecute", slow)
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", unavailable
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(devops_agent.settings, "react_early_dispatch", False)
+    monkeypatch.setattr(DevOpsAgent, "asave_turn", record_turn)
+    get_tool_cache().clear()
+
+    agent = DevOpsAgent()
+    request = AGUIRunAgentInput(
+        threadId="observer-test",
+        runId="observer-run",
+        messages=[Message(role="user", content="构建状态如何")],
+    )
+    first = await chat_stream.agent_run(request, _ConnectedRequest(), agent)
+    await asyncio.sleep(0.1)  # 第一个客户端已开始执行
+    second = await chat_stream.agent_run(request, _ConnectedRequest(), agent)
+    assert second.headers["X-Run-Id"] == "observer-run"
+
+    async def collect(response):
+        return [_parse(chunk) async for chunk in response.body_iterator]
+
+    first_events, second_events = await asyncio.gather(collect(first), collect(second))
+    assert first_events == second_events
+    assert first_events[-1][1]["type"] == "RUN_FINISHED"
+    assert fake.i == 2
+
+
+async def test_only_explicit_run_id_dedupes(monkeypatch):
+    """测试同一会话重复发送相同消息启动新运行，重发已结束运行的 runId 只回放不重新执行"""
+    def unavailable():
+        raise ConnectionError("MongoDB disabled in tests")
+
+    async def record_turn(
+        self, memory, message, agent_response, metrics, status="completed", writer=None
+    ):
+        pass
+
+    fake = FakeListChatModel(responses=[
+        "Thought: 数据已足够\nFinal Answer: 第一次回答",
+        "Thought: 数据已足够\nFinal Answer: 第二次回答",
+        "unused",
+    ])
+    monkeypatch.setattr(
+        async_mongodb_memory, "get_async_conversations_collection", unavailable
+    )
+    monkeypatch.setattr(devops_agent, "ChatOpenAI", lambda **kwargs: fake)
+    monkeypatch.setattr(devops_agent.settings, "agent_backend", "react")
+    monkeypatch.setattr(DevOpsAgent, "asave_turn", record_turn)
+
+    agent = DevOpsAgent()
+    messages = [Message(role="user", content="重试")]
+    first = chat_stream.start_or_join_agent_run(
+        agent, AGUIRunAgentInput(threadId="dedupe-test", messages=messages)
+    )
+    second = chat_stream.start_or_join_agent_run(
+        agent, AGUIRunAgentInput(threadId="dedupe-test", messages=messages)
+    )
+    assert second is not first
+    await asyncio.wait_for(asyncio.gather(first.task, second.task), timeout=5)
+    assert fake.i == 2
+
+    replay = chat_stream.start_or_join_agent_run(
+        agent, AGUIRunAgentInput(threadId="dedupe-test", runId=first.run_id, messages=messages)
+    )
+    assert replay is first
+    assert get_run_registry().get(first.run_id) is first
+    events = [_parse(chunk) async for chunk in chat_stream.stream_run_events(replay)]
+    assert events[-1][1]["type"] == "RUN_FINISHED"
+    assert fake.i == 2
+
+
+async def _start_with_slow_subscriber(run, events):
+    """启动运行；慢订阅者收到第一个事件后停止消费，快订阅者持续消费"""
+    started = asyncio.Event()
+
+    async def produce(run):
+        await started.wait()
+        for event in events:
+            run.publish(event)
+            await asyncio.sleep(0.001)
+
+    run.start(produce)
+    slow, fast = run.subscribe(), run.subscribe()
+    slow_first = asyncio.ensure_future(slow.__anext__())
+    fast_task = asyncio.ensure_future(_collect(fast))
+    await asyncio.sleep(0)
+    started.set()
+
+    first_event = await slow_first
+    await run.task
+    return [first_event] + [event async for event in slow], await fast_task
+
+
+async def test_slow_subscriber_is_disconnected_and_can_resume():
+    """测试积压无法压缩且超出上限时断开慢订阅者，其它订阅者不受影响，凭最后事件 ID 可续传"""
+    run = StreamRun("slow-run", subscriber_max_bytes=150, subscriber_compact_bytes=100)
+    events = [{"type": "TOOL_CALL_RESULT", "toolCallId": f"tool_{i}", "content": "ok"} for i in range(10)]
+
+    slow_events, fast_events = await _start_with_slow_subscriber(run, events)
+    assert [event_id for event_id, _ in slow_events] == [1]
+    assert [event_id for event_id, _ in fast_events] == list(range(1, 11))
+
+    resumed = [event async for event in run.subscribe(last_event_id=slow_events[-1][0])]
+    assert [event_id for event_id, _ in resumed] == list(range(2, 11))
+    assert get_run_registry().stats()["slow_disconnects"] >= 1
+
+
+async def test_slow_subscriber_backlog_is_compacted():
+    """测试慢订阅者的积压被压缩：连续文本增量合并，工具参数增量只保留最后一个"""
+    run = StreamRun("compact-run", subscriber_max_bytes=1 << 20, subscriber_compact_bytes=200)
+    events = [{"type": "TOOL_CALL_ARGS", "toolCallId": "tool_1", "delta": f"arg{i}"} for i in range(5)]
+    events += [{"type": "TEXT_MESSAGE_CONTENT", "messageId": "msg_1", "delta": str(i)} for i in range(20)]
+    events.append({"type": "TEXT_MESSAGE_END", "messageId": "msg_1"})
+
+    slow_events, fast_events = await _start_with_slow_subscriber(run, events)
+    assert len(fast_events) == len(events)
+
+    received = [json.loads(payload) for _, payload in slow_events]
+    assert [event["delta"] for event in received if event["type"] == "TOOL_CALL_ARGS"] == ["arg0", "arg4"]
+    text = "".join(event["delta"] for event in received if event["type"] == "TEXT_MESSAGE_CONTENT")
+    assert text == "".join(str(i) for i in range(20))
+    assert len(received) < len(events)
+    # 合并后的事件带被合并事件中最大的 ID，最后一个事件 ID 不变
+    assert slow_events[-1][0] == len(events)
+
+
+async def _collect(stream):
+    return [event async for event in stream]
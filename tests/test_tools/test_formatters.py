@@ -0,0 +1,51 @@
+"""测试工具结果格式化"""
+
+import copy
+import json
+
+import pytest
+
+from src.tools.formatters import CompactFormatter, JSONFormatter, get_formatter, project_fields
+from src.tools.jenkins import JenkinsTool
+
+
+def test_json_formatter_is_minified():
+    """测试最小化 JSON 不含缩进且可解析"""
+    result = JenkinsTool()._execute("my-job")
+    text = JSONFormatter().format(result)
+
+    assert "\n" not in text
+    assert json.loads(text) == result
+
+
+def test_compact_formatter_tables_and_top_k():
+    """测试同构列表表格化和 top-k 截断，且不修改原始结果"""
+    result = JenkinsTool()._execute("my-job")
+    original = copy.deepcopy(result)
+
+    data = json.loads(CompactFormatter(top_k=2).format(result))
+
+    builds = data["recent_builds"]
+    assert builds["columns"] == ["number", "status", "duration", "timestamp"]
+    assert builds["rows"][0] == [245, "SUCCESS", 420000, "2026-01-04T09:30:00Z"]
+    assert builds["more"] == 1
+    assert result == original
+
+
+def test_project_fields():
+    """测试按点号路径投影字段，路径穿过列表时逐项投影"""
+    data = {
+        "a": {"x": 1, "y": 2},
+        "items": [{"id": 1, "extra": "..."}, {"id": 2, "extra": "..."}],
+        "dropped": True,
+    }
+
+    projected = project_fields(data, ["a.x", "items.id"])
+
+    assert projected == {"a": {"x": 1}, "items": [{"id": 1}, {"id": 2}]}
+
+
+def test_unknown_format():
+    """测试未注册的格式"""
+    with pytest.raises(ValueError):
+        get_formatter("yaml")
@@ -0,0 +1,157 @@
+"""测试工具结果缓存"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.tools.base import ToolResultCache, get_tool_cache
+from src.tools.jenkins import JenkinsTool
+
+
+def test_make_key_normalizes_query():
+    """测试等价输入生成相同的 key"""
+    key = ToolResultCache.make_key("jenkins", "  my-job ")
+    assert key == ToolResultCache.make_key("jenkins", '"my-job"')
+    assert ToolResultCache.make_key("gerrit", '{"b": 1, "a": 2}') == ToolResultCache.make_key(
+        "gerrit", '{"a":2,"b":1}'
+    )
+    assert key != ToolResultCache.make_key("gerrit", "my-job")
+
+
+def test_ttl_expiry_and_counters():
+    """测试过期和命中统计"""
+    cache = ToolResultCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_fetch("k", 0.05, fetch) == {"n": 1}
+    assert cache.get_or_fetch("k", 0.05, fetch) == {"n": 1}
+    time.sleep(0.06)
+    assert cache.get_or_fetch("k", 0.05, fetch) == {"n": 2}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_lru_eviction():
+    """测试超出容量时淘汰最久未使用的条目"""
+    cache = ToolResultCache(max_entries=2)
+    cache.get_or_fetch("a", 60, lambda: {"v": "a"})
+    cache.get_or_fetch("b", 60, lambda: {"v": "b"})
+    cache.get_or_fetch("a", 60, lambda: {"v": "a2"})
+    cache.get_or_fetch("c", 60, lambda: {"v": "c"})
+
+    assert cache.get_or_fetch("a", 60, lambda: {"v": "miss"}) == {"v": "a"}
+    assert cache.get_or_fetch("b", 60, lambda: {"v": "refetched"}) == {"v": "refetched"}
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_errors_are_not_cached():
+    """测试异常结果不缓存"""
+    cache = ToolResultCache()
+
+    def fail():
+        raise RuntimeError("backend down")
+
+    try:
+        cache.get_or_fetch("k", 60, fail)
+    except RuntimeError:
+        pass
+    assert cache.get_or_fetch("k", 60, lambda: {"ok": True}) == {"ok": True}
+
+
+def test_concurrent_threads_coalesce():
+    """测试并发的同步调用只触发一次实际获取"""
+    cache = ToolResultCache()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"ok": True}
+
+    threads = [
+        threading.Thread(target=cache.get_or_fetch, args=("k", 60, slow_fetch))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+async def test_concurrent_coroutines_coalesce():
+    """测试并发的协程调用只触发一次实际获取"""
+    cache = ToolResultCache()
+    calls = []
+
+    async def slow_fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    results = await asyncio.gather(
+        *(cache.aget_or_fetch("k", 60, slow_fetch) for _ in range(8))
+    )
+
+    assert len(calls) == 1
+    assert all(r == {"ok": True} for r in results)
+
+
+async def test_cancelled_owner_does_not_cancel_waiters():
+    """测试发起方被取消时，等待方重新获取而不是一起失败"""
+    cache = ToolResultCache()
+
+    async def slow_fetch():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    owner = asyncio.create_task(cache.aget_or_fetch("k", 60, slow_fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.aget_or_fetch("k", 60, slow_fetch))
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    assert await waiter == {"ok": True}
+
+
+async def test_cancelled_waiter_does_not_affect_others():
+    """测试等待方被取消（如请求时限到期）时，其他等待方和发起方正常完成"""
+    cache = ToolResultCache()
+
+    async def slow_fetch():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    owner = asyncio.create_task(cache.aget_or_fetch("k", 60, slow_fetch))
+    await asyncio.sleep(0)
+    impatient = asyncio.create_task(
+        asyncio.wait_for(cache.aget_or_fetch("k", 60, slow_fetch), timeout=0.01)
+    )
+    waiter = asyncio.create_task(cache.aget_or_fetch("k", 60, slow_fetch))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    assert await waiter == {"ok": True}
+    assert await owner == {"ok": True}
+    assert cache.stats()["inflight"] == 0
+
+
+def test_tool_run_uses_cache():
+    """测试工具调用经过共享缓存"""
+    tool = JenkinsTool()
+    first = tool._run("cache-test-job")
+    hits = get_tool_cache().stats()["hits"]
+    second = tool._run(" cache-test-job ")
+
+    assert first == second
+    assert get_tool_cache().stats()["hits"] == hits + 1
@@ -0,0 +1,105 @@
+"""测试 AG-UI 协议适配器"""
+
+from src.utils.agui_adapter import AGUIAdapter, AGUIEventType
+
+
+def _types(events):
+    return [event["type"] for event in events]
+
+
+def test_coalesce_thinking_deltas_until_other_event():
+    """测试连续的思考增量被合并，其它事件到来前先输出合并内容"""
+    adapter = AGUIAdapter(session_id="run", coalesce_ms=10_000)
+    adapter.convert_event({"type": "start"})
+
+    events = []
+    for token in ["先", "检查", "构建"]:
+        events += adapter.convert_event({"type": "reasoning_token", "content": token})
+    assert _types(events) == [AGUIEventType.THINKING_START, AGUIEventType.THINKING_TEXT_MESSAGE_START]
+    assert adapter.flush_timeout() > 0
+
+    events = adapter.convert_event({"type": "tool_start", "tool": "jenkins", "input": "job", "run_id": "r1"})
+    assert events[0]["type"] == AGUIEventType.THINKING_TEXT_MESSAGE_CONTENT
+    assert events[0]["delta"] == "先检查构建"
+    assert events[1]["type"] == AGUIEventType.THINKING_TEXT_MESSAGE_END
+    assert adapter.flush_timeout() is None
+
+
+def test_coalesce_flushes_at_max_chars_and_on_flush():
+    """测试达到字符上限立即输出，flush 输出剩余内容"""
+    adapter = AGUIAdapter(session_id="run", react_format=False, coalesce_ms=10_000, coalesce_max_chars=4)
+
+    events = adapter.convert_event({"type": "token", "content": "ab"})
+    events += adapter.convert_event({"type": "token", "content": "cd"})
+    events += adapter.convert_event({"type": "token", "content": "e"})
+    assert [event.get("delta") for event in events] == [None, "abcd"]
+
+    assert [event["delta"] for event in adapter.flush()] == ["e"]
+    assert adapter.flush() == []
+
+
+def test_no_coalescing_by_default():
+    """测试未启用合并时逐 token 输出"""
+    adapter = AGUIAdapter(session_id="run", react_format=False)
+    adapter.convert_event({"type": "token", "content": "a"})
+
+    events = adapter.convert_event({"type": "token", "content": "b"})
+    assert _types(events) == [AGUIEventType.TEXT_MESSAGE_CONTENT]
+    assert adapter.flush_timeout() is None
+
+
+def test_react_markers_drive_messages():
+    """测试 ReAct 标记切换阶段：Thought/Final Answer 开启消息，Action 内容不输出"""
+    adapter = AGUIAdapter(session_id="run")
+    adapter.convert_event({"type": "start"})
+
+    events = []
+    for token in ["Thought: 查看", "构建\nAct", "ion: jenkins\nFinal Ans", "wer: 健康", " Fin"]:
+        events += adapter.convert_event({"type": "token", "content": token})
+    events += adapter.convert_event({"type": "final", "session_id": "run"})
+
+    deltas = [event["delta"] for event in events if event["type"] == AGUIEventType.TEXT_MESSAGE_CONTENT]
+    assert deltas == [" 查看", "构建\n", " 健康", " ", "Fin"]
+    assert _types(events).count(AGUIEventType.TEXT_MESSAGE_START) == 2
+    assert _types(events)[-2:] == [AGUIEventType.TEXT_MESSAGE_END, AGUIEventType.RUN_FINISHED]
+
+
+def test_overlapping_tool_calls_pair_by_run_id():
+    """测试并发工具调用按 run_id 配对，结束顺序与开始顺序相反时 toolCallId 不串"""
+    adapter = AGUIAdapter(session_id="run", react_format=False)
+    adapter.convert_event({"type": "start"})
+
+    start_a = adapter.convert_event({"type": "tool_start", "tool": "jenkins", "run_id": "a"})
+    start_b = adapter.convert_event({"type": "tool_start", "tool": "gerrit", "run_id": "b"})
+    id_a, id_b = start_a[0]["toolCallId"], start_b[0]["toolCallId"]
+    assert id_a != id_b
+
+    end_b = adapter.convert_event({"type": "tool_end", "output": "gerrit 结果", "run_id": "b"})
+    end_a = adapter.convert_event({"type": "tool_end", "output": "jenkins 结果", "run_id": "a"})
+
+    assert [(event["type"], event["toolCallId"]) for event in end_b] == [
+        (AGUIEventType.TOOL_CALL_END, id_b), (AGUIEventType.TOOL_CALL_RESULT, id_b)
+    ]
+    assert [(event["type"], event["toolCallId"]) for event in end_a] == [
+        (AGUIEventType.TOOL_CALL_END, id_a), (AGUIEventType.TOOL_CALL_RESULT, id_a)
+    ]
+    assert end_a[1]["content"] == "jenkins 结果"
+    # 两个调用都已结束，重复的结束事件不再输出
+    assert adapter.convert_event({"type": "tool_end", "output": "", "run_id": "a"}) == []
+
+
+def test_non_react_content_passes_through():
+    """测试原生函数调用模式下 content 原样作为回答输出，不解析 ReAct 标记"""
+    adapter = AGUIAdapter(session_id="run", react_format=False)
+    adapter.convert_event({"type": "start"})
+
+    events = []
+    for token in ["Thought: 这不是", "标记\nFinal Answer: 原样", ""]:
+        events += adapter.convert_event({"type": "token", "content": token})
+    events += adapter.convert_event({"type": "final", "session_id": "run"})
+
+    deltas = [
+        event["delta"] for event in events if event["type"] == AGUIEventType.TEXT_MESSAGE_CONTENT
+    ]
+    assert deltas == ["Thought: 这不是", "标记\nFinal Answer: 原样"]
+    assert _types(events).count(AGUIEventType.TEXT_MESSAGE_START) == 1
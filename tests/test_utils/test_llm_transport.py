@@ -0,0 +1,115 @@
+"""测试共享 LLM 连接池"""
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_openai import ChatOpenAI
+
+from src.utils import llm_transport
+from src.utils.llm_transport import LLMTransport, close_llm_transport, get_llm_transport
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    """本地 keep-alive 服务，模拟 OpenAI 兼容接口"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._send({"object": "list", "data": []})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self._send({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+
+
+async def test_warm_up_connection_is_reused(base_url):
+    """测试预热建立的连接被后续 LLM 调用复用"""
+    transport = LLMTransport(base_url)
+    try:
+        await transport.awarm_up("test-key")
+        assert transport.stats()["async_pool"]["idle"] == 1
+
+        llm = ChatOpenAI(
+            model="test",
+            api_key="test-key",
+            base_url=base_url,
+            http_client=transport.client,
+            http_async_client=transport.async_client,
+        )
+        assert (await llm.ainvoke("hello")).content == "ok"
+
+        stats = transport.stats()
+        # 预热时同步、异步连接池各新建一条连接，LLM 调用复用异步池中的连接
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 2
+        assert stats["reused_connections"] == 1
+        assert stats["async_pool"]["connections"] == 1
+    finally:
+        await transport.aclose()
+
+
+async def test_warm_up_times_out_on_unresponsive_server():
+    """测试服务端接受连接但不响应时，预热在 connect_timeout 内放弃而不阻塞启动"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    transport = LLMTransport(f"http://127.0.0.1:{server.getsockname()[1]}/v1", connect_timeout=0.3)
+    try:
+        start = time.perf_counter()
+        await transport.awarm_up("test-key")
+        assert time.perf_counter() - start < 2
+    finally:
+        await transport.aclose()
+        server.close()
+
+
+async def test_close_resets_shared_transport(monkeypatch):
+    """测试关闭共享连接池后 get_llm_transport() 返回新的实例"""
+    monkeypatch.setattr(llm_transport, "_llm_transport", None)
+    transport = get_llm_transport()
+    await close_llm_transport()
+
+    assert transport.async_client.is_closed
+    fresh = get_llm_transport()
+    assert fresh is not transport
+    assert not fresh.async_client.is_closed
+    await close_llm_transport()
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    """测试未安装 h2 时退回 HTTP/1.1"""
+    monkeypatch.setattr(llm_transport, "_http2_available", lambda: False)
+    transport = LLMTransport("http://127.0.0.1", http2=True)
+    assert transport.stats()["http2"] is False
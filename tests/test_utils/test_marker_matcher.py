@@ -0,0 +1,74 @@
+"""测试流式标记匹配器"""
+
+import random
+
+from src.utils.agui_adapter import REACT_MARKERS
+from src.utils.marker_matcher import MARKER, TEXT, MarkerMatcher
+
+
+def _feed_all(matcher, tokens):
+    segments = []
+    for token in tokens:
+        segments += matcher.feed(token)
+    held = matcher.flush()
+    if held:
+        segments.append((TEXT, held))
+    # 合并相邻文本片段，便于与不同切分方式的结果比较
+    merged = []
+    for kind, value in segments:
+        if kind == TEXT and merged and merged[-1][0] == TEXT:
+            merged[-1] = (TEXT, merged[-1][1] + value)
+        else:
+            merged.append((kind, value))
+    return merged
+
+
+def test_marker_split_across_tokens():
+    """测试被切分到多个 token 的标记，标记之后同一 token 中的文本照常输出"""
+    matcher = MarkerMatcher(REACT_MARKERS)
+
+    assert matcher.feed("Thought: 查看构建\nFin") == [(MARKER, "thought"), (TEXT, " 查看构建\n")]
+    assert matcher.feed("al Ans") == []
+    assert matcher.feed("wer: 健康") == [(MARKER, "final_answer"), (TEXT, " 健康")]
+
+
+def test_prefix_that_is_not_a_marker_is_released():
+    """测试形如标记开头但不是标记的文本在确定后输出，流结束时 flush 输出暂存文本"""
+    matcher = MarkerMatcher(REACT_MARKERS)
+
+    assert matcher.feed("Action") == []
+    assert matcher.feed(" items") == [(TEXT, "Action items")]
+    assert matcher.feed(" Final") == [(TEXT, " ")]
+    assert matcher.flush() == "Final"
+
+
+def test_overlapping_candidates_use_failure_links():
+    """测试失配后沿失配链继续匹配（"Action Action:" 中第二个 Action 才是标记）"""
+    matcher = MarkerMatcher(REACT_MARKERS)
+
+    assert _feed_all(matcher, ["Action Action: jenkins"]) == [
+        (TEXT, "Action "),
+        (MARKER, "action"),
+        (TEXT, " jenkins"),
+    ]
+
+
+def test_result_independent_of_tokenization():
+    """测试任意切分方式得到相同的片段序列"""
+    text = (
+        "Thought: 检查 Action items\nAction: jenkins\nAction Input: nav\n"
+        "Observation: ok\nThought: done\nFinal Answer: 健康 Final"
+    )
+    expected = _feed_all(MarkerMatcher(REACT_MARKERS), [text])
+    assert [value for kind, value in expected if kind == MARKER] == [
+        "thought", "action", "action_input", "observation", "thought", "final_answer",
+    ]
+
+    rng = random.Random(0)
+    for _ in range(50):
+        tokens, i = [], 0
+        while i < len(text):
+            size = rng.randint(1, 5)
+            tokens.append(text[i:i + size])
+            i += size
+        assert _feed_all(MarkerMatcher(REACT_MARKERS), tokens) == expected